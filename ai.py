@@ -0,0 +1,250 @@
+# AI policies for headless matches.
+# A policy is a function (me, opponent, rng) -> input bitmask, using the
+# INPUT_* flags from simulation. POLICIES maps the names the tools accept.
+#
+# Policy objects add a batched interface on top: decide(pairs, rng) gives
+# input bitmasks for every (me, opponent) fighter pair in one call. Array
+# policies (arrays = True, e.g. neural) also work without fighters:
+# act(obs, rng) maps an (n, OBS_SIZE) observation array to (n, 4)
+# booleans (move_left, move_right, do_jump, do_attack), and decide_obs()
+# does the same to bitmasks, as batch_sim needs. Policies that need the
+# fighters themselves (ScalarPolicy, lookahead) raise TypeError there.
+# Each policy declares a per-tick time budget;
+# decide() tracks how often it is exceeded and, with enforce_budget on,
+# reuses its last answer for as many ticks as the overrun cost so a slow
+# policy can't drag down the frame rate. Policies whose per-tick cost is
+# I/O rather than evaluation set holds = False: overruns are still
+# counted, but every tick runs.
+# Policy objects are also plain (me, opponent, rng) callables.
+
+import time
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only the neural policy needs it
+    np = None
+
+from simulation import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, ATTACK_COOLDOWN,
+    INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_ATTACK,
+)
+
+# Observation columns, all scaled to roughly [-1, 1]
+OBS_FIELDS = (
+    "dx", "dy",                         # opponent minus me, in screen widths / heights
+    "vel_y", "opp_vel_y",               # / 15 (jump speed)
+    "health", "opp_health",             # / 100
+    "ready", "opp_cooldown",            # my attack is ready; opponent's cooldown / ATTACK_COOLDOWN
+    "jumping", "opp_jumping",
+    "crisis_used", "opp_crisis_used",
+    "facing_left",
+)
+OBS_SIZE = len(OBS_FIELDS)
+ACTION_BITS = (INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_ATTACK)
+MAX_HOLD = 8  # Ticks a policy may skip to pay back one slow evaluation
+
+
+def idle(me, opponent, rng):
+    return 0
+
+
+def chase(me, opponent, rng):
+    # The original CPU opponent from Fighter.update
+    return me.ai_inputs(opponent, rng)
+
+
+def masher(me, opponent, rng):
+    # Random buttons every tick
+    return rng.getrandbits(4)
+
+
+def rushdown(me, opponent, rng):
+    # Close in and attack whenever the cooldown allows
+    bits = 0
+    if me.rect.x > opponent.rect.x + 40:
+        bits |= INPUT_LEFT
+    elif me.rect.x < opponent.rect.x - 40:
+        bits |= INPUT_RIGHT
+    if abs(me.rect.centerx - opponent.rect.centerx) < 80 and me.attack_cooldown == 0:
+        bits |= INPUT_ATTACK
+    if opponent.is_jumping and not me.is_jumping and rng.randint(0, 100) < 10:
+        bits |= INPUT_JUMP
+    return bits
+
+
+# === OBSERVATIONS ===
+def observe(pairs, out=None):
+    # (me, opponent) fighter pairs -> (n, OBS_SIZE) float32
+    if out is None or len(out) < len(pairs):
+        out = np.empty((len(pairs), OBS_SIZE), dtype=np.float32)
+    for row, (me, opp) in zip(out, pairs):
+        row[:] = (
+            (opp.rect.x - me.rect.x) / SCREEN_WIDTH, (opp.rect.y - me.rect.y) / SCREEN_HEIGHT,
+            me.vel_y / 15, opp.vel_y / 15,
+            me.health / 100, opp.health / 100,
+            me.attack_cooldown == 0, opp.attack_cooldown / ATTACK_COOLDOWN,
+            me.is_jumping, opp.is_jumping,
+            me.has_triggered_crisis, opp.has_triggered_crisis,
+            me.flip,
+        )
+    return out[:len(pairs)]
+
+
+def observe_arrays(me, opp):
+    # Same observation from struct-of-arrays state (batch_sim): me and opp
+    # are dicts of equal-length arrays keyed by Fighter attribute name
+    return np.stack([
+        (opp["x"] - me["x"]) / SCREEN_WIDTH, (opp["y"] - me["y"]) / SCREEN_HEIGHT,
+        me["vel_y"] / 15, opp["vel_y"] / 15,
+        me["health"] / 100, opp["health"] / 100,
+        me["attack_cooldown"] == 0, opp["attack_cooldown"] / ATTACK_COOLDOWN,
+        me["is_jumping"], opp["is_jumping"],
+        me["has_triggered_crisis"], opp["has_triggered_crisis"],
+        me["flip"],
+    ], axis=1).astype(np.float32)
+
+
+def actions_to_bits(actions):
+    # (n, 4) booleans -> (n,) input bitmasks
+    return actions.astype(np.int32) @ np.array(ACTION_BITS, dtype=np.int32)
+
+
+# === POLICY OBJECTS ===
+class Policy:
+    budget = 0.0005  # Seconds per tick for one whole batch
+    holds = True     # enforce_budget may replay the last answer after an overrun
+    arrays = False   # act() / decide_obs() work on observation arrays alone
+
+    def __init__(self, budget=None, enforce_budget=False):
+        if budget is not None:
+            self.budget = budget
+        self.enforce_budget = enforce_budget
+        self.hold = 0
+        self.last = None
+        self.calls = self.over_budget = self.held = 0
+        self.total_time = self.max_time = 0.0
+
+    def act(self, obs, rng):
+        # Only array policies can play from observations alone
+        raise TypeError(f"{self.name()} needs fighters, not observations; "
+                        "use decide(pairs, rng) or an array policy such as neural")
+
+    def name(self):
+        return type(self).__name__
+
+    def _decide(self, pairs, rng):
+        return [int(b) for b in actions_to_bits(self.act(observe(pairs), rng))]
+
+    def decide(self, pairs, rng):
+        # Input bitmasks for every (me, opponent) pair, in one evaluation
+        return self._budgeted(len(pairs), self._decide, pairs, rng)
+
+    def decide_obs(self, obs, rng):
+        # Same from a ready-made (n, OBS_SIZE) array; returns an (n,) array.
+        # Array policies only
+        if not self.arrays:
+            self.act(obs, rng)  # raises the TypeError
+        return self._budgeted(len(obs), lambda: actions_to_bits(self.act(obs, rng)))
+
+    def _budgeted(self, n, evaluate, *args):
+        if self.hold and self.last is not None and len(self.last) == n:
+            self.hold -= 1
+            self.held += 1
+            return self.last
+        start = time.perf_counter()
+        bits = evaluate(*args)
+        elapsed = time.perf_counter() - start
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if elapsed > self.budget:
+            self.over_budget += 1
+            if self.enforce_budget and self.holds:
+                self.hold = min(MAX_HOLD, int(elapsed / self.budget))
+        self.last = bits
+        return bits
+
+    def __call__(self, me, opponent, rng):
+        return self.decide([(me, opponent)], rng)[0]
+
+    def stats(self):
+        return {"calls": self.calls, "mean_ms": self.total_time / max(1, self.calls) * 1000,
+                "max_ms": self.max_time * 1000, "budget_ms": self.budget * 1000,
+                "over_budget": self.over_budget, "held_ticks": self.held}
+
+
+class ScalarPolicy(Policy):
+    # Wraps a (me, opponent, rng) function; evaluated pair by pair
+    def __init__(self, fn, budget=None, enforce_budget=False):
+        super().__init__(budget, enforce_budget)
+        self.fn = fn
+
+    def _decide(self, pairs, rng):
+        return [self.fn(me, opp, rng) for me, opp in pairs]
+
+    def name(self):
+        return f"ScalarPolicy({self.fn.__name__})"
+
+
+class NeuralPolicy(Policy):
+    # Two-layer MLP: obs -> tanh hidden -> 4 logits, pressed if logit > 0.
+    # The built-in weights are set by hand to play like rushdown; trained
+    # ones load from an .npz with W1, b1, W2, b2.
+    budget = 0.0002
+    arrays = True
+
+    def __init__(self, weights=None, budget=None, enforce_budget=False):
+        if np is None:
+            raise RuntimeError("the neural policy needs numpy (pip install numpy)")
+        super().__init__(budget, enforce_budget)
+        self.W1, self.b1, self.W2, self.b2 = weights if weights is not None else default_weights()
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        data = np.load(path)
+        return cls((data["W1"], data["b1"], data["W2"], data["b2"]), **kwargs)
+
+    def save(self, path):
+        np.savez(path, W1=self.W1, b1=self.b1, W2=self.W2, b2=self.b2)
+
+    def act(self, obs, rng):
+        hidden = np.tanh(obs @ self.W1 + self.b1)
+        return hidden @ self.W2 + self.b2 > 0
+
+
+def default_weights(hidden=8):
+    f = OBS_FIELDS.index
+    W1 = np.zeros((OBS_SIZE, hidden), dtype=np.float32)
+    b1 = np.zeros(hidden, dtype=np.float32)
+    W1[f("dx"), 0], b1[0] = 50, -3      # opponent more than ~60px to the right
+    W1[f("dx"), 1], b1[1] = -50, -3     # ... to the left
+    W1[f("dy"), 2], b1[2] = -20, -2     # opponent well above me
+    W1[f("ready"), 3], b1[3] = 10, -5   # my attack is off cooldown
+    W2 = np.zeros((hidden, 4), dtype=np.float32)
+    b2 = np.zeros(4, dtype=np.float32)
+    W2[1, 0] = 6                        # move_left
+    W2[0, 1] = 6                        # move_right
+    W2[2, 2], b2[2] = 8, -4             # do_jump
+    W2[[0, 1, 3], 3], b2[3] = (-4, -4, 4), -6  # do_attack: in range and ready
+    return W1, b1, W2, b2
+
+
+POLICIES = {
+    "idle": idle,
+    "chase": chase,
+    "masher": masher,
+    "rushdown": rushdown,
+}
+if np is not None:
+    POLICIES["neural"] = NeuralPolicy()
+
+
+def get_policy(name, **kwargs):
+    # A fresh Policy object (batched interface) for a POLICIES name, or
+    # "lookahead" (search_ai; starts worker processes, so not in POLICIES)
+    if name == "lookahead":
+        from search_ai import LookaheadPolicy
+        return LookaheadPolicy(**kwargs)
+    if name == "neural":
+        return NeuralPolicy(**kwargs)
+    return ScalarPolicy(POLICIES[name], **kwargs)
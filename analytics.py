@@ -0,0 +1,350 @@
+# Columnar match analytics over telemetry logs.
+# compact() turns the gzip JSON-lines logs written by telemetry.py into a
+# store of typed, fixed-width columns: one raw little-endian file per
+# column, per table, per day, plus manifest.json describing them. Queries
+# np.memmap only the columns they touch, filter and group with vectorized
+# NumPy, and skip whole days outside --since/--until without opening them.
+#
+# Tables (one row per ...):
+#   matches  finished match: mode, winner, length, who hit crisis first...
+#   trivia   answered crisis question: player, question index, correct
+#
+# compact is incremental: a day is rebuilt only when its log file changed
+# since the last run (today's file keeps growing). A rebuilt day is written
+# to a new directory and only swapped in by replacing the manifest, so a
+# crash or a query running during compaction still sees the old day whole.
+#
+#   python analytics.py compact telemetry/ stats/
+#   python analytics.py query stats/ matches --where first_crisis==2 --group-by winner
+#   python analytics.py query stats/ trivia --group-by question --agg mean:correct --agg count
+#   python analytics.py query stats/ matches --since 2026-10-01 --where mode==PVE --agg mean:ticks
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+
+import telemetry
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+MODES = ("PVP", "PVE", "BATTLE")   # matches.mode is an index into this
+
+SCHEMA = {
+    "matches": {
+        "match": "<i8", "day": "<i4", "start_ts": "<f8", "mode": "u1", "seed": "<u4",
+        "winner": "i1", "ticks": "<i4", "p1_health": "<i2", "p2_health": "<i2",
+        "p1_hits": "<i4", "p2_hits": "<i4", "jumps": "<i4",
+        "crises": "u1", "first_crisis": "i1",     # player whose crisis came first, 0 = none
+    },
+    "trivia": {
+        "match": "<i8", "day": "<i4", "tick": "<i4", "player": "i1",
+        "question": "<i4", "correct": "?", "health": "<i2",
+    },
+}
+CATEGORIES = {("matches", "mode"): MODES}
+
+
+# === COMPACTION ===
+def _day(path):
+    # events-20261018.jsonl.gz -> 20261018
+    match = re.search(r"(\d{8})", os.path.basename(path))
+    return int(match.group(1)) if match else 0
+
+
+def build_rows(path):
+    # Column lists for every table from one day's log
+    day = _day(path)
+    rows = {table: {col: [] for col in cols} for table, cols in SCHEMA.items()}
+    live = {}
+    for event in telemetry.read_events([path]):
+        kind, mid = event["event"], event["match"]
+        if kind == "match_start":
+            live[mid] = {"match": mid, "day": day, "start_ts": event["ts"],
+                         "mode": MODES.index(event["mode"]), "seed": event["seed"],
+                         "p1_hits": 0, "p2_hits": 0, "jumps": 0, "crises": 0, "first_crisis": 0}
+            continue
+        m = live.get(mid)
+        if m is None:
+            continue  # started before this log began
+        if kind == "hit":
+            if event["attacker"] == 1:
+                m["p1_hits"] += 1
+            elif event["attacker"] == 2:
+                m["p2_hits"] += 1
+        elif kind == "jump":
+            m["jumps"] += 1
+        elif kind == "crisis":
+            m["crises"] += 1
+            if not m["first_crisis"]:
+                m["first_crisis"] = event["player"]
+        elif kind == "answer":
+            t = rows["trivia"]
+            for col, value in (("match", mid), ("day", day), ("tick", event["tick"]),
+                               ("player", event["player"]), ("correct", event["correct"]),
+                               ("question", -1 if event["question"] is None else event["question"]),
+                               ("health", event["health"])):
+                t[col].append(value)
+        elif kind == "match_end":
+            health = event["health"] + [0, 0]
+            m.update(winner=event["winner"], ticks=event["tick"], p1_health=health[0], p2_health=health[1])
+            for col, values in rows["matches"].items():
+                values.append(m[col])
+            del live[mid]
+    return rows
+
+
+def write_partition(store, table, name, columns):
+    # Columns go into a scratch directory that is renamed to `name` once
+    # complete, so a crash never leaves a half-written partition behind
+    folder = os.path.join(store, table, name)
+    tmp = folder + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for col, dtype in SCHEMA[table].items():
+        np.asarray(columns[col], dtype=dtype).tofile(os.path.join(tmp, col + ".bin"))
+    os.replace(tmp, folder)
+    return len(columns["match"])
+
+
+def load_manifest(store):
+    try:
+        with open(os.path.join(store, MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == FORMAT_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": FORMAT_VERSION, "schema": SCHEMA, "categories": {}, "partitions": {}}
+
+
+def compact(log_dir, store):
+    os.makedirs(store, exist_ok=True)
+    manifest = load_manifest(store)
+    manifest["schema"] = SCHEMA
+    manifest["categories"] = {f"{t}.{c}": list(v) for (t, c), v in CATEGORIES.items()}
+    parts = manifest["partitions"]
+    built = 0
+    for path in telemetry.log_files(log_dir):
+        day = str(_day(path))
+        st = os.stat(path)
+        source = [os.path.basename(path), st.st_size, st.st_mtime_ns]
+        if parts.get(day, {}).get("source") == source:
+            continue  # unchanged since the last compaction
+        rows = build_rows(path)
+        # Each rebuild of a day gets a new directory name; the old one stays
+        # readable until the manifest points away from it
+        old = parts.get(day)
+        generation = old.get("generation", 0) + 1 if old else 1
+        name = f"{day}.{generation}"
+        parts[day] = {"source": source, "dir": name, "generation": generation,
+                      "rows": {table: write_partition(store, table, name, cols) for table, cols in rows.items()}}
+        built += 1
+        tmp = os.path.join(store, MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, os.path.join(store, MANIFEST))
+        if old:
+            for table in SCHEMA:
+                shutil.rmtree(os.path.join(store, table, old.get("dir", day)), ignore_errors=True)
+    return built, len(parts)
+
+
+# === QUERIES ===
+def parse_day(text):
+    # 2026-10-18 or 20261018 -> 20261018
+    return int(text.replace("-", ""))
+
+
+def open_columns(store, table, columns, since=None, until=None, manifest=None):
+    # {column: array} concatenated over the days in range (memmapped per day)
+    manifest = manifest or load_manifest(store)
+    schema = manifest["schema"][table]
+    days = sorted(int(d) for d, p in manifest["partitions"].items() if p["rows"].get(table))
+    days = [d for d in days if (since is None or d >= since) and (until is None or d <= until)]
+    out = {}
+    for col in columns:
+        if col not in schema:
+            raise SystemExit(f"unknown column {table}.{col} (have: {', '.join(schema)})")
+        parts = []
+        for d in days:
+            part = manifest["partitions"][str(d)]
+            parts.append(np.memmap(os.path.join(store, table, part.get("dir", str(d)), col + ".bin"),
+                                   dtype=schema[col], mode="r", shape=(part["rows"][table],)))
+        if not parts:
+            out[col] = np.zeros(0, dtype=schema[col])
+        else:
+            out[col] = np.concatenate(parts) if len(parts) > 1 else parts[0]
+    return out, len(days)
+
+
+FILTER = re.compile(r"^\s*(\w+)\s*(==|!=|<=|>=|<|>)\s*(.+?)\s*$")
+OPS = {"==": np.equal, "!=": np.not_equal, "<": np.less, "<=": np.less_equal,
+       ">": np.greater, ">=": np.greater_equal}
+
+
+def parse_filter(text, table, categories, schema):
+    match = FILTER.match(text)
+    if not match:
+        raise SystemExit(f"bad filter {text!r}; use e.g. winner==1 or ticks>600")
+    col, op, value = match.groups()
+    names = categories.get(f"{table}.{col}")
+    if names and value.upper() in (name.upper() for name in names):
+        value = [name.upper() for name in names].index(value.upper())
+    elif value.lower() in ("true", "false"):
+        value = value.lower() == "true"
+    else:
+        try:
+            value = float(value)
+        except ValueError:
+            have = f" (have: {', '.join(names)})" if names else ""
+            raise SystemExit(f"bad value {value!r} in filter {text!r}; expected a number{have}") from None
+
+    # The comparison happens in the column's own type, so the value has to fit it
+    dtype = np.dtype(schema[col]) if col in schema else None  # unknown columns: see open_columns
+    if dtype is not None and dtype.kind == "b" and value not in (0, 1):
+        raise SystemExit(f"{table}.{col} is true/false, got {value:g} in filter {text!r}")
+    if dtype is not None and dtype.kind in "iu" and float(value).is_integer():
+        info = np.iinfo(dtype)
+        if not info.min <= value <= info.max:
+            raise SystemExit(f"{value:g} is out of range for {table}.{col} ({info.min} to {info.max})")
+    return col, OPS[op], value
+
+
+def group_ids(columns):
+    # (group key tuples, group number per row) for one or more key columns.
+    # Integer keys are packed into one int64 (mixed radix over each column's
+    # range); when that space is small the groups come from one bincount
+    # instead of a sort.
+    n = len(columns[0])
+    packed = np.zeros(n, dtype=np.int64)
+    decode = []
+    radix = 1
+    for col in columns:
+        if col.dtype.kind == "f" or not n:
+            values, codes = np.unique(col, return_inverse=True)
+            col, lo, span = codes.ravel(), 0, max(1, len(values))
+        else:
+            values, lo = None, int(col.min())
+            span = int(col.max()) - lo + 1
+        packed += (col.astype(np.int64) - lo) * radix
+        decode.append((radix, span, lo, values))
+        radix *= span
+    if radix <= max(1 << 22, 4 * n):
+        present = np.flatnonzero(np.bincount(packed, minlength=radix))
+        remap = np.empty(radix, dtype=np.intp)
+        remap[present] = np.arange(len(present))
+        keys, inverse = present, remap[packed]
+    else:
+        keys, inverse = np.unique(packed, return_inverse=True)
+    columns_out = []
+    for r, span, lo, values in decode:
+        part = keys // r % span + lo
+        columns_out.append(values[part].tolist() if values is not None else part.tolist())
+    return list(zip(*columns_out)), inverse.ravel()
+
+
+def query(store, table, where=(), group_by=(), aggs=("count",), since=None, until=None):
+    # -> (header, rows, scanned rows, days read)
+    manifest = load_manifest(store)
+    categories = manifest.get("categories", {})
+    filters = [parse_filter(w, table, categories, manifest["schema"].get(table, {})) for w in where]
+    aggs = [a.split(":", 1) if ":" in a else (a, None) for a in aggs]
+    needed = {c for c, _, _ in filters} | set(group_by) | {c for _, c in aggs if c}
+    cols, days = open_columns(store, table, sorted(needed) or ["match"], since, until, manifest)
+    n = len(next(iter(cols.values())))
+
+    mask = None
+    for col, op, value in filters:
+        column = cols[col]
+        if column.dtype.kind in "iub" and float(value).is_integer():
+            value = column.dtype.type(value)  # compare in the column's own type, no float copy
+        hit = op(column, value)
+        mask = hit if mask is None else mask & hit
+
+    def selected(col):
+        return cols[col] if mask is None else cols[col][mask]
+
+    if group_by:
+        groups, inverse = group_ids([selected(c) for c in group_by])
+    else:
+        rows_left = n if mask is None else int(mask.sum())
+        groups, inverse = [()], np.zeros(rows_left, dtype=np.intp)
+    counts = np.bincount(inverse, minlength=len(groups))
+
+    results = []
+    for fn, col in aggs:
+        if fn == "count":
+            results.append(counts)
+            continue
+        values = selected(col).astype(np.float64)
+        sums = np.bincount(inverse, weights=values, minlength=len(groups))
+        if fn == "sum":
+            results.append(sums)
+        elif fn == "mean":
+            results.append(sums / np.maximum(counts, 1))
+        else:
+            raise SystemExit(f"unknown aggregate {fn}; use count, sum:COL or mean:COL")
+
+    header = list(group_by) + [fn if col is None else f"{fn}({col})" for fn, col in aggs]
+    rows = []
+    for g in range(len(groups)):
+        key = []
+        for c, v in zip(group_by, groups[g]):
+            names = categories.get(f"{table}.{c}")
+            key.append(names[int(v)] if names else v)
+        rows.append(key + [r[g].item() for r in results])
+    return header, rows, n, days
+
+
+def format_value(v):
+    return f"{v:.4f}" if isinstance(v, float) and not v.is_integer() else str(int(v) if isinstance(v, float) else v)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar match analytics.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("compact", help="convert telemetry logs into the column store")
+    c.add_argument("logs", help="telemetry directory (or one .jsonl.gz)")
+    c.add_argument("store")
+    q = sub.add_parser("query", help="filter / group-by over the column store")
+    q.add_argument("store")
+    q.add_argument("table", choices=sorted(SCHEMA))
+    q.add_argument("--where", action="append", default=[], metavar="COL<OP>VALUE",
+                   help="e.g. first_crisis==2, mode==PVE, ticks>=600 (repeat to AND)")
+    q.add_argument("--group-by", action="append", default=[], metavar="COL")
+    q.add_argument("--agg", action="append", metavar="FN[:COL]",
+                   help="count (default), sum:COL or mean:COL; repeatable")
+    q.add_argument("--since", type=parse_day, metavar="YYYY-MM-DD")
+    q.add_argument("--until", type=parse_day, metavar="YYYY-MM-DD")
+    q.add_argument("--limit", type=int, default=50, help="rows to print, largest count first")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        start = time.perf_counter()
+        built, total = compact(args.logs, args.store)
+        print(f"compacted {built} day(s), {total} in store ({time.perf_counter() - start:.1f}s)")
+        return
+
+    start = time.perf_counter()
+    header, rows, scanned, days = query(args.store, args.table, args.where, args.group_by,
+                                        args.agg or ["count"], args.since, args.until)
+    elapsed = time.perf_counter() - start
+    if "count" in header:
+        rows.sort(key=lambda r: -r[header.index("count")])
+    widths = [max(len(h), 10) for h in header]
+    print("  ".join(h.rjust(w) for h, w in zip(header, widths)))
+    for row in rows[:args.limit]:
+        print("  ".join(format_value(v).rjust(w) for v, w in zip(row, widths)))
+    if len(rows) > args.limit:
+        print(f"... {len(rows) - args.limit} more groups")
+    print(f"{scanned:,} rows from {days} day(s) in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
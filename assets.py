@@ -0,0 +1,200 @@
+# Process-wide sprite cache and texture atlases.
+# load_image() decodes, converts and scales an image once per
+# (folder, name, scale) and hands the same Surface to every caller, so
+# creating fighters for a rematch or a new character select costs
+# nothing. Missing files are cached too (as None).
+#
+# A folder can be packed offline into atlas.png + atlas.json (frame name ->
+# [x, y, w, h]). When a folder has an atlas, its frames are cut from that
+# one image instead of being read file by file.
+#
+# Sounds load on a background thread (start_audio); play_sound() is a
+# no-op until they are ready or if there is no audio device.
+#
+# build_variants() precomputes every mirrored and effect-tinted version of
+# an animation table at load time, so drawing only indexes into it:
+#   variants[effect][flipped][anim][frame]
+#
+#   python assets.py pack sprites/player1 sprites/player2
+#   python assets.py pack --all
+
+import argparse
+import json
+import os
+import threading
+
+import pygame
+
+ASSET_DIR = "assets"
+ATLAS_IMAGE = "atlas.png"
+ATLAS_INDEX = "atlas.json"
+ATLAS_MAX_WIDTH = 2048
+ATLAS_PADDING = 1
+
+_images = {}    # (folder, name, scale) -> Surface or None
+_atlases = {}   # folder -> (sheet, {name: Rect}) or None
+_built = {}     # anything else worth building once (placeholder frames...)
+stats = {"hits": 0, "misses": 0, "file_reads": 0}
+
+# Effect name -> color the frame is blended halfway towards
+EFFECT_TINTS = {
+    "hit": (255, 255, 255),
+    "stun": (255, 255, 0),
+    "crisis": (138, 43, 226),
+}
+
+
+def _convert(img):
+    # convert_alpha needs a display; offline tools run without one
+    return img.convert_alpha() if pygame.display.get_surface() else img
+
+
+def load_atlas(folder):
+    if folder not in _atlases:
+        base = os.path.join(ASSET_DIR, folder)
+        index = os.path.join(base, ATLAS_INDEX)
+        if os.path.exists(index):
+            with open(index) as f:
+                frames = json.load(f)["frames"]
+            sheet = _convert(pygame.image.load(os.path.join(base, ATLAS_IMAGE)))
+            stats["file_reads"] += 1
+            _atlases[folder] = (sheet, {name: pygame.Rect(r) for name, r in frames.items()})
+        else:
+            _atlases[folder] = None
+    return _atlases[folder]
+
+
+def load_image(folder, name, scale=None):
+    key = (folder, name, scale)
+    if key in _images:
+        stats["hits"] += 1
+        return _images[key]
+    stats["misses"] += 1
+
+    img = None
+    atlas = load_atlas(folder)
+    if atlas and name in atlas[1]:
+        img = atlas[0].subsurface(atlas[1][name])
+    else:
+        path = os.path.join(ASSET_DIR, folder, name)
+        if os.path.exists(path):
+            img = _convert(pygame.image.load(path))
+            stats["file_reads"] += 1
+    if img is not None and scale:
+        img = pygame.transform.scale(img, scale)
+    elif img is not None and atlas:
+        img = img.copy()  # don't keep the whole sheet alive through a subsurface
+    _images[key] = img
+    return img
+
+
+def cached(key, build):
+    # Build a surface (or anything else) once per process
+    if key not in _built:
+        _built[key] = build()
+    return _built[key]
+
+
+# === SOUNDS ===
+_sounds = {}
+_audio_ready = threading.Event()
+
+
+def start_audio(names):
+    # Start the mixer and load assets/sounds/<name> for each name in the background
+    def load():
+        try:
+            pygame.mixer.init()
+        except pygame.error:
+            return  # no audio device; stay silent
+        for name in names:
+            path = os.path.join(ASSET_DIR, "sounds", name)
+            if os.path.exists(path):
+                _sounds[name] = pygame.mixer.Sound(path)
+        _audio_ready.set()
+    threading.Thread(target=load, daemon=True).start()
+
+
+def play_sound(name):
+    if _audio_ready.is_set():
+        sound = _sounds.get(name)
+        if sound:
+            sound.play()
+
+
+def tint(img, color):
+    # Blend RGB halfway towards color, keeping per-pixel alpha
+    out = img.copy()
+    out.fill((128, 128, 128), special_flags=pygame.BLEND_RGB_MULT)
+    out.fill((color[0] // 2, color[1] // 2, color[2] // 2), special_flags=pygame.BLEND_RGB_ADD)
+    return out
+
+
+def build_variants(animations, effects=EFFECT_TINTS):
+    # {effect: (facing right, facing left)} of {anim: [frames]}, effect None = untinted
+    variants = {}
+    for effect in (None,) + tuple(effects):
+        table = ({}, {})
+        for anim, frames in animations.items():
+            base = frames if effect is None else [tint(f, effects[effect]) for f in frames]
+            table[0][anim] = base
+            table[1][anim] = [pygame.transform.flip(f, True, False) for f in base]
+        variants[effect] = table
+    return variants
+
+
+def clear():
+    _images.clear()
+    _atlases.clear()
+    _built.clear()
+
+
+# === ATLAS PACKER ===
+def pack_atlas(folder):
+    # Shelf-pack every PNG in assets/<folder> into one sheet
+    base = os.path.join(ASSET_DIR, folder)
+    names = sorted(n for n in os.listdir(base) if n.endswith(".png") and n != ATLAS_IMAGE)
+    if not names:
+        return 0
+    images = {n: pygame.image.load(os.path.join(base, n)) for n in names}
+    order = sorted(names, key=lambda n: (-images[n].get_height(), n))
+
+    frames = {}
+    x = y = shelf = width = 0
+    for name in order:
+        w, h = images[name].get_size()
+        if x and x + w > ATLAS_MAX_WIDTH:
+            x, y, shelf = 0, y + shelf + ATLAS_PADDING, 0
+        frames[name] = [x, y, w, h]
+        x += w + ATLAS_PADDING
+        shelf = max(shelf, h)
+        width = max(width, x)
+
+    sheet = pygame.Surface((width, y + shelf), pygame.SRCALPHA)
+    for name, rect in frames.items():
+        sheet.blit(images[name], rect[:2])
+    pygame.image.save(sheet, os.path.join(base, ATLAS_IMAGE))
+    with open(os.path.join(base, ATLAS_INDEX), "w") as f:
+        json.dump({"frames": frames}, f, indent=1)
+    return len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack sprite folders into texture atlases.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pack = sub.add_parser("pack")
+    pack.add_argument("folders", nargs="*", help="folders under assets/, e.g. sprites/player1")
+    pack.add_argument("--all", action="store_true", help="every folder under assets/sprites")
+    args = parser.parse_args()
+
+    folders = list(args.folders)
+    if args.all:
+        sprites = os.path.join(ASSET_DIR, "sprites")
+        folders += [f"sprites/{d}" for d in sorted(os.listdir(sprites))
+                    if os.path.isdir(os.path.join(sprites, d))]
+    for folder in folders:
+        print(f"{folder}: packed {pack_atlas(folder)} frames")
+
+
+if __name__ == "__main__":
+    main()
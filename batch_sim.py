@@ -0,0 +1,302 @@
+# Batched, vectorized version of simulation.Match for balance sweeps.
+# Every Fighter field is stored as a NumPy array of shape (2, n): row 0 is
+# P1 and row 1 is P2 of each of the n matches. One call to step() advances
+# every live match by one tick with a handful of array operations instead
+# of a Python loop over Fighter objects.
+#
+# The rules are the same as simulation.Fighter.step, including P1 moving
+# before P2 and pygame.Rect's float rounding, so a seeded batch produces
+# the same per-match results as the scalar engine (see verify()).
+
+import argparse
+import time
+
+import numpy as np
+
+import ai
+import simulation
+from simulation import (
+    SCREEN_WIDTH, GROUND_Y, ATTACK_COOLDOWN, HIT_WINDOW, ATTACK_DAMAGE,
+    HIT_FLASH_FRAMES, CRISIS_HEALTH, CRISIS_HEAL, CRISIS_PENALTY,
+    INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_ATTACK, P1_SPAWN, P2_SPAWN,
+)
+
+# Match states
+FIGHT = 0
+TRIVIA = 1
+GAME_OVER = 2
+
+FIGHTER_W = 60
+FIGHTER_H = 100
+
+
+def round_rect(v):
+    # pygame.Rect rounds float assignments half away from zero
+    t = np.trunc(v)
+    return (t + np.sign(v) * (np.abs(v - t) >= 0.5)).astype(np.int32)
+
+
+class BatchSim:
+    def __init__(self, n, seed=None, pve=True, policy=None):
+        self.n = n
+        if policy is not None and not policy.arrays:
+            raise ValueError(f"BatchSim needs an array policy (ai.Policy.arrays), not {policy.name()}")
+        self.policy = policy  # ai.Policy with an array act(); None = the built-in chase AI
+        self.rng = np.random.default_rng(seed)
+        self.pve = np.broadcast_to(np.asarray(pve, dtype=bool), (n,)).copy()
+        self.reset()
+
+    def reset(self, mask=None):
+        # Put every match (or only those in mask) back at the spawn points
+        n = self.n
+        if mask is None:
+            self.x = np.empty((2, n), dtype=np.int32)
+            self.y = np.empty((2, n), dtype=np.int32)
+            self.vel_y = np.empty((2, n), dtype=np.float64)
+            self.health = np.empty((2, n), dtype=np.int32)
+            self.display_health = np.empty((2, n), dtype=np.float64)
+            self.attack_cooldown = np.empty((2, n), dtype=np.int32)
+            self.attacking = np.empty((2, n), dtype=bool)
+            self.flip = np.empty((2, n), dtype=bool)
+            self.is_jumping = np.empty((2, n), dtype=bool)
+            self.hit_flash = np.empty((2, n), dtype=np.int32)
+            self.has_triggered_crisis = np.empty((2, n), dtype=bool)
+            self.state = np.empty(n, dtype=np.int8)
+            self.active_player = np.empty(n, dtype=np.int8)
+            self.tick = np.empty(n, dtype=np.int32)
+            mask = slice(None)
+
+        self.x[0, mask], self.x[1, mask] = P1_SPAWN[0], P2_SPAWN[0]
+        self.flip[0, mask], self.flip[1, mask] = P1_SPAWN[1], P2_SPAWN[1]
+        self.y[:, mask] = GROUND_Y - 100
+        self.vel_y[:, mask] = 0
+        self.health[:, mask] = 100
+        self.display_health[:, mask] = 100
+        self.attack_cooldown[:, mask] = 0
+        self.attacking[:, mask] = False
+        self.is_jumping[:, mask] = False
+        self.hit_flash[:, mask] = 0
+        self.has_triggered_crisis[:, mask] = False
+        self.state[mask] = FIGHT
+        self.active_player[mask] = -1
+        self.tick[mask] = 0
+
+    # === AI ===
+    def ai_inputs(self, me, other, rolls):
+        # Vectorized simulation.Fighter.ai_inputs; rolls is (n, 2) of randint(0, 100)
+        x, y = self.x[me], self.y[me]
+        ox, oy = self.x[other], self.y[other]
+        bits = np.where(x > ox + 60, INPUT_LEFT,
+                        np.where(x < ox - 60, INPUT_RIGHT, 0))
+        bits |= np.where((oy < y - 50) & (rolls[:, 0] < 2), INPUT_JUMP, 0)
+        bits |= np.where((np.abs(x - ox) < 80) & (rolls[:, 1] < 5), INPUT_ATTACK, 0)
+        return bits
+
+    def observe(self, me, other):
+        # ai.observe() for every match at once
+        fields = ("x", "y", "vel_y", "health", "attack_cooldown", "is_jumping",
+                  "has_triggered_crisis", "flip")
+        return ai.observe_arrays({k: getattr(self, k)[me] for k in fields},
+                                 {k: getattr(self, k)[other] for k in fields})
+
+    # === PHYSICS ===
+    def _step_side(self, me, other, inputs, live):
+        # Vectorized simulation.Fighter.step for one side of every live match
+        cd = self.attack_cooldown[me]
+        cooling = live & (cd > 0)
+        cd[cooling] -= 1
+        self.attacking[me, cooling] = False
+
+        left = live & (inputs & INPUT_LEFT != 0)
+        right = live & (inputs & INPUT_RIGHT != 0)
+        dx = np.where(left, -5, 0) + np.where(right, 5, 0)
+        self.flip[me, left] = True
+        self.flip[me, right] = False
+
+        jump = live & (inputs & INPUT_JUMP != 0) & ~self.is_jumping[me]
+        self.vel_y[me, jump] = -15
+        self.is_jumping[me, jump] = True
+
+        attack = live & (inputs & INPUT_ATTACK != 0) & (cd == 0)
+        self.attacking[me, attack] = True
+        cd[attack] = ATTACK_COOLDOWN
+
+        # Physics & Gravity
+        vel = self.vel_y[me]
+        vel[live] += 0.8
+        y = self.y[me]
+        landed = live & (y + vel >= GROUND_Y - FIGHTER_H)
+        airborne = live & ~landed
+        y[landed] = GROUND_Y - FIGHTER_H
+        vel[landed] = 0
+        self.is_jumping[me, landed] = False
+        y[airborne] = round_rect(y[airborne] + vel[airborne])
+
+        # Move & Screen Clamp
+        x = self.x[me]
+        x[live] = np.clip(x[live] + dx[live], 0, SCREEN_WIDTH - FIGHTER_W)
+
+        # Hitbox Logic
+        live_hit = live & self.attacking[me] & (HIT_WINDOW[0] <= cd) & (cd <= HIT_WINDOW[1])
+        ax = np.where(self.flip[me], x + FIGHTER_W // 2 - 80, x + FIGHTER_W // 2)
+        ay = y + 30
+        ox, oy = self.x[other], self.y[other]
+        hit = live_hit & (ax < ox + FIGHTER_W) & (ox < ax + 80) & (ay < oy + FIGHTER_H) & (oy < ay + 60)
+        self.health[other, hit] -= ATTACK_DAMAGE
+        self.hit_flash[other, hit] = HIT_FLASH_FRAMES
+
+        # Visuals
+        dh = self.display_health[me]
+        dh[live] += (self.health[me, live] - dh[live]) * 0.12
+        flashing = live & (self.hit_flash[me] > 0)
+        self.hit_flash[me, flashing] -= 1
+
+    def step(self, p1_inputs=0, p2_inputs=0, rolls=None):
+        # One tick for every match in FIGHT. Inputs are scalars or (n,) arrays
+        # of input bitmasks; P2 inputs are ignored for PVE matches.
+        n = self.n
+        live = self.state == FIGHT
+        if rolls is None:
+            rolls = self.rng.integers(0, 101, size=(n, 2))
+        p1_inputs = np.broadcast_to(np.asarray(p1_inputs, dtype=np.int32), (n,))
+        p2_inputs = np.broadcast_to(np.asarray(p2_inputs, dtype=np.int32), (n,))
+        self.tick[live] += 1
+
+        self._step_side(0, 1, p1_inputs, live)
+        # Rolls are drawn either way so the RNG stream doesn't depend on the policy
+        if self.policy:
+            ai_bits = self.policy.decide_obs(self.observe(1, 0), self.rng)
+        else:
+            ai_bits = self.ai_inputs(1, 0, rolls)
+        p2_inputs = np.where(self.pve, ai_bits, p2_inputs)
+        self._step_side(1, 0, p2_inputs, live)
+
+        # Check for Trivia (P1 first, same as the scalar elif)
+        low = (self.health <= CRISIS_HEALTH) & ~self.has_triggered_crisis
+        crisis1 = live & low[0]
+        crisis2 = live & ~crisis1 & low[1]
+        self.has_triggered_crisis[0, crisis1] = True
+        self.has_triggered_crisis[1, crisis2] = True
+        self.active_player[crisis1] = 0
+        self.active_player[crisis2] = 1
+        self.state[crisis1 | crisis2] = TRIVIA
+
+        over = live & ((self.health[0] <= 0) | (self.health[1] <= 0))
+        self.state[over] = GAME_OVER
+
+    def answer_trivia(self, correct):
+        # Resolve every match waiting in TRIVIA; correct is a bool or (n,) array
+        waiting = self.state == TRIVIA
+        correct = np.broadcast_to(np.asarray(correct, dtype=bool), (self.n,))
+        idx = np.flatnonzero(waiting)
+        side = self.active_player[idx]
+        hp = self.health[side, idx]
+        ok = correct[idx]
+        self.health[side, idx] = np.where(ok, np.minimum(hp + CRISIS_HEAL, 100), hp - CRISIS_PENALTY)
+        self.state[waiting] = FIGHT
+
+    def winners(self):
+        # Same as simulation.Match.winner for every match
+        over = self.state == GAME_OVER
+        p1_alive = self.health[0] > 0
+        p2_alive = self.health[1] > 0
+        return np.where(over & p1_alive & ~p2_alive, 1,
+                        np.where(over & p2_alive & ~p1_alive, 2, 0)).astype(np.int8)
+
+
+# === SCALAR PARITY CHECK ===
+class RollFeed:
+    # Stand-in for random.Random that hands the scalar AI the batch's rolls
+    def __init__(self):
+        self.rolls = []
+
+    def randint(self, a, b):
+        return int(self.rolls.pop(0))
+
+    def choice(self, seq):
+        return seq[0]
+
+
+def verify(matches=64, ticks=3000, seed=0):
+    # Step a batch and scalar Matches side by side; return mismatching match ids
+    batch = BatchSim(matches, seed=seed, pve=np.arange(matches) % 2 == 0)
+    input_rng = np.random.default_rng(seed + 1)
+    feeds = [RollFeed() for _ in range(matches)]
+    scalar = []
+    for i in range(matches):
+        m = simulation.Match("PVE" if batch.pve[i] else "PVP", question_db=[{"q": "?", "a": "A"}])
+        m.rng = feeds[i]
+        scalar.append(m)
+
+    bad = set()
+    for t in range(ticks):
+        correct = (np.arange(matches) + t) % 3 != 0
+        batch.answer_trivia(correct)
+        p1 = input_rng.integers(0, 16, size=matches)
+        p2 = input_rng.integers(0, 16, size=matches)
+        rolls = batch.rng.integers(0, 101, size=(matches, 2))
+        batch.step(p1, p2, rolls=rolls)
+        for i, m in enumerate(scalar):
+            if m.state == "TRIVIA":
+                m.submit_answer("A" if correct[i] else "")
+            feeds[i].rolls = list(rolls[i])
+            m.step(int(p1[i]), int(p2[i]))
+            for side, f in enumerate((m.p1, m.p2)):
+                if (f.rect.x, f.rect.y, f.health, f.attack_cooldown, f.hit_flash) != (
+                        batch.x[side, i], batch.y[side, i], batch.health[side, i],
+                        batch.attack_cooldown[side, i], batch.hit_flash[side, i]):
+                    bad.add(i)
+    return sorted(bad)
+
+
+# === RUN ===
+def main():
+    parser = argparse.ArgumentParser(description="Run many AI-vs-AI matches at once.")
+    parser.add_argument("--matches", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trivia-accuracy", type=float, default=0.5)
+    parser.add_argument("--verify", action="store_true", help="check against the scalar engine")
+    parser.add_argument("--policy", choices=["chase", "neural"], default="chase",
+                        help="P2 AI; neural is evaluated for every match in one batch")
+    parser.add_argument("--p1", choices=["chase", "neural", "idle"], default="chase",
+                        help="P1 AI (idle stands still, the old dummy opponent)")
+    args = parser.parse_args()
+
+    if args.verify:
+        bad = verify(seed=args.seed)
+        print("scalar parity: OK" if not bad else f"scalar parity: {len(bad)} matches differ {bad[:10]}")
+        return
+
+    policy = ai.get_policy("neural") if args.policy == "neural" else None
+    sim = BatchSim(args.matches, seed=args.seed, policy=policy)
+    p1_policy = ai.get_policy("neural") if args.p1 == "neural" else None
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        sim.answer_trivia(sim.rng.random(sim.n) < args.trivia_accuracy)
+        # P1 is an AI too, deciding from the state before this tick like a player would
+        if args.p1 == "chase":
+            p1_inputs = sim.ai_inputs(0, 1, sim.rng.integers(0, 101, size=(sim.n, 2)))
+        elif p1_policy:
+            p1_inputs = p1_policy.decide_obs(sim.observe(0, 1), sim.rng)
+        else:
+            p1_inputs = 0
+        sim.step(p1_inputs)
+        if not (sim.state != GAME_OVER).any():
+            break
+    elapsed = time.perf_counter() - start
+
+    winners = sim.winners()
+    total = int(sim.tick.sum())
+    print(f"{sim.n} matches, {total} match-ticks in {elapsed:.2f}s ({total / elapsed:,.0f} ticks/s)")
+    print(f"P1 wins {np.mean(winners == 1):.1%}  P2 wins {np.mean(winners == 2):.1%}  "
+          f"unfinished/draw {np.mean(winners == 0):.1%}")
+    for side, name, p in (("P1", args.p1, p1_policy), ("P2", args.policy, policy)):
+        if p:
+            stats = p.stats()
+            print(f"{side} policy {name}: {stats['mean_ms']:.3f} ms/batch (max {stats['max_ms']:.3f}, "
+                  f"budget {stats['budget_ms']:.3f}, over budget {stats['over_budget']}x)")
+
+
+if __name__ == "__main__":
+    main()
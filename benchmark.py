@@ -0,0 +1,308 @@
+# Reproducible performance benchmarks.
+# Drives main.Game / main.Fighter and test.py's sprite Fighter through
+# scripted input traces and measures headless ticks per second, rendered
+# frames per second (SDL dummy video driver), Python heap allocated per
+# frame, peak memory and main.py's time to first frame. Results are written as JSON and can be compared
+# against a stored baseline:
+#
+#   python benchmark.py --output bench.json
+#   python benchmark.py --baseline bench.json     # exit 1 on a regression
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import importlib.util
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+import simulation
+from simulation import INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_ATTACK
+
+# Metrics where a bigger number is better; everything else should go down
+HIGHER_IS_BETTER = {"ticks_per_sec", "frames_per_sec"}
+
+# Absolute differences below these are measurement noise, not regressions
+NOISE_FLOOR = {"alloc_bytes_per_frame": 256, "peak_traced_kb": 64, "peak_rss_mb": 8, "fighter_load_ms": 1,
+               "startup_ms": 30, "first_frame_ms": 30}
+
+
+# === INPUT TRACES ===
+# Each trace is a function (tick) -> (state, p1_input, p2_input, game_mode).
+# state is the Game state to hold for that tick; answers are typed in TRIVIA.
+def trace_idle(t):
+    return "FIGHT", 0, 0, "PVP"
+
+
+def trace_chase(t):
+    # P1 runs back and forth across the stage, the CPU chases
+    return "FIGHT", INPUT_RIGHT if (t // 90) % 2 == 0 else INPUT_LEFT, 0, "PVE"
+
+
+def trace_jump_spam(t):
+    p1 = INPUT_JUMP | (INPUT_RIGHT if (t // 60) % 2 == 0 else INPUT_LEFT)
+    p2 = INPUT_JUMP | (INPUT_LEFT if (t // 45) % 2 == 0 else INPUT_RIGHT)
+    return "FIGHT", p1, p2, "PVP"
+
+
+def trace_attack_trade(t):
+    # Walk in and trade hits until someone drops into a Cognitive Crisis
+    return "FIGHT", INPUT_RIGHT | INPUT_ATTACK, INPUT_LEFT | INPUT_ATTACK, "PVP"
+
+
+def trace_pause(t):
+    return "PAUSE", 0, 0, "PVP"
+
+
+def trace_trivia(t):
+    return "TRIVIA", 0, 0, "PVP"
+
+
+TRACES = {
+    "idle": trace_idle,
+    "chase_pve": trace_chase,
+    "jump_spam": trace_jump_spam,
+    "attack_trade": trace_attack_trade,
+    "pause_screen": trace_pause,
+    "trivia_screen": trace_trivia,
+}
+
+
+def drive(game, trace, t):
+    # Apply one tick of a trace to a Game (or a headless Match)
+    state, p1, p2, mode = trace(t)
+    if game.game_mode != mode:
+        game.game_mode = mode
+    if state == "FIGHT":
+        if game.state == "GAME_OVER":
+            game.reset_match()
+            game.state = "FIGHT"
+        elif game.state == "TRIVIA":
+            game.submit_answer("WRONG" if t % 2 else game.trivia_a)
+        game.step(p1, p2)
+    elif state == "TRIVIA":
+        if game.state != "TRIVIA":
+            game.trigger_crisis(game.p1)
+        if hasattr(game, "user_input"):
+            # Type a character every 10 ticks, clear the line every 20 characters
+            if t % 10 == 0:
+                game.user_input = "" if len(game.user_input) >= 20 else game.user_input + "X"
+    else:
+        game.state = state
+
+
+# === MEASUREMENT ===
+def timed(fn, count):
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return time.perf_counter() - start
+
+
+def alloc_per_frame(fn, count):
+    # Average Python heap allocated inside one frame, freed or not (bytes)
+    tracemalloc.start()
+    total = 0
+    for i in range(count):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(i)
+        total += tracemalloc.get_traced_memory()[1] - before
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return total / count, peak
+
+
+def bench_headless(name, trace, ticks):
+    match = simulation.Match("PVP", seed=1)
+    elapsed = timed(lambda t: drive(match, trace, t), ticks)
+    return {"ticks_per_sec": ticks / elapsed}
+
+
+def bench_rendered(name, trace, frames, dirty=False):
+    import main
+    from renderer import DirtyRenderer
+
+    if main.screen is None:
+        main.init_display()
+    game = main.Game()
+    game.rng.seed(1)
+    game.state = "FIGHT"
+    renderer = DirtyRenderer(game, main.screen) if dirty else None
+
+    def frame(t):
+        drive(game, trace, t)
+        if renderer:
+            renderer.draw()
+        else:
+            game.draw()
+
+    timed(frame, 30)  # warm the text cache and overlays
+    elapsed = timed(frame, frames)
+    alloc, peak = alloc_per_frame(frame, min(frames, 300))
+    return {
+        "frames_per_sec": frames / elapsed,
+        "alloc_bytes_per_frame": alloc,
+        "peak_traced_kb": peak / 1024,
+    }
+
+
+class ScriptedKeys:
+    # Stands in for pygame.key.get_pressed() in test.py's Fighter.update
+    def __init__(self, held=()):
+        self.held = set(held)
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+def load_sprite_game():
+    # Load test.py by path: `import test` would find the stdlib test package
+    # whenever this directory isn't first on sys.path (or test is already imported)
+    module = sys.modules.get("sprite_game")
+    if module is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test.py")
+        spec = importlib.util.spec_from_file_location("sprite_game", path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["sprite_game"] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+def bench_sprites(frames):
+    # test.py's sprite Fighter: asset loading, animation and the per-frame flip
+    sprite_game = load_sprite_game()
+
+    start = time.perf_counter()
+    for _ in range(20):
+        p1 = sprite_game.Fighter(200, 0, sprite_game.characters[0], 1)
+        p2 = sprite_game.Fighter(700, 0, sprite_game.characters[1], 2)
+    load_ms = (time.perf_counter() - start) / 20 * 1000
+    group = pygame.sprite.Group(p1, p2)
+    screen = sprite_game.screen
+
+    def frame(t):
+        if p1.health <= 0 or p2.health <= 0:
+            p1.health = p2.health = 100
+        phase = (t // 40) % 2
+        keys = ScriptedKeys([pygame.K_a if phase else pygame.K_d, pygame.K_g,
+                             pygame.K_RIGHT if phase else pygame.K_LEFT, pygame.K_j])
+        p1.update(keys, p2)
+        p2.update(keys, p1)
+        sprite_game.damage_numbers.update()
+        if sprite_game.particles is not None:
+            sprite_game.particles.update()
+        screen.blit(sprite_game.get_background(), (0, 0))
+        group.draw(screen)
+        p1.draw_health(screen)
+        p2.draw_health(screen)
+        if sprite_game.particles is not None:
+            sprite_game.particles.draw(screen)
+        sprite_game.damage_numbers.draw(screen)
+        pygame.display.flip()
+
+    timed(frame, 30)
+    elapsed = timed(frame, frames)
+    alloc, peak = alloc_per_frame(frame, min(frames, 300))
+    return {
+        "frames_per_sec": frames / elapsed,
+        "alloc_bytes_per_frame": alloc,
+        "peak_traced_kb": peak / 1024,
+        "fighter_load_ms": load_ms,
+    }
+
+
+def bench_startup(runs):
+    # Launch main.py --startup-time; median wall time to the first frame
+    # (interpreter start included) and the time main.py reports itself
+    wall, reported = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "main.py", "--startup-time"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+        wall.append((time.perf_counter() - start) * 1000)
+        reported.append(float(out.rsplit("time to first frame:", 1)[1].split()[0]))
+    return {"startup_ms": statistics.median(wall), "first_frame_ms": statistics.median(reported)}
+
+
+def run(quick=False):
+    ticks = 20000 if quick else 200000
+    frames = 300 if quick else 3000
+    results = {}
+    for name, trace in TRACES.items():
+        if trace(0)[0] == "FIGHT":
+            results[f"headless/{name}"] = bench_headless(name, trace, ticks)
+        results[f"render/{name}"] = bench_rendered(name, trace, frames)
+        results[f"render_dirty/{name}"] = bench_rendered(name, trace, frames, dirty=True)
+    results["sprites/test_py"] = bench_sprites(frames)
+    results["startup/main_py"] = bench_startup(3 if quick else 10)
+    results["process"] = {"peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    return results
+
+
+# === BASELINE ===
+def compare(results, baseline, tolerance):
+    # Returns (name, metric, old, new, change) for every metric that regressed
+    regressions = []
+    for name, metrics in results.items():
+        for metric, new in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not old or abs(new - old) < NOISE_FLOOR.get(metric, 0):
+                continue
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append((name, metric, old, new, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark simulation and rendering throughput.")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--quick", action="store_true", help="short runs for a smoke test")
+    args = parser.parse_args()
+
+    results = run(args.quick)
+    for name, metrics in results.items():
+        print(f"{name:<28}" + "  ".join(f"{k}={v:,.1f}" for k, v in metrics.items()))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "quick": args.quick,
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for name, metric, old, new, change in regressions:
+            print(f"REGRESSION {name} {metric}: {old:,.1f} -> {new:,.1f} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Sweep-and-prune broadphase along x.
+# Items (anything with a .rect) are kept sorted by rect.left. Fighters
+# barely move between ticks, so re-sorting the previous order with an
+# insertion sort is close to linear. A query bisects the sorted lefts for
+# the narrow band of items that can overlap the rect on x and only tests
+# those, so hit detection costs O((n + hitboxes) log n + overlaps) per
+# tick instead of testing every pair.
+
+from bisect import bisect_left, bisect_right
+
+
+class SweepAndPrune:
+    def __init__(self):
+        self.order = []
+        self.lefts = []
+        self.index = {}         # id(item) -> position in order
+        self.max_width = 0
+
+    def update(self, items):
+        # Re-sort for this tick; items may be added or removed between ticks
+        order = self.order
+        if len(order) != len(items) or any(id(a) not in self.index for a in items):
+            order = list(items)
+        for i in range(1, len(order)):
+            item = order[i]
+            left = item.rect.left
+            j = i - 1
+            while j >= 0 and order[j].rect.left > left:
+                order[j + 1] = order[j]
+                j -= 1
+            order[j + 1] = item
+        self.order = order
+        self.lefts = [item.rect.left for item in order]
+        self.index = {id(item): i for i, item in enumerate(order)}
+        self.max_width = max((item.rect.width for item in order), default=0)
+
+    def query(self, rect):
+        # Items whose rect overlaps `rect`
+        lo = bisect_right(self.lefts, rect.left - self.max_width)
+        hi = bisect_left(self.lefts, rect.right)
+        for i in range(lo, hi):
+            item = self.order[i]
+            if item.rect.colliderect(rect):
+                yield item
+
+    def nearest(self, item, accept):
+        # Closest item on x (by left edge) for which accept(other) is true
+        order, lefts = self.order, self.lefts
+        i = self.index[id(item)]
+        x = lefts[i]
+        left, right = i - 1, i + 1
+        while left >= 0 or right < len(order):
+            if right >= len(order) or (left >= 0 and x - lefts[left] <= lefts[right] - x):
+                other = order[left]
+                left -= 1
+            else:
+                other = order[right]
+                right += 1
+            if accept(other):
+                return other
+        return None
@@ -0,0 +1,313 @@
+# Combat effects that allocate nothing while a fight is running.
+#
+# DamageNumbers: floating "-15" text. The glyphs "-0123456789" are rendered
+# once per font/color, each distinct number is laid out once (a tuple of
+# glyphs and offsets), and live numbers sit in a fixed pool of slots
+# (parallel lists) that spawn() reuses, so a hit no longer creates a
+# sprite, a Font.render() and garbage 40 frames later.
+#
+# ParticleSystem: hit sparks, dust and crisis embers as one struct of
+# NumPy arrays (positions, velocities, lifetimes, kind parameters), all
+# preallocated at `capacity`. update() moves every particle in a handful
+# of in-place vector ops and compacts the survivors into the front of the
+# arrays; draw() writes them straight into the target surface's pixels
+# (surfarray.pixels2d), color-faded by age through a precomputed table.
+# All three write into preallocated scratch arrays (out=, index scatters
+# instead of boolean-mask copies), so a frame allocates no array data,
+# only slice views, and there is no Python object per particle.
+
+import random
+
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only the particle system needs it
+    np = None
+
+# === DAMAGE NUMBERS ===
+GLYPHS = "-0123456789"
+NUMBER_LIFE = 40            # Ticks a number stays up
+NUMBER_RISE = 3             # Pixels per tick
+
+
+class DamageNumbers:
+    def __init__(self, font, color, capacity=32):
+        self.glyphs = {ch: font.render(ch, True, color) for ch in GLYPHS}
+        self.layouts = {}           # value -> ((glyph, x offset), ...), width, height
+        self.capacity = capacity
+        self.x = [0] * capacity     # Center x
+        self.y = [0] * capacity     # Top y
+        self.life = [0] * capacity
+        self.layout = [None] * capacity
+        self.cursor = 0             # Next slot to try
+
+    def text_layout(self, value):
+        layout = self.layouts.get(value)
+        if layout is None:
+            parts, x = [], 0
+            for ch in f"-{value}":
+                glyph = self.glyphs[ch]
+                parts.append((glyph, x))
+                x += glyph.get_width()
+            layout = (tuple(parts), x, self.glyphs["0"].get_height())
+            self.layouts[value] = layout
+        return layout
+
+    def spawn(self, x, y, value):
+        # Take a free slot, or the one closest to expiring when all are busy
+        life = self.life
+        slot = self.cursor
+        for _ in range(self.capacity):
+            if life[slot] <= 0:
+                break
+            slot = (slot + 1) % self.capacity
+        else:
+            slot = life.index(min(life))
+        self.cursor = (slot + 1) % self.capacity
+        layout = self.text_layout(value)
+        self.x[slot] = x
+        self.y[slot] = y - layout[2] // 2   # spawn() takes the center, like the old rect
+        self.life[slot] = NUMBER_LIFE
+        self.layout[slot] = layout
+
+    def update(self):
+        life, y = self.life, self.y
+        for i in range(self.capacity):
+            if life[i] > 0:
+                life[i] -= 1
+                y[i] -= NUMBER_RISE
+
+    def draw(self, surface):
+        for i in range(self.capacity):
+            if self.life[i] > 0:
+                parts, width, _ = self.layout[i]
+                left = self.x[i] - width // 2
+                top = self.y[i]
+                for glyph, dx in parts:
+                    surface.blit(glyph, (left + dx, top))
+
+    def clear(self):
+        self.life = [0] * self.capacity
+
+    def active(self):
+        return sum(1 for life in self.life if life > 0)
+
+
+# === PARTICLES ===
+# name: (speed range, angle range in degrees (0 = right, -90 = up), life range,
+#        gravity, drag, size, start color, end color)
+KINDS = {
+    "spark":  ((4.0, 9.0), (-180, 180), (10, 18), 0.35, 0.90, 2, (255, 255, 160), (200, 40, 0)),
+    "dust":   ((0.5, 2.0), (-170, -10), (18, 30), -0.02, 0.92, 3, (170, 160, 150), (70, 65, 60)),
+    "crisis": ((0.3, 1.2), (-120, -60), (30, 50), -0.05, 0.98, 2, (200, 120, 255), (60, 0, 90)),
+}
+FADE_STEPS = 16             # Color steps from birth to death
+
+
+class ParticleSystem:
+    def __init__(self, capacity=8192, bounds=(1000, 500), seed=None):
+        if np is None:
+            raise RuntimeError("particles need numpy (pip install numpy)")
+        self.capacity = capacity
+        self.bounds = bounds
+        self.names = list(KINDS)
+        self.kind_ids = {name: i for i, name in enumerate(self.names)}
+        params = [KINDS[name] for name in self.names]
+        self.size_of = np.array([p[5] for p in params], dtype=np.intp)
+        self.colors = [(p[6], p[7]) for p in params]
+
+        # Live particles are always [0:count]
+        self.count = 0
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int16)
+        self.max_life = np.ones(capacity, dtype=np.int16)
+        self.kind = np.zeros(capacity, dtype=np.uint8)
+        self.gravity = np.zeros(capacity, dtype=np.float32)
+        self.drag = np.zeros(capacity, dtype=np.float32)
+
+        # Scratch, reused every tick
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._tmp = np.zeros(capacity, dtype=bool)
+        # One spare slot at the end of every packing buffer takes the
+        # elements that are dropped (see pack_slots)
+        self._slot = np.zeros(capacity, dtype=np.intp)
+        self._swap = {name: np.zeros((capacity + 1,) + getattr(self, name).shape[1:],
+                                     dtype=getattr(self, name).dtype) for name in
+                      ("pos", "vel", "life", "max_life", "kind", "gravity", "drag")}
+        self._ix = np.zeros(capacity, dtype=np.intp)
+        self._iy = np.zeros(capacity, dtype=np.intp)
+        self._shade = np.zeros(capacity, dtype=np.intp)
+        self._row = np.zeros(capacity, dtype=np.intp)
+        self._rand = np.zeros((capacity, 3), dtype=np.float64)
+        self._trig = np.zeros(capacity, dtype=np.float64)
+        self._color = np.zeros(capacity, dtype=np.uint32)
+        self._size = np.zeros(capacity, dtype=np.intp)
+        self._mask = np.zeros(capacity, dtype=bool)
+        self._x = np.zeros(capacity, dtype=np.intp)
+        self._y = np.zeros(capacity, dtype=np.intp)
+        # Particles at least k+1 pixels wide, packed per k (draw)
+        size = int(self.size_of.max())
+        self._px = np.zeros((size, capacity + 1), dtype=np.intp)
+        self._py = np.zeros((size, capacity + 1), dtype=np.intp)
+        self._pc = np.zeros((size, capacity + 1), dtype=np.uint32)
+        self.rng = np.random.default_rng(seed if seed is not None else random.getrandbits(32))
+        self.lut = None             # (surface format key, mapped colors [kind, step])
+        self.dropped = 0
+
+    def emit(self, kind, x, y, count):
+        # Burst of `count` particles of one kind at (x, y)
+        (s0, s1), (a0, a1), (l0, l1), gravity, drag = KINDS[kind][:5]
+        free = self.capacity - self.count
+        if count > free:
+            self.dropped += count - free
+            count = free
+        if count <= 0:
+            return
+        lo, hi = self.count, self.count + count
+        r = self._rand[:count]
+        self.rng.random(out=r)
+        # Scale the random columns in place: speed, angle (radians), life
+        speed, angle, life = r[:, 0], r[:, 1], r[:, 2]
+        speed *= s1 - s0
+        speed += s0
+        angle *= a1 - a0
+        angle += a0
+        np.radians(angle, out=angle)
+        life *= l1 - l0
+        life += l0
+        trig = self._trig[:count]
+        self.pos[lo:hi, 0] = x
+        self.pos[lo:hi, 1] = y
+        np.cos(angle, out=trig)
+        trig *= speed
+        np.copyto(self.vel[lo:hi, 0], trig, casting="unsafe")
+        np.sin(angle, out=trig)
+        trig *= speed
+        np.copyto(self.vel[lo:hi, 1], trig, casting="unsafe")
+        np.copyto(self.life[lo:hi], life, casting="unsafe")
+        self.max_life[lo:hi] = self.life[lo:hi]
+        self.kind[lo:hi] = self.kind_ids[kind]
+        self.gravity[lo:hi] = gravity
+        self.drag[lo:hi] = drag
+        self.count = hi
+
+    def pack_slots(self, keep):
+        # Where each element lands when the `keep` ones are packed to the
+        # front: slot[i] for a kept element, the spare slot (capacity) for
+        # the rest. Scatter with buffer[slot] = values. np.compress would do
+        # this too, but allocates an index array on every call.
+        n = len(keep)
+        slot, drop = self._slot[:n], self._tmp[:n]
+        np.copyto(slot, keep, casting="unsafe")
+        np.cumsum(slot, out=slot)
+        slot -= 1
+        np.logical_not(keep, out=drop)
+        np.copyto(slot, self.capacity, where=drop)
+        return slot
+
+    def update(self):
+        n = self.count
+        if not n:
+            return
+        pos, vel = self.pos[:n], self.vel[:n]
+        vel[:, 1] += self.gravity[:n]
+        drag = self.drag[:n]
+        vel[:, 0] *= drag           # Per column: the broadcast vel *= drag[:, None] buffers
+        vel[:, 1] *= drag
+        pos += vel
+        self.life[:n] -= 1
+
+        # Survivors: still alive and on screen
+        alive, tmp = self._alive[:n], self._tmp[:n]
+        np.greater(self.life[:n], 0, out=alive)
+        for axis, limit in enumerate(self.bounds):
+            np.greater_equal(pos[:, axis], 0, out=tmp)
+            alive &= tmp
+            np.less(pos[:, axis], limit, out=tmp)
+            alive &= tmp
+        kept = int(np.count_nonzero(alive))
+        if kept < n:
+            slot = self.pack_slots(alive)
+            for name, swap in self._swap.items():
+                array = getattr(self, name)
+                swap[slot] = array[:n]
+                array[:kept] = swap[:kept]
+            self.count = kept
+
+    def fade_table(self, surface):
+        key = (surface.get_bitsize(), surface.get_masks())
+        if self.lut is None or self.lut[0] != key:
+            table = np.zeros((len(self.names), FADE_STEPS), dtype=np.uint32)
+            for k, (start, end) in enumerate(self.colors):
+                for step in range(FADE_STEPS):
+                    t = step / (FADE_STEPS - 1)
+                    color = [round(a + (b - a) * t) for a, b in zip(start, end)]
+                    table[k, step] = surface.map_rgb(color)
+            self.lut = (key, table)
+        return self.lut[1]
+
+    def draw(self, surface):
+        n = self.count
+        if not n:
+            return
+        table = self.fade_table(surface)
+        ix, iy, shade = self._ix[:n], self._iy[:n], self._shade[:n]
+        np.copyto(ix, self.pos[:n, 0], casting="unsafe")
+        np.copyto(iy, self.pos[:n, 1], casting="unsafe")
+
+        # Age -> fade step; kind k's colors start at row k of the table.
+        # Everything is widened to intp first: ufuncs on mixed integer types
+        # (and np.take in its default mode) go through temporary buffers.
+        row, tmp, sizes = self._row[:n], self._x[:n], self._size[:n]
+        np.copyto(shade, self.max_life[:n], casting="unsafe")
+        np.copyto(tmp, self.life[:n], casting="unsafe")
+        shade -= tmp
+        shade *= FADE_STEPS - 1
+        np.copyto(tmp, self.max_life[:n], casting="unsafe")
+        shade //= tmp
+        np.copyto(row, self.kind[:n], casting="unsafe")
+        np.take(self.size_of, row, out=sizes, mode="clip")
+        row *= FADE_STEPS
+        shade += row
+        colors = np.take(table.ravel(), shade, out=self._color[:n], mode="clip")
+
+        # Square particles: one scatter write per pixel offset of the largest
+        # size. Offset (dx, dy) covers the particles wider than max(dx, dy);
+        # those are packed once per width, not once per offset.
+        size = self._px.shape[0]
+        mask = self._mask[:n]
+        packed = []
+        for k in range(size):
+            np.greater(sizes, k, out=mask)
+            m = int(np.count_nonzero(mask))
+            if m == n:
+                packed.append((ix, iy, colors))
+            else:
+                slot = self.pack_slots(mask)
+                self._px[k, slot] = ix
+                self._py[k, slot] = iy
+                self._pc[k, slot] = colors
+                packed.append((self._px[k, :m], self._py[k, :m], self._pc[k, :m]))
+
+        w, h = surface.get_size()
+        pixels = pygame.surfarray.pixels2d(surface)
+        try:
+            for dx in range(size):
+                for dy in range(size):
+                    px, py, c = packed[max(dx, dy)]
+                    m = len(c)
+                    if not m:
+                        continue
+                    x, y = self._x[:m], self._y[:m]
+                    np.add(px, dx, out=x)
+                    np.minimum(x, w - 1, out=x)
+                    np.add(py, dy, out=y)
+                    np.minimum(y, h - 1, out=y)
+                    pixels[x, y] = c
+        finally:
+            del pixels
+
+    def clear(self):
+        self.count = 0
@@ -0,0 +1,336 @@
+# Reinforcement-learning environments.
+# FightEnv is one PVE match (simulation.Match) behind the usual
+# reset() / step() interface: the agent plays P1 against a CPU P2, the
+# Cognitive Crisis is answered automatically with trivia_accuracy, and an
+# episode ends at GAME_OVER (terminated) or after max_ticks (truncated).
+#
+#   obs, info = env.reset(seed=1)
+#   obs, reward, terminated, truncated, info = env.step(action)
+#
+# Observations are ai.observe() rows (OBS_SIZE floats, P1's point of
+# view); an action is the four booleans (move_left, move_right, do_jump,
+# do_attack) or an input bitmask. The reward is damage dealt minus damage
+# taken (in units of max health), plus 1 for a win and -1 for a loss.
+#
+# VecFightEnv runs num_envs matches split across worker processes, each
+# stepping its share as one batch_sim.BatchSim. Observations, actions,
+# rewards and done flags live in one shared-memory block that the parent
+# and the workers map as NumPy arrays; the pipes only carry a short
+# command per step. Finished matches reset themselves (the obs returned
+# for them is the first of the next episode). Batched opponents have to
+# play from observation arrays, so VecFightEnv takes VEC_OPPONENTS only;
+# FightEnv takes every ai.POLICIES name and "lookahead".
+#
+#   python env.py bench --envs 8192 --workers 4
+#   python env.py check             # build and step every advertised opponent
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import ai
+import simulation
+from ai import OBS_SIZE, ACTION_BITS, actions_to_bits
+from batch_sim import BatchSim, GAME_OVER
+from question_store import QuestionStore
+
+
+# Opponents each env accepts (None = the built-in CPU)
+OPPONENTS = (None,) + tuple(ai.POLICIES) + ("lookahead",)
+VEC_OPPONENTS = (None, "chase") + tuple(name for name, p in ai.POLICIES.items() if getattr(p, "arrays", False))
+
+
+def to_bits(action):
+    # Four booleans or a bitmask -> bitmask
+    if isinstance(action, (int, np.integer)):
+        return int(action)
+    return int(actions_to_bits(np.asarray(action, dtype=bool).reshape(1, 4))[0])
+
+
+class FightEnv:
+    def __init__(self, opponent=None, trivia_accuracy=0.5, max_ticks=60 * simulation.FPS, question_db=None):
+        # opponent: ai policy name for P2, None = the built-in CPU
+        if opponent not in OPPONENTS:
+            raise ValueError(f"unknown opponent {opponent!r}; choose from {OPPONENTS}")
+        self.policy = ai.get_policy(opponent) if opponent else None
+        self.trivia_accuracy = trivia_accuracy
+        self.max_ticks = max_ticks
+        # Questions only matter for who answers right; a one-question bank by default
+        self.question_db = question_db or QuestionStore(questions=[{"q": "?", "a": "A"}])
+        self.rng = random.Random()
+        self.match = None
+        self.obs = np.zeros((1, OBS_SIZE), dtype=np.float32)
+
+    def observe(self):
+        return ai.observe([(self.match.p1, self.match.p2)], self.obs)[0]
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        self.match = simulation.Match("PVE", seed=self.rng.getrandbits(32), question_db=self.question_db)
+        self.match.ai_policy = self.policy
+        return self.observe(), {"seed": self.match.seed}
+
+    def step(self, action):
+        m = self.match
+        me, opp = m.p1, m.p2
+        my_health, opp_health = me.health, opp.health
+        m.step(to_bits(action))
+        if m.state == "TRIVIA":
+            m.submit_answer(m.trivia_a if self.rng.random() < self.trivia_accuracy else "")
+        reward = ((opp_health - opp.health) - (my_health - me.health)) / 100
+        terminated = m.state == "GAME_OVER"
+        if terminated:
+            reward += {1: 1, 2: -1}.get(m.winner(), 0)
+        truncated = not terminated and m.tick >= self.max_ticks
+        return self.observe(), reward, terminated, truncated, {"tick": m.tick, "winner": m.winner()}
+
+    def close(self):
+        # Stops the lookahead opponent's worker processes
+        if hasattr(self.policy, "close"):
+            self.policy.close()
+
+
+# === VECTORIZED ===
+def _layout(num_envs):
+    # name -> (dtype, shape, byte offset) of every shared array, total size
+    fields = (
+        ("obs", np.float32, (num_envs, OBS_SIZE)),
+        ("actions", np.bool_, (num_envs, 4)),
+        ("rewards", np.float32, (num_envs,)),
+        ("terminated", np.bool_, (num_envs,)),
+        ("truncated", np.bool_, (num_envs,)),
+        ("winners", np.int8, (num_envs,)),
+    )
+    layout, offset = {}, 0
+    for name, dtype, shape in fields:
+        offset = -(-offset // 8) * 8  # keep every array 8-byte aligned
+        layout[name] = (dtype, shape, offset)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return layout, offset
+
+
+def _views(buf, num_envs):
+    layout, _ = _layout(num_envs)
+    return {name: np.ndarray(shape, dtype, buf, offset) for name, (dtype, shape, offset) in layout.items()}
+
+
+class _Shard:
+    # Envs lo:hi of the shared arrays, stepped as one BatchSim
+    def __init__(self, views, lo, hi, opponent, trivia_accuracy, max_ticks):
+        self.v = {name: a[lo:hi] for name, a in views.items()}
+        policy = ai.get_policy(opponent) if opponent not in (None, "chase") else None
+        self.sim = BatchSim(hi - lo, policy=policy)
+        self.trivia_accuracy = trivia_accuracy
+        self.max_ticks = max_ticks
+        self.health = self.sim.health.copy()
+
+    def reset(self, seed):
+        sim = self.sim
+        sim.rng = np.random.default_rng(seed)
+        sim.reset(np.ones(sim.n, dtype=bool))
+        self.health[:] = sim.health
+        self.v["obs"][:] = sim.observe(0, 1)
+
+    def step(self):
+        sim, v = self.sim, self.v
+        sim.step(actions_to_bits(v["actions"]))
+        sim.answer_trivia(sim.rng.random(sim.n) < self.trivia_accuracy)
+
+        lost = self.health - sim.health
+        reward = (lost[1] - lost[0]) / 100
+        done = sim.state == GAME_OVER
+        winners = np.where(done, sim.winners(), 0)
+        reward += (winners == 1).astype(np.float32) - (winners == 2)
+        v["rewards"][:] = reward
+        v["terminated"][:] = done
+        v["truncated"][:] = ~done & (sim.tick >= self.max_ticks)
+        v["winners"][:] = winners
+
+        ended = done | v["truncated"]
+        if ended.any():
+            sim.reset(ended)
+        self.health[:] = sim.health
+        v["obs"][:] = sim.observe(0, 1)
+
+
+def _worker(conn, shm_name, num_envs, lo, hi, config):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    shard = _Shard(_views(shm.buf, num_envs), lo, hi, **config)
+    try:
+        while True:
+            cmd, arg = conn.recv()
+            if cmd == "step":
+                shard.step()
+            elif cmd == "reset":
+                shard.reset(arg)
+            else:
+                break
+            conn.send(None)
+    finally:
+        del shard
+        shm.close()
+
+
+class VecFightEnv:
+    def __init__(self, num_envs, workers=None, opponent="chase", trivia_accuracy=0.5,
+                 max_ticks=60 * simulation.FPS):
+        # workers=0 steps everything in this process (same shared arrays)
+        if opponent not in VEC_OPPONENTS:
+            raise ValueError(f"VecFightEnv needs an opponent that plays from observation arrays, "
+                             f"one of {VEC_OPPONENTS}; got {opponent!r} (FightEnv takes any of {OPPONENTS})")
+        if workers is None:
+            workers = min(os.cpu_count() or 1, max(1, num_envs // 1024))
+        self.num_envs = num_envs
+        _, size = _layout(num_envs)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        views = _views(self.shm.buf, num_envs)
+        self.obs = views["obs"]
+        self.actions = views["actions"]
+        self.rewards = views["rewards"]
+        self.terminated = views["terminated"]
+        self.truncated = views["truncated"]
+        self.winners = views["winners"]
+
+        config = {"opponent": opponent, "trivia_accuracy": trivia_accuracy, "max_ticks": max_ticks}
+        bounds = np.linspace(0, num_envs, max(1, workers) + 1).astype(int)
+        self.shards = []
+        self.pipes = []
+        if workers == 0:
+            self.shards.append(_Shard(views, 0, num_envs, **config))
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                parent, child = ctx.Pipe()
+                ctx.Process(target=_worker, args=(child, self.shm.name, num_envs, lo, hi, config),
+                            daemon=True).start()
+                self.pipes.append(parent)
+
+    def _run(self, cmd, args):
+        for shard, arg in zip(self.shards, args):
+            getattr(shard, cmd)(*([] if arg is None else [arg]))
+        for conn, arg in zip(self.pipes, args):
+            conn.send((cmd, arg))
+        for conn in self.pipes:
+            conn.recv()
+
+    def reset(self, seed=None):
+        # Every shard gets its own stream from the one seed
+        n = len(self.shards) + len(self.pipes)
+        seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(n)]
+        self._run("reset", seeds)
+        return self.obs, {}
+
+    def step(self, actions):
+        # actions: (num_envs, 4) booleans or (num_envs,) bitmasks. The
+        # returned arrays are the shared buffers, overwritten by the next step
+        actions = np.asarray(actions)
+        if actions.ndim == 1:
+            self.actions[:] = (actions[:, None] & np.array(ACTION_BITS)) != 0
+        else:
+            self.actions[:] = actions
+        self._run("step", [None] * (len(self.shards) + len(self.pipes)))
+        return self.obs, self.rewards, self.terminated, self.truncated, {"winners": self.winners}
+
+    def close(self):
+        for conn in self.pipes:
+            try:
+                conn.send(("close", None))
+            except OSError:
+                pass
+        self.pipes = []
+        self.shards = []
+        self.obs = self.actions = self.rewards = self.terminated = self.truncated = self.winners = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # the caller still holds one of the arrays; freed with it
+        self.shm.unlink()
+
+
+def bench(num_envs, workers, steps, seed):
+    env = VecFightEnv(num_envs, workers)
+    env.reset(seed)
+    rng = np.random.default_rng(seed)
+    actions = rng.random((steps, num_envs, 4)) < 0.3 if steps * num_envs <= 1 << 24 else None
+    episodes = wins = 0
+    start = time.perf_counter()
+    for i in range(steps):
+        env.step(actions[i] if actions is not None else rng.random((num_envs, 4)) < 0.3)
+        episodes += int(env.terminated.sum() + env.truncated.sum())
+        wins += int((env.winners == 1).sum())
+    elapsed = time.perf_counter() - start
+    env.close()
+    print(f"{num_envs} envs x {steps} steps on {workers} workers: "
+          f"{num_envs * steps / elapsed:,.0f} env steps/s, {episodes} episodes, P1 won {wins}")
+
+
+def check(steps=200, seed=0):
+    # Every advertised opponent: FightEnv and (where supported) VecFightEnv
+    # must build and step; the rest must be refused by VecFightEnv up front
+    rng = np.random.default_rng(seed)
+    ok = True
+    for opponent in OPPONENTS:
+        results = []
+        env = FightEnv(opponent)
+        try:
+            env.reset(seed)
+            for _ in range(steps):
+                _, _, terminated, truncated, _ = env.step(rng.random(4) < 0.3)
+                if terminated or truncated:
+                    env.reset()
+            results.append("FightEnv ok")
+        except Exception as exc:
+            results.append(f"FightEnv FAILED ({exc!r})")
+            ok = False
+        finally:
+            env.close()
+        try:
+            vec = VecFightEnv(16, workers=0, opponent=opponent)
+        except ValueError:
+            if opponent in VEC_OPPONENTS:
+                results.append("VecFightEnv FAILED (refused)")
+                ok = False
+            else:
+                results.append("VecFightEnv refused")
+        else:
+            try:
+                vec.reset(seed)
+                for _ in range(steps):
+                    vec.step(rng.random((16, 4)) < 0.3)
+                results.append("VecFightEnv ok")
+            except Exception as exc:
+                results.append(f"VecFightEnv FAILED ({exc!r})")
+                ok = False
+            finally:
+                vec.close()
+        print(f"{str(opponent):<10}" + ", ".join(results))
+    print("opponents: OK" if ok else "opponents: FAILED")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RL environment tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("bench", help="random-action throughput of VecFightEnv")
+    b.add_argument("--envs", type=int, default=4096)
+    b.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    b.add_argument("--steps", type=int, default=1000)
+    b.add_argument("--seed", type=int, default=0)
+    c = sub.add_parser("check", help="build and step every advertised opponent")
+    c.add_argument("--steps", type=int, default=200)
+    c.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.command == "bench":
+        bench(args.envs, args.workers, args.steps, args.seed)
+    elif not check(args.steps, args.seed):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# System font lookup with an on-disk cache.
+# pygame.font.SysFont scans every system font directory (or runs fc-list)
+# the first time it is called, which can take seconds on a cold machine.
+# sys_font() resolves each (name, bold, italic) once, remembers the file
+# path in a small JSON cache and opens the file directly on later runs.
+# The scan only happens again for a font we haven't seen or whose file
+# has disappeared.
+
+import json
+import os
+
+import pygame
+
+CACHE_PATH = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                          "mementos-melee", "fonts.json")
+
+_resolved = None    # "name|bold|italic" -> [path or None, fake bold, fake italic]
+
+
+def _load_cache():
+    global _resolved
+    try:
+        with open(CACHE_PATH) as f:
+            _resolved = json.load(f)
+    except (OSError, ValueError):
+        _resolved = {}
+
+
+def _save_cache():
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(CACHE_PATH, "w") as f:
+            json.dump(_resolved, f, indent=1)
+    except OSError:
+        pass  # read-only home: we just resolve again next run
+
+
+def resolve(name, bold=False, italic=False):
+    # Same choice SysFont would make: the styled file if the family has one,
+    # else the regular file with emulated style, else pygame's default font
+    if _resolved is None:
+        _load_cache()
+    key = f"{name}|{int(bold)}|{int(italic)}"
+    entry = _resolved.get(key)
+    if entry is None or (entry[0] is not None and not os.path.exists(entry[0])):
+        path = pygame.font.match_font(name, bold, italic)
+        plain = pygame.font.match_font(name) if (bold or italic) else path
+        styled = path is not None and path != plain
+        entry = [path, bold and not styled, italic and not styled]
+        _resolved[key] = entry
+        _save_cache()
+    return entry
+
+
+def sys_font(name, size, bold=False, italic=False):
+    path, fake_bold, fake_italic = resolve(name, bold, italic)
+    if path is None:
+        # SysFont's fallback is the default font, emboldened if asked
+        font = pygame.font.Font(None, size)
+        fake_bold, fake_italic = bold, italic
+    else:
+        font = pygame.font.Font(path, size)
+    font.set_bold(fake_bold)
+    font.set_italic(fake_italic)
+    return font
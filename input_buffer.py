@@ -0,0 +1,227 @@
+# Event-driven input with a per-player history and motion commands.
+# pygame.key.get_pressed() only shows what is held at the moment a tick
+# runs, so a tap that starts and ends between two ticks used to vanish.
+# InputBuffer follows KEYDOWN / KEYUP instead: every key press is stamped
+# with time.perf_counter(), and the input frame for a tick is "held now or
+# pressed since the last tick".
+#
+# Every tick's frame goes into a fixed-size ring per player (history()).
+# Motion commands (numpad notation relative to facing, G = attack):
+#   236G  quarter-circle forward + attack      (fireball)
+#   623G  forward, down, down-forward + attack (uppercut)
+#   214G  quarter-circle back + attack         (backfire)
+# are compiled once into a single Aho-Corasick automaton over direction
+# changes and attack presses, so recognising any number of commands costs
+# one table lookup per new symbol per tick, not a scan of the history.
+#
+# Latency: each action's press time is carried to the tick that consumes
+# it and then to the frame that first shows that tick; frame_shown()
+# (called right after the display flip) records press -> display per
+# action into a rolling window.
+
+import time
+from array import array
+
+import pygame
+
+from simulation import KEYMAP, INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_ATTACK
+
+INPUT_DOWN = 16                 # Only used for motion commands, never sent to the simulation
+SIM_BITS = INPUT_LEFT | INPUT_RIGHT | INPUT_JUMP | INPUT_ATTACK
+DOWN_KEYS = {1: pygame.K_s, 2: pygame.K_DOWN}
+
+ACTIONS = {INPUT_LEFT: "left", INPUT_RIGHT: "right", INPUT_JUMP: "jump",
+           INPUT_ATTACK: "attack", INPUT_DOWN: "down"}
+
+HISTORY = 64                    # Ticks kept per player
+MOTION_GAP = 10                 # Max ticks between two symbols of a command
+LATENCY_WINDOW = 256            # Samples kept per action
+
+COMMANDS = {
+    "fireball": "236G",         # quarter-circle forward
+    "uppercut": "623G",         # forward, down, down-forward
+    "backfire": "214G",         # quarter-circle back
+}
+
+ATTACK_SYMBOL = 10              # Symbols 1-9 are numpad directions (5, neutral, is never fed)
+
+
+def direction(bits, facing_left):
+    # Numpad direction of a frame, forward = the way the fighter faces
+    h = bool(bits & INPUT_RIGHT) - bool(bits & INPUT_LEFT)
+    if facing_left:
+        h = -h
+    v = bool(bits & INPUT_JUMP) - bool(bits & INPUT_DOWN)
+    return 5 + h + 3 * v
+
+
+class MotionAutomaton:
+    # Aho-Corasick over symbols 0-10; goto[state][symbol] is a full DFA table
+    def __init__(self, commands=COMMANDS):
+        self.names = []
+        goto = [[0] * (ATTACK_SYMBOL + 1)]
+        output = [None]
+        children = [{}]
+        for name, notation in commands.items():
+            state = 0
+            for ch in notation:
+                symbol = ATTACK_SYMBOL if ch == "G" else int(ch)
+                if symbol not in children[state]:
+                    children.append({})
+                    goto.append([0] * (ATTACK_SYMBOL + 1))
+                    output.append(None)
+                    children[state][symbol] = len(children) - 1
+                state = children[state][symbol]
+            output[state] = name
+            self.names.append(name)
+
+        # Breadth-first: fill in failure transitions so every (state, symbol) is defined
+        fail = [0] * len(children)
+        queue = []
+        for symbol, child in children[0].items():
+            goto[0][symbol] = child
+            queue.append(child)
+        while queue:
+            state = queue.pop(0)
+            if output[state] is None:
+                output[state] = output[fail[state]]
+            for symbol in range(ATTACK_SYMBOL + 1):
+                child = children[state].get(symbol)
+                if child is None:
+                    goto[state][symbol] = goto[fail[state]][symbol]
+                else:
+                    fail[child] = goto[fail[state]][symbol]
+                    goto[state][symbol] = child
+                    queue.append(child)
+        self.goto = [tuple(row) for row in goto]
+        self.output = output
+
+
+class PlayerInput:
+    def __init__(self, player, automaton):
+        left, right, jump, attack = KEYMAP[player]
+        self.keys = {left: INPUT_LEFT, right: INPUT_RIGHT, jump: INPUT_JUMP,
+                     attack: INPUT_ATTACK, DOWN_KEYS[player]: INPUT_DOWN}
+        self.held = 0
+        self.tapped = 0                 # Pressed since the last tick
+        self.pressed_at = {}            # action bit -> first press time not yet in a tick
+        self.in_flight = []             # (action bit, press time) consumed, not yet displayed
+
+        self.automaton = automaton
+        self.state = 0
+        self.last_symbol_tick = 0
+        self.last_direction = 5
+        self.commands = []              # Commands completed on the latest tick
+
+        self.frames = array('H', bytes(2 * HISTORY))
+        self.times = array('d', bytes(8 * HISTORY))
+        self.cursor = 0
+        self.ticks = 0
+        self.prev = 0
+
+    def key(self, key, down, now):
+        bit = self.keys.get(key)
+        if not bit:
+            return
+        if down:
+            self.held |= bit
+            self.tapped |= bit
+            self.pressed_at.setdefault(bit, now)
+        else:
+            self.held &= ~bit
+
+    def feed(self, symbol):
+        if self.ticks - self.last_symbol_tick > MOTION_GAP:
+            self.state = 0
+        self.last_symbol_tick = self.ticks
+        self.state = self.automaton.goto[self.state][symbol]
+        name = self.automaton.output[self.state]
+        if name:
+            self.commands.append(name)
+
+    def tick(self, facing_left, now):
+        # The input frame for this tick (simulation bits only)
+        bits = self.held | self.tapped
+        self.tapped = 0
+        self.ticks += 1
+        self.frames[self.cursor] = bits
+        self.times[self.cursor] = now
+        self.cursor = (self.cursor + 1) % HISTORY
+
+        # Motion commands: only direction changes and attack presses are symbols
+        self.commands = []
+        d = direction(bits, facing_left)
+        if d != self.last_direction:
+            self.last_direction = d
+            if d != 5:
+                self.feed(d)
+        pressed = bits & ~self.prev
+        if pressed & INPUT_ATTACK:
+            self.feed(ATTACK_SYMBOL)
+        self.prev = bits
+
+        # Presses that reach the game this tick start their trip to the screen
+        if self.pressed_at:
+            self.in_flight.extend(self.pressed_at.items())
+            self.pressed_at.clear()
+        return bits & SIM_BITS
+
+    def idle(self):
+        # Not fighting (menu, trivia typing): don't let those keys leak into the next tick
+        self.tapped = 0
+        self.pressed_at.clear()
+        self.prev = self.held
+        self.state = 0
+
+    def history(self, n=HISTORY):
+        # The last n input frames, oldest first
+        n = min(n, self.ticks, HISTORY)
+        return [self.frames[(self.cursor - n + i) % HISTORY] for i in range(n)]
+
+
+class InputBuffer:
+    def __init__(self, commands=COMMANDS, players=(1, 2)):
+        automaton = MotionAutomaton(commands)
+        self.players = {p: PlayerInput(p, automaton) for p in players}
+        self.latency = {name: array('d', bytes(8 * LATENCY_WINDOW)) for name in ACTIONS.values()}
+        self.latency_count = dict.fromkeys(ACTIONS.values(), 0)
+
+    def handle_event(self, event):
+        if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+            now = time.perf_counter()
+            down = event.type == pygame.KEYDOWN
+            for p in self.players.values():
+                p.key(event.key, down, now)
+        elif event.type == pygame.WINDOWFOCUSLOST:
+            # We won't see the KEYUPs; release everything
+            for p in self.players.values():
+                p.held = 0
+
+    def tick(self, player, facing_left=False):
+        return self.players[player].tick(facing_left, time.perf_counter())
+
+    def commands(self, player):
+        return self.players[player].commands
+
+    def idle(self):
+        for p in self.players.values():
+            p.idle()
+
+    def frame_shown(self, now=None):
+        # Call right after the flip that first shows the latest ticks
+        now = time.perf_counter() if now is None else now
+        for p in self.players.values():
+            for bit, pressed in p.in_flight:
+                name = ACTIONS[bit]
+                i = self.latency_count[name]
+                self.latency[name][i % LATENCY_WINDOW] = now - pressed
+                self.latency_count[name] = i + 1
+            p.in_flight.clear()
+
+    def latency_ms(self, name, qs=(50, 95)):
+        # Rolling press -> display percentiles for one action, in ms
+        n = min(self.latency_count[name], LATENCY_WINDOW)
+        if not n:
+            return [0.0 for _ in qs]
+        data = sorted(self.latency[name][:n])
+        return [data[min(n - 1, n * q // 100)] * 1000 for q in qs]
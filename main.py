@@ -1,12 +1,26 @@
+import time
+STARTED = time.perf_counter() # For --startup-time
+
 import pygame
 import sys
-import json
 import random
-
-# === CONSTANTS & CONFIG ===
-SCREEN_WIDTH = 1000
-SCREEN_HEIGHT = 500
-FPS = 60
+import argparse
+import atexit
+import os
+import socket
+
+import assets
+import simulation
+from fonts import sys_font
+from simulation import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, GROUND_Y
+from text_cache import render_text
+from renderer import DirtyRenderer
+from timestep import FixedTimestep, FramePacer
+from profiler import profiler
+from replay import ReplayRecorder
+from trivia_prefetch import TriviaPrefetcher
+from input_buffer import InputBuffer
+import netcode
 
 # Colors
 WHITE = (255, 255, 255)
@@ -18,224 +32,229 @@ SKY_BLUE = (135, 206, 235)
 YELLOW = (255, 215, 0)
 GRAY = (50, 50, 50)
 
-# Ground
-GROUND_Y = SCREEN_HEIGHT - 80
-
-# Initialize
-pygame.init()
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Mementos Melee - Alpha 0.3")
-clock = pygame.time.Clock()
-
-# FONTS
-font_header = pygame.font.SysFont('impact', 60)
-font_sub = pygame.font.SysFont('arial', 30)
-font_ui = pygame.font.SysFont('arial', 20, bold=True)
+# Display globals (created by init_display so the module imports headless)
+screen = None
+font_header = None
+font_sub = None
+font_ui = None
+trivia_prefetcher = None
+
+# Start laying out crisis questions once a fighter is this close to a crisis
+PREFETCH_HEALTH = simulation.CRISIS_HEALTH + 30
+
+def init_display():
+    global screen
+    # Only what the menu needs; nothing here uses sound or joysticks
+    pygame.display.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Mementos Melee - Alpha 0.3")
+    init_fonts()
+
+def init_fonts():
+    # Everything draw_frame needs besides a surface (offscreen.py calls this without a window)
+    global font_header, font_sub, font_ui, trivia_prefetcher
+    pygame.font.init()
+
+    # FONTS (file paths cached on disk, see fonts.py)
+    font_header = sys_font('impact', 60)
+    font_sub = sys_font('arial', 30)
+    font_ui = sys_font('arial', 20, bold=True)
+    trivia_prefetcher = TriviaPrefetcher(make_trivia_fonts, TRIVIA_BOX.size)
+
+def make_trivia_fonts():
+    # Separate font objects per thread (header, question)
+    return sys_font('impact', 60), sys_font('arial', 30)
+
+# Overlay surfaces, built once instead of every frame
+_overlays = {}
+
+def get_overlay(size, alpha):
+    key = (size, alpha)
+    if key not in _overlays:
+        overlay = pygame.Surface(size)
+        overlay.set_alpha(alpha)
+        overlay.fill(BLACK)
+        _overlays[key] = overlay
+    return _overlays[key]
+
+TRIVIA_BOX = pygame.Rect(200, 100, 600, 300)
+
+FIGHTER_PHASES = {1: "fighter1", 2: "fighter2"} # In BATTLE every AI counts as fighter2
+BATTLE_SIZES = (4, 16)  # --battle is clamped to this range
+
+# Team 0 (P1) is the only red one; the rest cycle through the others
+TEAM_COLORS = [(200, 50, 50), (50, 50, 200), (50, 160, 50), (210, 160, 40),
+               (150, 60, 200), (40, 170, 170), (230, 110, 40), (120, 120, 120)]
+
+def team_color(team):
+    return TEAM_COLORS[0] if team == 0 else TEAM_COLORS[1 + (team - 1) % (len(TEAM_COLORS) - 1)]
+
+def body_surface(color):
+    surf = pygame.Surface((60, 100))
+    surf.fill(color)
+    return surf
 
 # === THE FIGHTER CLASS ===
-class Fighter(pygame.sprite.Sprite):
+# State, physics and the hit check live in simulation.Fighter; this adds input and drawing.
+class Fighter(simulation.Fighter, pygame.sprite.Sprite):
     def __init__(self, x, y, flip=False, player=1):
-        super().__init__()
-        self.player = player
-        self.health = 100
-        self.max_health = 100
-        self.display_health = self.max_health
-        self.hit_flash = 0
-        self.speed = 5
-        self.jump_power = -15
-        self.gravity = 0.8
-        self.vel_y = 0
-        self.is_jumping = False
-        self.attacking = False
-        self.attack_cooldown = 0
-        self.flip = flip
-        
-        # New Feature: Comeback Mechanic Flag
-        self.has_triggered_crisis = False 
+        super().__init__(x, y, flip=flip, player=player)
 
-        # Create the visual rect
-        self.image = pygame.Surface((60, 100))
-        color = (200, 50, 50) if player == 1 else (50, 50, 200)
-        self.image.fill(color)
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
+        # Create the visual rect (shared by every fighter of this player)
+        color = team_color(self.team)
+        self.image = assets.cached(("body", color), lambda: body_surface(color))
 
-    # NOW ACCEPTS is_ai PARAMETER
-    def update(self, keys, opponent, is_ai=False):
-        dx = 0
-        dy = 0
-
-        # Cooldown
-        if self.attack_cooldown > 0:
-            self.attack_cooldown -= 1
-            self.attacking = False
-
-        # === INPUT HANDLING (MANUAL vs AI) ===
-        move_left = False
-        move_right = False
-        do_jump = False
-        do_attack = False
-
-        if not is_ai:
-            # MANUAL CONTROLS
-            if self.player == 1:
-                if keys[pygame.K_a]: move_left = True
-                if keys[pygame.K_d]: move_right = True
-                if keys[pygame.K_w]: do_jump = True
-                if keys[pygame.K_g]: do_attack = True
-            else:
-                if keys[pygame.K_LEFT]: move_left = True
-                if keys[pygame.K_RIGHT]: move_right = True
-                if keys[pygame.K_UP]: do_jump = True
-                if keys[pygame.K_k]: do_attack = True
-        else:
-            # === SIMPLE AI LOGIC (Placeholder) ===
-            # Chase the opponent
-            if self.rect.x > opponent.rect.x + 60:
-                move_left = True
-            elif self.rect.x < opponent.rect.x - 60:
-                move_right = True
-            
-            # Jump randomizer or if opponent is high
-            if opponent.rect.y < self.rect.y - 50 and random.randint(0, 100) < 2:
-                do_jump = True
-            
-            # Attack if close
-            dist = abs(self.rect.centerx - opponent.rect.centerx)
-            if dist < 80 and random.randint(0, 100) < 5:
-                do_attack = True
-
-        # === APPLY INPUTS ===
-        if move_left:
-            dx -= self.speed
-            self.flip = True
-        if move_right:
-            dx += self.speed
-            self.flip = False
-        
-        if do_jump and not self.is_jumping:
-            self.vel_y = self.jump_power
-            self.is_jumping = True
-            
-        if do_attack and self.attack_cooldown == 0:
-            self.attack()
-
-        # Physics & Gravity
-        self.vel_y += self.gravity
-        dy += self.vel_y
-
-        # Ground Collision
-        if self.rect.y + dy >= GROUND_Y - self.rect.height:
-            self.rect.y = GROUND_Y - self.rect.height
-            self.vel_y = 0
-            self.is_jumping = False
-            dy = 0 
-
-        self.rect.x += dx
-        self.rect.y += dy
-
-        # Screen Clamp
-        if self.rect.left < 0: self.rect.left = 0
-        if self.rect.right > SCREEN_WIDTH: self.rect.right = SCREEN_WIDTH
-
-        # Hitbox Logic
-        if self.attacking and 15 <= self.attack_cooldown <= 20:
-            attack_rect = pygame.Rect(self.rect.centerx, self.rect.y + 30, 80, 60)
-            if self.flip: attack_rect.x -= 80
-            
-            pygame.draw.rect(screen, YELLOW, attack_rect) # Debug visual
-
-            if attack_rect.colliderect(opponent.rect):
-                opponent.health -= 10
-                opponent.hit_flash = 15
+        # Position before the latest tick, for interpolated drawing
+        self.prev_pos = self.rect.topleft
 
-        # Visuals
-        self.display_health += (self.health - self.display_health) * 0.12
-        if self.hit_flash > 0: self.hit_flash -= 1
-
-    def attack(self):
-        self.attacking = True
-        self.attack_cooldown = 20
-
-    def draw(self, surface):
-        if self.hit_flash > 0:
-            pygame.draw.rect(surface, RED, self.rect)
+    # NOW ACCEPTS is_ai PARAMETER
+    def update(self, keys, opponent, is_ai=False, rng=random):
+        if is_ai:
+            inputs = self.ai_inputs(opponent, rng)
         else:
-            color = (200, 50, 50) if self.player == 1 else (50, 50, 200)
-            pygame.draw.rect(surface, color, self.rect)
-            
-        bar_x = self.rect.x
-        bar_y = self.rect.y - 20
+            inputs = simulation.read_keys(keys, self.player)
+        self.step(inputs, opponent)
+
+    # step() and Match.step_battle both go through move() and settle()
+    def move(self, inputs):
+        self.prev_pos = self.rect.topleft
+        with profiler.phase(FIGHTER_PHASES.get(self.player, "fighter2")):
+            super().move(inputs)
+
+    def settle(self):
+        with profiler.phase(FIGHTER_PHASES.get(self.player, "fighter2")):
+            super().settle()
+
+    def draw_rect(self, alpha=1.0):
+        # Body rect blended between the previous and latest tick
+        if alpha >= 1.0:
+            return self.rect
+        px, py = self.prev_pos
+        return self.rect.move(round((px - self.rect.x) * (1 - alpha)),
+                              round((py - self.rect.y) * (1 - alpha)))
+
+    def draw(self, surface, alpha=1.0):
+        rect = self.draw_rect(alpha)
+        pygame.draw.rect(surface, RED if self.hit_flash > 0 else team_color(self.team), rect)
+
+        if self.attack_rect:
+            hitbox = self.attack_rect.move(rect.x - self.rect.x, rect.y - self.rect.y)
+            pygame.draw.rect(surface, YELLOW, hitbox) # Debug visual
+
+        bar_x = rect.x
+        bar_y = rect.y - 20
         pygame.draw.rect(surface, RED, (bar_x, bar_y, 60, 10))
         ratio = max(0, self.display_health / self.max_health)
         pygame.draw.rect(surface, GREEN, (bar_x, bar_y, 60 * ratio, 10))
         pygame.draw.rect(surface, BLACK, (bar_x, bar_y, 60, 10), 1)
 
+    def bounds(self, alpha=1.0):
+        # Everything draw() touches: body, health bar and the debug hitbox
+        rect = self.draw_rect(alpha)
+        area = rect.union((rect.x, rect.y - 20, 60, 10))
+        if self.attack_rect:
+            area.union_ip(self.attack_rect.move(rect.x - self.rect.x, rect.y - self.rect.y))
+        return area
+
 # === THE GAME MANAGER ===
-class Game:
+# The FIGHT / TRIVIA / GAME_OVER rules live in simulation.Match; Game adds
+# the menu, pause screen, keyboard input and drawing.
+class Game(simulation.Match):
+    fighter_class = Fighter
+    record_dir = None # Save a replay of every finished match here
+    session = None    # netcode.RollbackSession while playing online
+
     def __init__(self):
+        super().__init__(game_mode="PVP") # PVP or PVE
         self.state = "MENU" # START IN MENU
-        self.game_mode = "PVP" # PVP or PVE
-        
-        self.p1 = Fighter(200, GROUND_Y - 100, player=1)
-        self.p2 = Fighter(700, GROUND_Y - 100, flip=True, player=2)
         
         # Menu Variables
-        self.menu_options = ["1 PLAYER (VS AI)", "2 PLAYER (PVP)", "EXIT"]
+        self.menu_options = ["1 PLAYER (VS AI)", "2 PLAYER (PVP)", f"BATTLE ({self.battle_size} FIGHTERS)", "EXIT"]
         self.menu_index = 0
         
         # Trivia Setup
-        self.active_player = None
         self.user_input = ""
-        self.trivia_q = ""
-        self.trivia_a = ""
-        
-        try:
-            with open('questions.json', 'r') as f:
-                self.question_db = json.load(f)
-        except FileNotFoundError:
-            self.question_db = [{"q": "File missing. Type OK.", "a": "OK"}]
+
+        # Key events -> per-tick input frames, motion commands and latency
+        self.inputs = InputBuffer()
+
+    def read_inputs(self, player):
+        # This tick's input frame for a player; also reports motion commands
+        fighter = self.p1 if player == 1 else self.p2
+        bits = self.inputs.tick(player, fighter.flip)
+        if self.telemetry:
+            for name in self.inputs.commands(player):
+                self.log_event("command", player=player, command=name)
+        return bits
 
     def update(self):
+        # === ONLINE ===
+        if self.session:
+            # The session steps the match every tick and rolls it back on late inputs
+            self.session.advance(self.read_inputs(self.session.local_player))
+            if self.session.peer_lost:
+                print("online: the other player stopped responding")
+                self.end_online()
+                return
+            self.prefetch_question()
+
         # === MENU LOGIC ===
-        if self.state == "MENU":
+        elif self.state == "MENU":
             # Handled in handle_input to prevent scrolling too fast
             pass
             
         # === FIGHT LOGIC ===
         elif self.state == "FIGHT":
-            keys = pygame.key.get_pressed()
-            
-            # P1 is always manual
-            self.p1.update(keys, self.p2, is_ai=False)
-            
-            # P2 is AI if mode is PVE, otherwise Manual
-            is_ai_mode = (self.game_mode == "PVE")
-            self.p2.update(keys, self.p1, is_ai=is_ai_mode)
-            
-            # Check for Trivia
-            if self.p1.health <= 20 and not self.p1.has_triggered_crisis:
-                self.trigger_crisis(self.p1)
-            elif self.p2.health <= 20 and not self.p2.has_triggered_crisis:
-                self.trigger_crisis(self.p2)
+            # P1 is always manual, P2 is AI if mode is PVE (handled by step)
+            self.step(self.read_inputs(1), self.read_inputs(2))
+            self.prefetch_question()
 
-            if self.p1.health <= 0 or self.p2.health <= 0:
-                self.state = "GAME_OVER"
+            if self.state == "GAME_OVER" and self.recorder:
+                self.save_replay()
 
-        elif self.state == "TRIVIA":
-            pass
+        if self.state != "FIGHT":
+            self.inputs.idle()
+
+    def prefetch_question(self):
+        # Lay out the next questions in the background before a crisis can fire
+        if self.game_mode == "BATTLE":
+            return
+        if trivia_prefetcher and self.state == "FIGHT" and min(self.p1.health, self.p2.health) <= PREFETCH_HEALTH:
+            trivia_prefetcher.prefetch(self.question_bag)
 
     def trigger_crisis(self, player):
-        self.state = "TRIVIA"
-        self.active_player = player
-        self.active_player.has_triggered_crisis = True
-        data = random.choice(self.question_db)
-        self.trivia_q = data['q']
-        self.trivia_a = data['a'].upper()
+        super().trigger_crisis(player)
         self.user_input = ""
 
+    def reset_match(self, seed=None):
+        # Helper to restart fight without reloading app
+        super().reset_match(seed)
+        # Replays cover 1v1 matches against the built-in AI only
+        recordable = self.game_mode != "BATTLE" and not self.ai_policy
+        self.recorder = ReplayRecorder(self) if self.record_dir and recordable else None
+
+    def start_online(self, transport, local_player, seed):
+        self.game_mode = "PVP"
+        self.reset_match(seed)
+        self.new_question_bag(seed) # Both peers draw the same questions
+        self.session = netcode.RollbackSession(self, local_player, transport)
+        self.state = "FIGHT"
+
+    def end_online(self):
+        self.session.close()
+        self.session = None
+        self.state = "MENU"
+        self.reset_match()
+
+    def save_replay(self):
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.game_mode}-{self.seed}.mmr"
+        with open(os.path.join(self.record_dir, name), "wb") as f:
+            f.write(self.recorder.finish(self))
+        self.recorder = None
+
     def handle_input(self, event):
+        self.inputs.handle_event(event)
+
         # === GLOBAL INPUTS (Works in any state) ===
         if event.type == pygame.KEYDOWN:
             # Fullscreen Toggle (Alt + Enter)
@@ -260,20 +279,28 @@ class Game:
                             self.game_mode = "PVP"
                             self.reset_match()
                             self.state = "FIGHT"
-                        elif self.menu_index == 2: # Exit
+                        elif self.menu_index == 2: # Battle: P1 against AIs
+                            self.game_mode = "BATTLE"
+                            self.reset_match()
+                            self.state = "FIGHT"
+                        elif self.menu_index == 3: # Exit
                             pygame.quit(); sys.exit()
 
         # === GAME INPUTS ===
         elif self.state == "FIGHT":
             if event.type == pygame.KEYDOWN:
-                # Tab OR Escape triggers Pause
-                if event.key == pygame.K_TAB or event.key == pygame.K_ESCAPE:
+                # Tab OR Escape triggers Pause; online the other player can't be paused, so Escape leaves
+                if (event.key == pygame.K_TAB or event.key == pygame.K_ESCAPE) and not self.session:
                     self.state = "PAUSE"
+                    if self.recorder: self.recorder.event("PAUSE")
+                elif event.key == pygame.K_ESCAPE and self.session:
+                    self.end_online() # Leave the online match
                     
         elif self.state == "PAUSE":
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_TAB or event.key == pygame.K_ESCAPE: 
                     self.state = "FIGHT" # Resume
+                    if self.recorder: self.recorder.event("RESUME")
                 elif event.key == pygame.K_m: 
                     self.state = "MENU" # Go to Main Menu
                     self.reset_match()  # Reset game so it's fresh next time
@@ -282,7 +309,9 @@ class Game:
 
         elif self.state == "TRIVIA":
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN:
+                if event.key == pygame.K_ESCAPE and self.session:
+                    self.end_online()
+                elif event.key == pygame.K_RETURN:
                     self.check_answer()
                 elif event.key == pygame.K_BACKSPACE:
                     self.user_input = self.user_input[:-1]
@@ -290,126 +319,248 @@ class Game:
                     self.user_input += event.unicode
         
         elif self.state == "GAME_OVER":
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_r and not self.session:
                 self.reset_match()
                 self.state = "FIGHT"
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                self.state = "MENU"
-
-    def reset_match(self):
-        # Helper to restart fight without reloading app
-        self.p1 = Fighter(200, GROUND_Y - 100, player=1)
-        self.p2 = Fighter(700, GROUND_Y - 100, flip=True, player=2)
+                if self.session:
+                    self.end_online()
+                else:
+                    self.state = "MENU"
 
     def check_answer(self):
-        if self.user_input.upper() == self.trivia_a:
-            self.active_player.health += 50
-            if self.active_player.health > 100: self.active_player.health = 100
+        if self.session:
+            # Sent to the other player and applied on the same frame by both
+            self.session.submit_answer(self.user_input)
         else:
-            self.active_player.health -= 20
-        self.state = "FIGHT"
+            self.submit_answer(self.user_input)
+
+    def draw(self, alpha=1.0):
+        with profiler.phase("draw"):
+            self.draw_frame(screen, alpha)
+            if profiler.overlay_visible:
+                profiler.draw_overlay(screen)
+        with profiler.phase("flip"):
+            pygame.display.flip()
+
+    def draw_frame(self, surface, alpha=1.0):
+        # Only a running fight is interpolated; frozen screens show the latest tick
+        if self.state != "FIGHT":
+            alpha = 1.0
 
-    def draw(self):
-        screen.fill(SKY_BLUE)
-        
         # === DRAW MENU ===
         if self.state == "MENU":
-            screen.fill(BLACK) # Persona 5 Style Red/Black later
-            title = font_header.render("MEMENTOS MELEE", True, RED)
-            screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 100))
-            
-            for i, option in enumerate(self.menu_options):
-                color = RED if i == self.menu_index else WHITE
-                txt = font_sub.render(option, True, color)
-                screen.blit(txt, (SCREEN_WIDTH//2 - txt.get_width()//2, 250 + i * 50))
-                
-                # Draw Arrow for selection
-                if i == self.menu_index:
-                    pygame.draw.polygon(screen, RED, [(380, 260 + i*50), (380, 280 + i*50), (400, 270 + i*50)])
+            self.draw_menu(surface)
 
         # === DRAW GAME ===
         else:
-            # Draw Background
-            pygame.draw.rect(screen, (100, 200, 100), (0, GROUND_Y, SCREEN_WIDTH, SCREEN_HEIGHT - GROUND_Y))
-            
-            self.p1.draw(screen)
-            self.p2.draw(screen)
-            
-            # === CONTROLS OVERLAY (TOP LEFT) ===
-            # Semi-transparent box
-            s = pygame.Surface((250, 100))
-            s.set_alpha(150)
-            s.fill(BLACK)
-            screen.blit(s, (10, 10))
-            
-            c1 = font_ui.render("P1: WASD + G (Atk)", True, WHITE)
-            c2 = font_ui.render("P2: Arrows + K (Atk)", True, WHITE)
-            mode_txt = font_ui.render(f"MODE: {self.game_mode}", True, YELLOW)
-            
-            screen.blit(c1, (20, 20))
-            screen.blit(c2, (20, 45))
-            screen.blit(mode_txt, (20, 70))
+            self.draw_background(surface)
+            for fighter in self.fighters:
+                fighter.draw(surface, alpha)
+            self.draw_controls(surface)
 
-            # === PAUSE SCREEN (UPDATED) ===
             if self.state == "PAUSE":
-                # Darken background
-                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-                overlay.set_alpha(200) # Darker than before
-                overlay.fill(BLACK)
-                screen.blit(overlay, (0,0))
-                
-                # Menu Box
-                box_rect = pygame.Rect(300, 120, 400, 260)
-                pygame.draw.rect(screen, WHITE, box_rect)
-                pygame.draw.rect(screen, BLUE, box_rect, 5)
-                
-                # Text Options
-                title = font_header.render("PAUSED", True, BLACK)
-                opt1 = font_sub.render("TAB/ESC: Resume", True, BLUE)
-                opt2 = font_sub.render("M: Main Menu", True, BLACK)
-                opt3 = font_sub.render("Q: Quit Desktop", True, RED)
-                
-                screen.blit(title, (410, 130))
-                screen.blit(opt1, (350, 200))
-                screen.blit(opt2, (350, 250))
-                screen.blit(opt3, (350, 300))
-
+                self.draw_pause(surface)
             if self.state == "TRIVIA":
-                # Same Trivia code as before
-                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-                overlay.set_alpha(150)
-                overlay.fill(BLACK)
-                screen.blit(overlay, (0,0))
-                box_rect = pygame.Rect(200, 100, 600, 300)
-                pygame.draw.rect(screen, WHITE, box_rect)
-                pygame.draw.rect(screen, RED, box_rect, 5)
-                header = font_header.render("COGNITIVE CRISIS!", True, RED)
-                q_text = font_sub.render(self.trivia_q, True, BLACK)
-                ans_text = font_sub.render(f"Answer: {self.user_input}", True, BLUE)
-                screen.blit(header, (box_rect.x + 20, box_rect.y + 20))
-                screen.blit(q_text, (box_rect.x + 20, box_rect.y + 100))
-                screen.blit(ans_text, (box_rect.x + 20, box_rect.y + 200))
-
+                self.draw_trivia(surface)
             if self.state == "GAME_OVER":
-                txt = font_header.render("GAME OVER", True, RED)
-                sub = font_sub.render("Press R to Retry, ESC for Menu", True, BLACK)
-                screen.blit(txt, (350, 150))
-                screen.blit(sub, (300, 250))
+                self.draw_game_over(surface)
+
+    def draw_menu(self, surface):
+        surface.fill(BLACK) # Persona 5 Style Red/Black later
+        title = render_text(font_header, "MEMENTOS MELEE", RED)
+        surface.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 100))
+        
+        for i, option in enumerate(self.menu_options):
+            color = RED if i == self.menu_index else WHITE
+            txt = render_text(font_sub, option, color)
+            surface.blit(txt, (SCREEN_WIDTH//2 - txt.get_width()//2, 250 + i * 50))
+            
+            # Draw Arrow for selection
+            if i == self.menu_index:
+                pygame.draw.polygon(surface, RED, [(380, 260 + i*50), (380, 280 + i*50), (400, 270 + i*50)])
+
+    def draw_background(self, surface):
+        surface.fill(SKY_BLUE)
+        pygame.draw.rect(surface, (100, 200, 100), (0, GROUND_Y, SCREEN_WIDTH, SCREEN_HEIGHT - GROUND_Y))
+
+    def draw_controls(self, surface):
+        # === CONTROLS OVERLAY (TOP LEFT) ===
+        # Semi-transparent box
+        surface.blit(get_overlay((250, 100), 150), (10, 10))
+        
+        c1 = render_text(font_ui, "P1: WASD + G (Atk)", WHITE)
+        c2 = render_text(font_ui, "P2: Arrows + K (Atk)", WHITE)
+        mode_txt = render_text(font_ui, f"MODE: {self.game_mode}", YELLOW)
+        
+        surface.blit(c1, (20, 20))
+        surface.blit(c2, (20, 45))
+        surface.blit(mode_txt, (20, 70))
 
-        pygame.display.flip()
+    def draw_pause(self, surface):
+        # Darken background
+        surface.blit(get_overlay((SCREEN_WIDTH, SCREEN_HEIGHT), 200), (0,0)) # Darker than before
+        
+        # Menu Box
+        box_rect = pygame.Rect(300, 120, 400, 260)
+        pygame.draw.rect(surface, WHITE, box_rect)
+        pygame.draw.rect(surface, BLUE, box_rect, 5)
+        
+        # Text Options
+        title = render_text(font_header, "PAUSED", BLACK)
+        opt1 = render_text(font_sub, "TAB/ESC: Resume", BLUE)
+        opt2 = render_text(font_sub, "M: Main Menu", BLACK)
+        opt3 = render_text(font_sub, "Q: Quit Desktop", RED)
+        
+        surface.blit(title, (410, 130))
+        surface.blit(opt1, (350, 200))
+        surface.blit(opt2, (350, 250))
+        surface.blit(opt3, (350, 300))
+
+    def draw_trivia(self, surface, answer=True):
+        surface.blit(get_overlay((SCREEN_WIDTH, SCREEN_HEIGHT), 150), (0,0))
+        # Box, header and word-wrapped question come pre-rendered
+        surface.blit(trivia_prefetcher.layout(self.trivia_q).panel, TRIVIA_BOX)
+        if answer:
+            self.draw_trivia_answer(surface)
+
+    def draw_trivia_answer(self, surface):
+        # The only TRIVIA text that changes while the screen is up
+        ans_text = render_text(font_sub, f"Answer: {self.user_input}", BLUE)
+        answer_y = trivia_prefetcher.layout(self.trivia_q).answer_y
+        return surface.blit(ans_text, (TRIVIA_BOX.x + 20, TRIVIA_BOX.y + answer_y))
+
+    def draw_game_over(self, surface):
+        txt = render_text(font_header, "GAME OVER", RED)
+        sub = render_text(font_sub, "Press R to Retry, ESC for Menu", BLACK)
+        surface.blit(txt, (350, 150))
+        surface.blit(sub, (300, 250))
+
+def close_telemetry(writer):
+    writer.close()
+    print("telemetry: " + ", ".join(f"{k} {v:g}" for k, v in writer.stats().items()))
 
 # === RUN ===
-game = Game()
-running = True
-while running:
-    clock.tick(FPS)
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
+def main():
+    parser = argparse.ArgumentParser(description="Mementos Melee")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only redraw and push the parts of the screen that changed")
+    parser.add_argument("--fps", type=int, default=FPS,
+                        help="render rate cap, 0 for uncapped (the simulation always runs at %d Hz)" % FPS)
+    parser.add_argument("--precise-pacing", action="store_true",
+                        help="spin-wait the end of each frame for steadier frame times")
+    parser.add_argument("--record", metavar="DIR",
+                        help="save a replay of every finished match to DIR")
+    parser.add_argument("--profile", metavar="TRACE",
+                        help="record per-phase frame times and write them to TRACE (.csv or .json) on exit")
+    parser.add_argument("--host", type=int, metavar="PORT",
+                        help="host an online PVP match on this UDP port (you are P1)")
+    parser.add_argument("--join", metavar="HOST:PORT",
+                        help="join an online PVP match (you are P2, arrow keys + K)")
+    parser.add_argument("--net-latency", type=float, default=0, metavar="MS",
+                        help="add simulated one-way latency to online play, for testing")
+    parser.add_argument("--net-loss", type=float, default=0, metavar="P",
+                        help="drop this fraction of outgoing packets, for testing")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print the time to the first drawn frame and exit")
+    parser.add_argument("--battle", type=int, default=simulation.Match.battle_size, metavar="N",
+                        help="fighters in BATTLE mode (%d-%d)" % BATTLE_SIZES)
+    parser.add_argument("--teams", type=int, default=0,
+                        help="BATTLE teams: 0 for free-for-all, else 2 up to the --battle size")
+    parser.add_argument("--category", help="only ask trivia questions from this category")
+    parser.add_argument("--difficulty", type=int, help="only ask trivia questions of this difficulty")
+    parser.add_argument("--telemetry", metavar="DIR",
+                        help="log match events to DIR/events-YYYYMMDD.jsonl.gz")
+    parser.add_argument("--ai", metavar="POLICY",
+                        help="CPU policy: lookahead (search, hardest) or one of ai.POLICIES; default is the classic AI")
+    args = parser.parse_args()
+
+    if args.profile:
+        profiler.tracing = profiler.enabled = True
+        atexit.register(profiler.export, args.profile)
+
+    Game.battle_size = min(max(args.battle, BATTLE_SIZES[0]), BATTLE_SIZES[1])
+    if args.teams and not 2 <= args.teams <= Game.battle_size:
+        # One team wins on the first tick; a negative one isn't a team at all
+        parser.error(f"--teams must be 0 (free-for-all) or 2-{Game.battle_size} "
+                     f"for {Game.battle_size} fighters")
+    Game.battle_teams = args.teams
+    if args.category is not None or args.difficulty is not None:
+        # Catch a filter that matches nothing now, not at the first crisis
+        store = simulation.load_questions()
+        if not store.select(args.category, args.difficulty):
+            available = ", ".join(f"{c} (difficulty {d})" for c, d, _, _ in sorted(store.groups))
+            parser.error(f"no questions for --category {args.category} --difficulty {args.difficulty}; "
+                         f"the bank has: {available}")
+    Game.question_category = args.category
+    Game.question_difficulty = args.difficulty
+    if args.ai:
+        import ai  # numpy is only worth importing when asked for
+        Game.ai_policy = ai.get_policy(args.ai, enforce_budget=True)
+
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        Game.record_dir = args.record
+
+    if args.telemetry:
+        import telemetry
+        Game.telemetry = telemetry.TelemetryWriter(args.telemetry)
+        atexit.register(close_telemetry, Game.telemetry)
+        # Drops and back-pressure show up in the F3 overlay
+        profiler.counters["telemetry"] = lambda: "{events} ev {dropped} drop {backpressure} bp".format(**Game.telemetry.stats())
+
+    transport = None
+    if args.host is not None or args.join:
+        if args.join:
+            host, port = args.join.rsplit(":", 1)
+            peer = (socket.gethostbyname(host), int(port))
+            transport = netcode.UdpTransport(("0.0.0.0", 0), peer, args.net_latency / 1000, loss=args.net_loss)
+        else:
+            transport = netcode.UdpTransport(("0.0.0.0", args.host), None, args.net_latency / 1000, loss=args.net_loss)
+        print("Waiting for the other player...")
+        seed = netcode.connect(transport)
+
+    simulation.preload_questions() # Opened in the background while the menu shows
+    init_display()
+    game = Game()
+    if transport:
+        game.start_online(transport, 2 if args.join else 1, seed)
+    renderer = DirtyRenderer(game, screen) if args.dirty_rects else None
+    profiler.counters["attack"] = lambda: "{:.1f} / {:.1f} ms".format(*game.inputs.latency_ms("attack"))
+    timestep = FixedTimestep(FPS)
+    pacer = FramePacer(args.fps, precise=args.precise_pacing)
+    running = True
+    while running:
+        frame_time = pacer.wait()
+        profiler.begin_frame()
+        with profiler.phase("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED) and renderer:
+                    renderer.invalidate()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle_overlay()
+                game.handle_input(event)
+        
+        with profiler.phase("update"):
+            for _ in range(timestep.advance(frame_time)):
+                game.update()
+            if game.telemetry:
+                game.telemetry.poll()
+        if renderer:
+            renderer.draw(timestep.alpha)
+        else:
+            game.draw(timestep.alpha)
+        game.inputs.frame_shown()
+        profiler.end_frame()
+
+        if args.startup_time:
+            print(f"time to first frame: {(time.perf_counter() - STARTED) * 1000:.1f} ms")
             running = False
-        game.handle_input(event)
-    
-    game.update()
-    game.draw()
 
-pygame.quit()
-sys.exit()
\ No newline at end of file
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+# Rollback netcode for online PVP.
+# Each peer simulates every frame immediately with its own input and a
+# prediction of the remote input (the last one it received). Before each
+# frame the full match state is written into a preallocated ring buffer;
+# when a remote input arrives that differs from what was predicted, the
+# session restores the snapshot of that frame and re-simulates up to the
+# present. Nothing is allocated per snapshot: fighter and match fields go
+# into one flat array('d') and the trivia strings into a fixed list.
+#
+# Inputs travel over UDP. Every packet carries all local inputs the peer
+# hasn't acknowledged yet, so lost packets are covered by the next one.
+# Trivia answers are sent the same way as frame-stamped events.
+#
+# Telemetry only ever sees confirmed frames: while online, the match logs
+# into a FrameLog that holds each frame's events until the peer's input
+# for that frame has arrived, and drops them if the frame is rolled back.
+#
+#   python netcode.py selftest --latency 100 --loss 0.2
+#   python netcode.py bench
+
+import argparse
+import heapq
+from collections import deque
+import random
+import socket
+import struct
+import time
+import zlib
+from array import array
+
+import simulation
+
+FIGHTER_FIELDS = 11
+MATCH_FIELDS = 5
+SLOT = 2 * FIGHTER_FIELDS + MATCH_FIELDS
+STATE_CODES = {"FIGHT": 0, "TRIVIA": 1, "GAME_OVER": 2}
+STATE_NAMES = ("FIGHT", "TRIVIA", "GAME_OVER")
+
+MAGIC = b"MMIN"
+PACKET = struct.Struct("<4siIB")         # magic, ack, first frame, input count
+HELLO = b"MMHI"
+SEED = struct.Struct("<4sI")             # b"MMSD", match seed
+ANSWER = struct.Struct("<IBB")           # frame, player, text length
+MAX_INPUTS_PER_PACKET = 64
+
+
+# === SNAPSHOTS ===
+class StateBuffer:
+    # Ring buffer of match snapshots indexed by frame number. Only PVP is
+    # supported: there the match RNG is never used (it only drives the AI),
+    # and the question bag is restored from its position alone.
+    def __init__(self, size=64):
+        self.size = size
+        self.data = array('d', bytes(8 * SLOT * size))
+        self.refs = [None] * (2 * size)
+
+    def save(self, frame, match):
+        i = frame % self.size
+        d = self.data
+        o = i * SLOT
+        for f in (match.p1, match.p2):
+            d[o] = f.rect.x
+            d[o + 1] = f.rect.y
+            d[o + 2] = f.vel_y
+            d[o + 3] = f.health
+            d[o + 4] = f.display_health
+            d[o + 5] = f.hit_flash
+            d[o + 6] = f.attack_cooldown
+            d[o + 7] = f.attacking
+            d[o + 8] = f.flip
+            d[o + 9] = f.is_jumping
+            d[o + 10] = f.has_triggered_crisis
+            o += FIGHTER_FIELDS
+        d[o] = STATE_CODES[match.state]
+        d[o + 1] = match.tick
+        d[o + 2] = match.active_player.player if match.active_player else 0
+        d[o + 3] = match.question_bag.position
+        d[o + 4] = -1 if match.trivia_index is None else match.trivia_index
+        self.refs[2 * i] = match.trivia_q
+        self.refs[2 * i + 1] = match.trivia_a
+
+    def restore(self, frame, match):
+        i = frame % self.size
+        d = self.data
+        o = i * SLOT
+        for f in (match.p1, match.p2):
+            f.rect.x = int(d[o])
+            f.rect.y = int(d[o + 1])
+            f.vel_y = d[o + 2]
+            f.health = int(d[o + 3])
+            f.display_health = d[o + 4]
+            f.hit_flash = int(d[o + 5])
+            f.attack_cooldown = int(d[o + 6])
+            f.attacking = d[o + 7] != 0
+            f.flip = d[o + 8] != 0
+            f.is_jumping = d[o + 9] != 0
+            f.has_triggered_crisis = d[o + 10] != 0
+            f.attack_rect = None
+            o += FIGHTER_FIELDS
+        match.state = STATE_NAMES[int(d[o])]
+        match.tick = int(d[o + 1])
+        active = int(d[o + 2])
+        match.active_player = match.p1 if active == 1 else match.p2 if active == 2 else None
+        position = int(d[o + 3])
+        if position != match.question_bag.position:
+            match.question_bag.seek(position)
+        index = int(d[o + 4])
+        match.trivia_index = None if index < 0 else index
+        match.trivia_q = self.refs[2 * i]
+        match.trivia_a = self.refs[2 * i + 1]
+
+    def checksum(self, frame):
+        i = frame % self.size
+        return zlib.crc32(memoryview(self.data)[i * SLOT:(i + 1) * SLOT].cast('B'))
+
+
+# === TRANSPORT ===
+class UdpTransport:
+    # Non-blocking UDP socket with optional simulated latency, jitter and
+    # packet loss (applied on send). With peer=None the first address that
+    # sends us a packet becomes the peer (the hosting side).
+    def __init__(self, bind=("0.0.0.0", 0), peer=None, latency=0.0, jitter=0.0, loss=0.0, seed=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(bind)
+        self.sock.setblocking(False)
+        self.peer = peer
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.delayed = []
+        self.sequence = 0
+        self.sent = self.dropped = self.received = 0
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    def send(self, data):
+        if self.peer is None:
+            return
+        self.sent += 1
+        if self.loss and self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        if self.latency or self.jitter:
+            due = time.perf_counter() + self.latency + self.jitter * self.rng.random()
+            self.sequence += 1
+            heapq.heappush(self.delayed, (due, self.sequence, data))
+        else:
+            self._sendto(data)
+
+    def _sendto(self, data):
+        try:
+            self.sock.sendto(data, self.peer)
+        except OSError:
+            pass  # peer not up yet; the next packet resends everything
+
+    def receive(self):
+        now = time.perf_counter()
+        while self.delayed and self.delayed[0][0] <= now:
+            self._sendto(heapq.heappop(self.delayed)[2])
+        packets = []
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except (BlockingIOError, ConnectionResetError):
+                return packets
+            if self.peer is None:
+                self.peer = addr
+            if addr == self.peer:
+                self.received += 1
+                packets.append(data)
+
+    def close(self):
+        self.sock.close()
+
+
+def connect(transport, seed=None, timeout=60.0):
+    # Agree on the match seed before the first frame. The hosting side (no
+    # peer address yet) picks it and answers every HELLO until the joining
+    # side starts sending inputs; the joining side repeats HELLO until the
+    # seed arrives. Returns the seed.
+    hosting = transport.peer is None
+    if hosting and seed is None:
+        seed = random.getrandbits(32)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if not hosting:
+            transport.send(HELLO)
+        for packet in transport.receive():
+            if hosting and packet == HELLO:
+                transport.send(SEED.pack(b"MMSD", seed))
+            elif hosting and packet[:4] == MAGIC:
+                return seed
+            elif not hosting and len(packet) == SEED.size and packet[:4] == b"MMSD":
+                return SEED.unpack(packet)[1]
+        time.sleep(0.05)
+    raise ConnectionError("no answer from the other player")
+
+
+# === TELEMETRY ===
+class FrameLog:
+    # Stands in for Match.telemetry during a session. Events emitted while
+    # a frame is simulated wait here until that frame is confirmed;
+    # anything else (local input events) goes straight to the writer.
+    def __init__(self, writer):
+        self.writer = writer
+        self.frame = None           # Frame being simulated, None outside _simulate
+        self.pending = deque()      # (frame, kind, match_id, tick, data), oldest first
+
+    def emit(self, kind, match_id, tick, data):
+        if self.frame is None:
+            self.writer.emit(kind, match_id, tick, data)
+        else:
+            self.pending.append((self.frame, kind, match_id, tick, data))
+
+    def rewind(self, frame):
+        # Frames from `frame` on are about to be re-simulated
+        pending = self.pending
+        while pending and pending[-1][0] >= frame:
+            pending.pop()
+
+    def confirm(self, frame):
+        # Frames up to `frame` are final: hand their events to the writer
+        pending = self.pending
+        while pending and pending[0][0] <= frame:
+            self.writer.emit(*pending.popleft()[1:])
+
+    def poll(self):
+        self.writer.poll()
+
+    def stats(self):
+        return self.writer.stats()
+
+
+# === SESSION ===
+class RollbackSession:
+    def __init__(self, match, local_player, transport, input_delay=2, max_rollback=8, buffer_size=64,
+                 timeout=5.0):
+        if match.game_mode != "PVP":
+            raise ValueError("rollback sessions are PVP only")
+        match.recorder = None  # predicted frames must not end up in a replay
+        # ... or in the telemetry log; the match's own writer is put back by close()
+        self.writer = match.__dict__.get("telemetry")
+        self.log = FrameLog(match.telemetry) if match.telemetry else None
+        match.telemetry = self.log
+        self.match = match
+        self.local_player = local_player
+        self.remote_player = 3 - local_player
+        self.transport = transport
+        self.input_delay = input_delay
+        self.max_rollback = max_rollback
+        self.size = buffer_size
+        self.states = StateBuffer(buffer_size)
+
+        # Per-player ring of input bits, and the frame each slot holds
+        self.bits = {p: array('b', bytes(buffer_size)) for p in (1, 2)}
+        self.known = {p: array('i', [-1]) * buffer_size for p in (1, 2)}
+        self.predicted = array('b', bytes(buffer_size))
+        for frame in range(input_delay):
+            for p in (1, 2):
+                self.known[p][frame] = frame
+
+        self.answers = {}          # frame -> (player, text), both peers
+        self.unacked_answers = {}  # local answers the peer hasn't confirmed
+        self.frame = 0             # next frame to simulate
+        self.remote_confirmed = input_delay - 1
+        self.peer_ack = input_delay - 1
+        self.rollback_to = None
+
+        # A peer that has sent nothing for `timeout` seconds is gone
+        self.timeout = timeout
+        self.last_heard = time.perf_counter()
+        self.peer_lost = False
+
+        # Stats
+        self.rollbacks = 0
+        self.resimulated = 0
+        self.max_rollback_frames = 0
+        self.max_rollback_time = 0.0
+        self.stalls = 0
+
+    # === INPUTS ===
+    def input_for(self, player, frame):
+        i = frame % self.size
+        if self.known[player][i] == frame:
+            return self.bits[player][i]
+        # Predict: repeat the latest confirmed input
+        last = self.remote_confirmed
+        value = self.bits[player][last % self.size] if last >= 0 else 0
+        self.predicted[i] = value
+        return value
+
+    def submit_answer(self, text):
+        # Only the player in the Cognitive Crisis gets to answer
+        active = self.match.active_player
+        if self.match.state != "TRIVIA" or active is None or active.player != self.local_player:
+            return False
+        frame = self.frame + self.input_delay
+        if frame in self.answers:
+            return False
+        self.answers[frame] = (self.local_player, text)
+        self.unacked_answers[frame] = text
+        return True
+
+    # === NETWORK ===
+    def send(self):
+        first = self.peer_ack + 1
+        last = self.frame + self.input_delay - 1
+        count = max(0, min(last - first + 1, MAX_INPUTS_PER_PACKET))
+        local = self.local_player
+        packet = bytearray(PACKET.pack(MAGIC, self.remote_confirmed, first, count))
+        packet += bytes(self.bits[local][(first + k) % self.size] for k in range(count))
+        packet.append(len(self.unacked_answers))
+        for frame, text in self.unacked_answers.items():
+            data = text.encode("utf-8")[:255]
+            packet += ANSWER.pack(frame, local, len(data)) + data
+        self.transport.send(bytes(packet))
+
+    def poll(self):
+        for packet in self.transport.receive():
+            if len(packet) < PACKET.size:
+                continue
+            magic, ack, first, count = PACKET.unpack_from(packet)
+            if magic != MAGIC:
+                continue
+            pos = PACKET.size
+            self.last_heard = time.perf_counter()
+            self.peer_ack = max(self.peer_ack, ack)
+            for frame in [f for f in self.unacked_answers if f <= ack]:
+                del self.unacked_answers[frame]
+
+            remote = self.remote_player
+            for k in range(count):
+                frame = first + k
+                i = frame % self.size
+                if frame <= self.remote_confirmed or self.known[remote][i] == frame:
+                    continue
+                value = packet[pos + k]
+                if frame < self.frame - self.size:
+                    continue
+                self.bits[remote][i] = value
+                self.known[remote][i] = frame
+                if frame < self.frame and value != self.predicted[i]:
+                    self._need_rollback(frame)
+            pos += count
+            while self.known[remote][(self.remote_confirmed + 1) % self.size] == self.remote_confirmed + 1:
+                self.remote_confirmed += 1
+
+            for _ in range(packet[pos]):
+                frame, player, length = ANSWER.unpack_from(packet, pos + 1)
+                text = packet[pos + 1 + ANSWER.size:pos + 1 + ANSWER.size + length].decode("utf-8", "replace")
+                pos += ANSWER.size + length
+                if frame not in self.answers and player == remote:
+                    self.answers[frame] = (player, text)
+                    if frame < self.frame:
+                        self._need_rollback(frame)
+
+    def _need_rollback(self, frame):
+        if self.rollback_to is None or frame < self.rollback_to:
+            self.rollback_to = frame
+
+    # === SIMULATION ===
+    def _simulate(self, frame):
+        match = self.match
+        self.states.save(frame, match)
+        if self.log:
+            self.log.frame = frame
+        answer = self.answers.get(frame)
+        if answer and match.state == "TRIVIA" and match.active_player.player == answer[0]:
+            match.submit_answer(answer[1])
+        match.step(self.input_for(1, frame), self.input_for(2, frame))
+        if self.log:
+            self.log.frame = None
+
+    def advance(self, local_bits):
+        # Run one frame. Returns False if we had to wait for the peer (or
+        # it timed out: peer_lost is set and the session should be closed)
+        self.poll()
+        if time.perf_counter() - self.last_heard > self.timeout:
+            self.peer_lost = True
+            return False
+        i = (self.frame + self.input_delay) % self.size
+        if self.known[self.local_player][i] != self.frame + self.input_delay:
+            self.bits[self.local_player][i] = local_bits
+            self.known[self.local_player][i] = self.frame + self.input_delay
+
+        if self.rollback_to is not None:
+            start = time.perf_counter()
+            frames = self.frame - self.rollback_to
+            self.states.restore(self.rollback_to, self.match)
+            if self.log:
+                self.log.rewind(self.rollback_to)
+            for frame in range(self.rollback_to, self.frame):
+                self._simulate(frame)
+            self.rollback_to = None
+            self.rollbacks += 1
+            self.resimulated += frames
+            self.max_rollback_frames = max(self.max_rollback_frames, frames)
+            self.max_rollback_time = max(self.max_rollback_time, time.perf_counter() - start)
+
+        if self.frame - self.remote_confirmed > self.max_rollback:
+            # Too far ahead of the peer to keep predicting; wait for it
+            self.stalls += 1
+            self.send()
+            return False
+
+        self._simulate(self.frame)
+        self.frame += 1
+        if self.log:
+            self.log.confirm(self.remote_confirmed)
+        self.send()
+        return True
+
+    def close(self):
+        # Hand the match back: its own telemetry writer, and the transport is shut
+        if self.writer is None:
+            self.match.__dict__.pop("telemetry", None)  # back to the class default
+        else:
+            self.match.telemetry = self.writer
+        self.transport.close()
+
+    def stats(self):
+        return {
+            "frame": self.frame, "remote_confirmed": self.remote_confirmed,
+            "rollbacks": self.rollbacks, "resimulated": self.resimulated,
+            "max_rollback_frames": self.max_rollback_frames,
+            "max_rollback_ms": self.max_rollback_time * 1000, "stalls": self.stalls,
+            "packets_sent": self.transport.sent, "packets_dropped": self.transport.dropped,
+        }
+
+
+# === SELF TEST ===
+def scripted_input(player, frame, seed):
+    # Deterministic button mashing that changes every few frames
+    r = random.Random(seed * 1_000_003 + player * 10_007 + frame // 7)
+    bits = r.getrandbits(4)
+    return bits & ~(simulation.INPUT_LEFT if bits & simulation.INPUT_RIGHT else 0)
+
+
+def selftest(frames, latency, jitter, loss, seed):
+    # Two peers over localhost UDP; both must agree on every confirmed frame
+    question_db = [{"q": "2 + 2?", "a": "4"}]
+    host_net = UdpTransport(("127.0.0.1", 0), None, latency / 2, jitter / 2, loss, seed)
+    join_net = UdpTransport(("127.0.0.1", 0), host_net.address, latency / 2, jitter / 2, loss, seed + 1)
+    peers = [
+        RollbackSession(simulation.Match("PVP", seed=seed, question_db=question_db), 1, host_net),
+        RollbackSession(simulation.Match("PVP", seed=seed, question_db=question_db), 2, join_net),
+    ]
+    target = frames
+    deadline = time.perf_counter()
+    while min(p.frame for p in peers) < target + 2 or min(p.remote_confirmed for p in peers) < target:
+        deadline += 1 / simulation.FPS
+        for p in peers:
+            if p.match.state == "TRIVIA" and p.match.active_player.player == p.local_player:
+                p.submit_answer("4" if p.frame % 2 else "5")
+            p.advance(scripted_input(p.local_player, p.frame + p.input_delay, seed))
+        time.sleep(max(0.0, deadline - time.perf_counter()))
+
+    a, b = (p.states.checksum(target) for p in peers)
+    for p in peers:
+        print(f"P{p.local_player}: {p.stats()}")
+    print(f"frame {target}: checksums {a:08x} {b:08x} -> {'IN SYNC' if a == b else 'DESYNC'}")
+    host_net.close()
+    join_net.close()
+    return a == b
+
+
+def bench(frames=8, repeats=2000):
+    # Cost of restoring a snapshot and re-simulating `frames` frames
+    match = simulation.Match("PVP", seed=1, question_db=[{"q": "?", "a": "A"}])
+    states = StateBuffer()
+    for f in range(frames):
+        states.save(f, match)
+        match.step(simulation.INPUT_RIGHT | simulation.INPUT_ATTACK, simulation.INPUT_LEFT)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        states.restore(0, match)
+        for f in range(frames):
+            states.save(f, match)
+            match.step(simulation.INPUT_RIGHT | simulation.INPUT_ATTACK, simulation.INPUT_LEFT)
+    per = (time.perf_counter() - start) / repeats
+    print(f"rollback of {frames} frames: {per * 1e6:.1f} us ({per * simulation.FPS * 100:.2f}% of a 60 Hz frame)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rollback netcode tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    test = sub.add_parser("selftest", help="two peers over localhost with simulated network conditions")
+    test.add_argument("--frames", type=int, default=600)
+    test.add_argument("--latency", type=float, default=100, help="round trip in ms")
+    test.add_argument("--jitter", type=float, default=20, help="ms")
+    test.add_argument("--loss", type=float, default=0.1)
+    test.add_argument("--seed", type=int, default=1)
+    bench_cmd = sub.add_parser("bench", help="time snapshot restore + re-simulation")
+    bench_cmd.add_argument("--frames", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.frames)
+    else:
+        ok = selftest(args.frames, args.latency / 1000, args.jitter / 1000, args.loss, args.seed)
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# Offscreen pixel capture for vision agents and visual regression tests.
+# OffscreenRenderer draws a main.Game with the same draw_frame() the
+# window uses, but into one full-size scratch surface, then scales it
+# down into a slot of a pool of small surfaces. The pool surfaces are
+# pygame.image.frombuffer() views of a single (slots, h, w, 4) NumPy
+# array, so the scale writes straight into memory we own: render() and
+# frames() return views of that batch (no surfarray copy, no surface locks
+# to release). The 1000x500 scratch image is reused for every match and
+# never read back.
+#
+#   python offscreen.py bench --matches 64 --size 84x42 --mode gray
+#   python offscreen.py save frame.png --seed 3 --ticks 120
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import main
+from simulation import SCREEN_WIDTH, SCREEN_HEIGHT
+
+MODES = ("rgb", "gray", "palette")
+
+# Every flat color the game draws; "palette" frames are indices into this
+DEFAULT_PALETTE = (
+    main.BLACK, main.WHITE, main.RED, main.BLUE, main.GREEN, main.SKY_BLUE,
+    main.YELLOW, main.GRAY, (100, 200, 100),
+) + tuple(main.TEAM_COLORS)
+
+_fonts_ready = False
+
+
+def new_match(game_mode="PVE", seed=None):
+    # A main.Game already in FIGHT, ready to step headless and draw
+    ensure_fonts()
+    game = main.Game()
+    game.game_mode = game_mode
+    game.reset_match(seed)
+    game.state = "FIGHT"
+    return game
+
+
+def ensure_fonts():
+    global _fonts_ready
+    if not _fonts_ready:
+        main.init_fonts()
+        _fonts_ready = True
+
+
+def channel_order(surface):
+    # Byte offsets of R, G and B within a 32-bit pixel of surface
+    shifts = surface.get_shifts()[:3]
+    if sys.byteorder == "little":
+        return tuple(shift // 8 for shift in shifts)
+    return tuple(3 - shift // 8 for shift in shifts)
+
+
+def palette_lut(palette):
+    # 32x32x32 table: 5-bit RGB -> index of the nearest palette color
+    levels = (np.arange(32) << 3) + 4
+    grid = np.stack(np.meshgrid(levels, levels, levels, indexing="ij"), -1).reshape(-1, 1, 3)
+    colors = np.asarray(palette, dtype=np.int32).reshape(1, -1, 3)
+    nearest = ((grid - colors) ** 2).sum(-1).argmin(1)
+    return nearest.astype(np.uint8).reshape(32, 32, 32)
+
+
+class OffscreenRenderer:
+    def __init__(self, size=(100, 50), slots=1, mode="rgb", palette=DEFAULT_PALETTE, smooth=False):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        ensure_fonts()
+        self.size = w, h = size
+        self.mode = mode
+        self.smooth = smooth
+
+        # Full-size scratch target in the display's native format (the fast
+        # fill and blit paths), shared by every match
+        self.scratch = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+        # The pool: one small surface per slot over one array. Scaling into
+        # a same-depth surface copies raw pixels, so the bytes keep the
+        # scratch surface's channel order
+        self.pixels = np.zeros((slots, h, w, 4), dtype=np.uint8)
+        self.pool = [pygame.image.frombuffer(self.pixels[i], size, "BGRA") for i in range(slots)]
+        self.channels = channel_order(self.scratch)
+
+        # Output buffers for the reduced modes, refreshed per slot as it renders
+        self._gray = np.zeros((slots, h, w), dtype=np.uint8) if mode == "gray" else None
+        self._gray_tmp = np.zeros((h, w), dtype=np.uint16) if mode == "gray" else None
+        self._indexed = np.zeros((slots, h, w), dtype=np.uint8) if mode == "palette" else None
+        self.lut = palette_lut(palette) if mode == "palette" else None
+        self.palette = np.asarray(palette, dtype=np.uint8)
+
+    def render(self, game, slot=0, alpha=1.0):
+        # Draw one match into a pool slot; returns that slot's view
+        game.draw_frame(self.scratch, alpha)
+        scale = pygame.transform.smoothscale if self.smooth else pygame.transform.scale
+        scale(self.scratch, self.size, self.pool[slot])
+        rgb = self.rgb(self.pixels[slot])
+        if self.mode == "gray":
+            # ITU-R 601 luma in 8-bit fixed point, without a float temporary
+            tmp = self._gray_tmp
+            np.multiply(rgb[..., 0], 77, out=tmp, dtype=np.uint16)
+            tmp += rgb[..., 1] * np.uint16(150)
+            tmp += rgb[..., 2] * np.uint16(29)
+            np.right_shift(tmp, 8, out=tmp)
+            self._gray[slot] = tmp
+            return self._gray[slot]
+        if self.mode == "palette":
+            self._indexed[slot] = self.lut[rgb[..., 0] >> 3, rgb[..., 1] >> 3, rgb[..., 2] >> 3]
+            return self._indexed[slot]
+        return rgb
+
+    def render_batch(self, games, alpha=1.0):
+        # One slot per match, in order; returns the batch view
+        for slot, game in enumerate(games):
+            self.render(game, slot, alpha)
+        return self.frames(len(games))
+
+    def frames(self, count=None):
+        # (slots, h, w, 3) RGB, (slots, h, w) luma or (slots, h, w) palette indices
+        count = len(self.pool) if count is None else count
+        if self.mode == "gray":
+            return self._gray[:count]
+        if self.mode == "palette":
+            return self._indexed[:count]
+        return self.rgb(self.pixels[:count])
+
+    def rgb(self, pixels):
+        # RGB view of raw pool pixels (a view for the usual byte orders)
+        if self.channels == (2, 1, 0):
+            return pixels[..., 2::-1]
+        if self.channels == (0, 1, 2):
+            return pixels[..., :3]
+        return pixels[..., list(self.channels)]
+
+    def to_rgb(self, frame):
+        # Expand a gray or palette frame back to RGB for viewing or saving
+        if self.mode == "gray":
+            return np.repeat(frame[..., None], 3, axis=-1)
+        if self.mode == "palette":
+            return self.palette[frame]
+        return frame
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def step_headless(game, rng):
+    # Classic AI on both sides; trivia answered at random
+    if game.state == "TRIVIA":
+        game.submit_answer(game.trivia_a if rng.random() < 0.5 else "")
+    elif game.state == "FIGHT":
+        game.step(game.p1.ai_inputs(game.p2, rng))
+    else:
+        game.reset_match()
+        game.state = "FIGHT"
+
+
+def bench(matches, size, mode, ticks, seed):
+    rng = np.random.default_rng(seed)
+    games = [new_match("PVE", int(s)) for s in rng.integers(0, 2**32, matches)]
+    renderer = OffscreenRenderer(size, slots=matches, mode=mode)
+    sim_time = render_time = 0.0
+    for _ in range(ticks):
+        start = time.perf_counter()
+        for game in games:
+            step_headless(game, game.rng)
+        mid = time.perf_counter()
+        renderer.render_batch(games)
+        render_time += time.perf_counter() - mid
+        sim_time += mid - start
+    frames = matches * ticks
+    print(f"{frames} frames at {size[0]}x{size[1]} {mode}: {frames / render_time:,.0f} frames/s rendering "
+          f"({render_time / frames * 1e6:.0f} us each), simulation {sim_time / frames * 1e6:.0f} us/tick")
+
+
+def save(path, size, mode, ticks, seed):
+    game = new_match("PVE", seed)
+    for _ in range(ticks):
+        step_headless(game, game.rng)
+    renderer = OffscreenRenderer(size, mode=mode)
+    rgb = np.ascontiguousarray(renderer.to_rgb(renderer.render(game)))
+    pygame.image.save(pygame.image.frombuffer(rgb, size, "RGB"), path)
+    print(f"saved {path} ({size[0]}x{size[1]} {mode}, tick {game.tick})")
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="Offscreen frame capture.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("bench", help="frames/s of simulation + capture for many matches")
+    b.add_argument("--matches", type=int, default=64)
+    b.add_argument("--ticks", type=int, default=100)
+    s = sub.add_parser("save", help="write one captured frame as an image")
+    s.add_argument("path")
+    s.add_argument("--ticks", type=int, default=120)
+    for p in (b, s):
+        p.add_argument("--size", type=parse_size, default=(100, 50), help="WxH, default 100x50")
+        p.add_argument("--mode", choices=MODES, default="rgb")
+        p.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.command == "bench":
+        bench(args.matches, args.size, args.mode, args.ticks, args.seed)
+    else:
+        save(args.path, args.size, args.mode, args.ticks, args.seed)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,157 @@
+# Per-phase frame timing.
+# The main loop wraps each phase of a frame (event polling, Game.update,
+# each Fighter step, drawing, the display flip) in profiler.phase(name).
+# Durations are summed per frame into rolling windows for p50/p95/p99 and
+# kept as a trace that can be exported as CSV or JSON on exit. When the
+# profiler is off, phase() hands back a shared no-op context manager, so
+# the instrumented loop costs a method call per phase and nothing else.
+
+import csv
+import json
+import time
+from array import array
+from collections import deque
+
+import pygame
+
+from fonts import sys_font
+
+PHASES = ("events", "update", "fighter1", "fighter2", "draw", "flip", "frame")
+
+
+class _Phase:
+    __slots__ = ("totals", "name", "start")
+
+    def __init__(self, totals, name):
+        self.totals = totals
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.totals[self.name] += time.perf_counter() - self.start
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+NO_PHASE = _NoPhase()
+
+
+class FrameProfiler:
+    def __init__(self, window=600, max_trace_frames=60 * 60 * 60):
+        self.enabled = False
+        self.tracing = False        # keep recording with the overlay hidden (for export)
+        self.overlay_visible = False
+        self.window = window
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.samples = {name: array('d', bytes(8 * window)) for name in PHASES}
+        self.filled = 0
+        self.cursor = 0
+        self.trace = deque(maxlen=max_trace_frames)
+        self.frame_index = 0
+        self.frame_start = 0.0
+        self.frame_open = False     # begin_frame ran while enabled; end_frame may record
+        self._phases = {name: _Phase(self.totals, name) for name in PHASES}
+        self._overlay_lines = []
+        self._overlay_age = 0
+        self._font = None
+        self.counters = {}          # overlay label -> callable returning a short string
+
+    def phase(self, name):
+        return self._phases[name] if self.enabled else NO_PHASE
+
+    def begin_frame(self):
+        self.frame_open = self.enabled
+        if self.enabled:
+            # Phases timed before the profiler was switched on this frame don't count
+            for name in PHASES:
+                self.totals[name] = 0.0
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        # Only frames that were enabled from begin_frame on: switching on
+        # mid-frame would record a stale frame_start as one huge frame
+        if not (self.enabled and self.frame_open):
+            return
+        self.frame_open = False
+        totals = self.totals
+        totals["frame"] = time.perf_counter() - self.frame_start
+        for name in PHASES:
+            self.samples[name][self.cursor] = totals[name]
+        self.cursor = (self.cursor + 1) % self.window
+        self.filled = min(self.filled + 1, self.window)
+        self.trace.append((self.frame_index, self.frame_start) + tuple(totals[n] for n in PHASES))
+        self.frame_index += 1
+        for name in PHASES:
+            totals[name] = 0.0
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+        self.enabled = self.overlay_visible or self.tracing
+        if not self.enabled:
+            self.frame_open = False
+
+    # === STATS ===
+    def percentiles(self, name, qs=(50, 95, 99)):
+        # Rolling percentiles (seconds) over the last `window` frames
+        if not self.filled:
+            return [0.0 for _ in qs]
+        data = sorted(self.samples[name][:self.filled])
+        return [data[min(len(data) - 1, int(len(data) * q / 100))] for q in qs]
+
+    def summary(self):
+        return {name: dict(zip(("p50", "p95", "p99"), self.percentiles(name))) for name in PHASES}
+
+    # === OVERLAY ===
+    def overlay_rect(self, surface):
+        rows = len(PHASES) + 1 + len(self.counters)
+        return pygame.Rect(surface.get_width() - 250, 10, 240, 10 + 18 * rows)
+
+    def draw_overlay(self, surface, color=(255, 255, 255), background=(0, 0, 0)):
+        # Text is re-rendered twice a second, not every frame
+        self._overlay_age -= 1
+        if self._overlay_age <= 0:
+            self._overlay_age = 30
+            if self._font is None:
+                self._font = sys_font("consolas,dejavusansmono,monospace", 15)
+            font = self._font
+            rows = [f"{'ms':<9}{'p50':>7}{'p95':>7}{'p99':>7}"]
+            for name in PHASES:
+                p50, p95, p99 = (v * 1000 for v in self.percentiles(name))
+                rows.append(f"{name:<9}{p50:>7.2f}{p95:>7.2f}{p99:>7.2f}")
+            for label, read in self.counters.items():
+                rows.append(f"{label:<9}{read():>21}")
+            self._overlay_lines = [font.render(row, True, color) for row in rows]
+        area = self.overlay_rect(surface)
+        surface.fill(background, area)
+        for i, line in enumerate(self._overlay_lines):
+            surface.blit(line, (area.x + 10, area.y + 5 + i * 18))
+        return area
+
+    # === EXPORT ===
+    def export(self, path):
+        # "frame" is the frame duration (a phase); the frame number is "index"
+        columns = ("index", "time") + PHASES
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"columns": columns, "summary": self.summary(),
+                           "frames": list(self.trace)}, f)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(self.trace)
+
+
+# Process-wide profiler used by main.py
+profiler = FrameProfiler()
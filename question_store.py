@@ -0,0 +1,223 @@
+# Indexed trivia question store.
+# questions.json is compiled once into questions.json.qdb next to it (and
+# rebuilt whenever the JSON's size or mtime changes):
+#
+#   header   b"MMQB", version, source size, source mtime, content CRC,
+#            question count, group table length
+#   groups   JSON list of [category, difficulty, first, count], sorted
+#   offsets  count + 1 little-endian u64 offsets into the blob
+#   blob     one compact JSON object per question, grouped by
+#            (category, difficulty)
+#
+# Opening a store reads the header and the group table and memory-maps
+# the rest, so startup doesn't depend on the size of the bank; a question
+# is only decoded when it is drawn. Filtering by category and difficulty
+# is a lookup in the group table, and QuestionBag draws without repeats
+# (a lazy Fisher-Yates shuffle) until every matching question was used.
+#
+#   python question_store.py build questions.json
+#   python question_store.py info questions.json
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import random
+import struct
+import time
+import zlib
+
+MAGIC = b"MMQB"
+VERSION = 1
+HEADER = struct.Struct("<4sIQqIII")
+DEFAULT_CATEGORY = "general"
+DEFAULT_DIFFICULTY = 1
+
+
+def content_crc(questions):
+    # Identifies a question bank independent of file layout (replays store it)
+    return zlib.crc32(json.dumps(questions, sort_keys=True).encode())
+
+
+def group_key(question):
+    return (question.get("category", DEFAULT_CATEGORY), int(question.get("difficulty", DEFAULT_DIFFICULTY)))
+
+
+def build_index(path, out_path=None):
+    with open(path, "rb") as f:
+        source = f.read()
+    questions = json.loads(source)
+    st = os.stat(path)
+    order = sorted(range(len(questions)), key=lambda i: group_key(questions[i]))
+
+    groups = []
+    offsets = [0]
+    blob = bytearray()
+    for pos, i in enumerate(order):
+        key = group_key(questions[i])
+        if groups and (groups[-1][0], groups[-1][1]) == key:
+            groups[-1][3] += 1
+        else:
+            groups.append([key[0], key[1], pos, 1])
+        blob += json.dumps(questions[i], separators=(",", ":")).encode()
+        offsets.append(len(blob))
+
+    table = json.dumps(groups).encode()
+    table += b" " * (-(HEADER.size + len(table)) % 8)
+    out = bytearray(HEADER.pack(MAGIC, VERSION, st.st_size, st.st_mtime_ns,
+                                content_crc(questions), len(questions), len(table)))
+    out += table
+    out += struct.pack(f"<{len(offsets)}Q", *offsets)
+    out += blob
+
+    tmp = (out_path or path + ".qdb") + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(out)
+    os.replace(tmp, out_path or path + ".qdb")
+
+
+# === STORE ===
+class QuestionStore:
+    def __init__(self, path=None, questions=None):
+        # Either a compiled .qdb file or an in-memory list of questions
+        self.path = path
+        self._map = None
+        if questions is not None:
+            order = sorted(range(len(questions)), key=lambda i: group_key(questions[i]))
+            self._items = [questions[i] for i in order]
+            self.crc = content_crc(questions)
+            self.groups = []
+            for pos, item in enumerate(self._items):
+                key = group_key(item)
+                if self.groups and self.groups[-1][:2] == key:
+                    self.groups[-1] = (key[0], key[1], self.groups[-1][2], self.groups[-1][3] + 1)
+                else:
+                    self.groups.append((key[0], key[1], pos, 1))
+            self.count = len(self._items)
+            return
+
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, _, self.crc, self.count, table_len = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a question index")
+        start = HEADER.size
+        self.groups = [tuple(g) for g in json.loads(self._map[start:start + table_len])]
+        start += table_len
+        self._offsets = memoryview(self._map)[start:start + 8 * (self.count + 1)].cast("Q")
+        self._blob = start + 8 * (self.count + 1)
+        self._items = None
+
+    @classmethod
+    def open(cls, path="questions.json"):
+        # Use (or build) the compiled index for a questions JSON file
+        index = path + ".qdb"
+        st = os.stat(path)
+        try:
+            with open(index, "rb") as f:
+                magic, version, size, mtime, *_ = HEADER.unpack(f.read(HEADER.size))
+            fresh = magic == MAGIC and version == VERSION and (size, mtime) == (st.st_size, st.st_mtime_ns)
+        except (OSError, struct.error):
+            fresh = False
+        if not fresh:
+            try:
+                build_index(path)
+            except OSError:
+                # Read-only install: fall back to parsing the JSON
+                with open(path, "rb") as f:
+                    return cls(questions=json.load(f))
+        return cls(index)
+
+    def __len__(self):
+        return self.count
+
+    def get(self, i):
+        if self._items is not None:
+            return self._items[i]
+        return json.loads(self._map[self._blob + self._offsets[i]:self._blob + self._offsets[i + 1]])
+
+    def categories(self):
+        return sorted({g[0] for g in self.groups})
+
+    def select(self, category=None, difficulty=None):
+        # (first, count) ranges of the questions matching the filter
+        return [(g[2], g[3]) for g in self.groups
+                if (category is None or g[0] == category) and (difficulty is None or g[1] == difficulty)]
+
+    def bag(self, seed, category=None, difficulty=None):
+        ranges = self.select(category, difficulty)
+        if not ranges:
+            raise ValueError(f"no questions for category={category!r} difficulty={difficulty!r}")
+        return QuestionBag(self, ranges, seed)
+
+
+# === SAMPLING ===
+class QuestionBag:
+    # Shuffle-bag over the filtered questions. The whole draw sequence is a
+    # function of the seed, so a bag can be rewound or fast-forwarded to any
+    # position (replays and rollback rely on this).
+    def __init__(self, store, ranges, seed):
+        self.store = store
+        self.ranges = ranges
+        self.seed = seed
+        self.starts = []
+        total = 0
+        for _, count in ranges:
+            self.starts.append(total)
+            total += count
+        self.size = total
+        self.rewind()
+
+    def rewind(self):
+        self.rng = random.Random(self.seed)
+        self.swapped = {}
+        self.remaining = self.size
+        self.position = 0
+        self.last = None  # Store index of the last question drawn
+
+    def seek(self, position):
+        if position < self.position:
+            self.rewind()
+        while self.position < position:
+            self._next()
+
+    def _next(self):
+        # One step of Fisher-Yates; `swapped` only holds the moved slots
+        if self.remaining == 0:
+            self.swapped.clear()
+            self.remaining = self.size
+        self.remaining -= 1
+        j = self.rng.randrange(self.remaining + 1)
+        last = self.remaining
+        pick = self.swapped.get(j, j)
+        self.swapped[j] = self.swapped.pop(last, last)
+        self.position += 1
+        return pick
+
+    def draw(self):
+        k = self._next()
+        r = bisect.bisect_right(self.starts, k) - 1
+        self.last = self.ranges[r][0] + k - self.starts[r]
+        return self.store.get(self.last)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the trivia question index.")
+    parser.add_argument("command", choices=("build", "info"))
+    parser.add_argument("path", nargs="?", default="questions.json")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        build_index(args.path)
+        print(f"built {args.path}.qdb in {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    store = QuestionStore.open(args.path)
+    print(f"{len(store)} questions, opened in {(time.perf_counter() - start) * 1000:.2f} ms")
+    for category, difficulty, _, count in store.groups:
+        print(f"  {category:<20} difficulty {difficulty}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Dirty-rectangle renderer for main.Game.
+# Instead of clearing and redrawing the whole window and flipping every
+# frame, the static layer (sky, ground and the controls overlay) is
+# composited once per game mode and only the regions that changed are
+# pushed with pygame.display.update(rects):
+#   FIGHT      - restore the background under each fighter's old and new
+#                bounds (body, health bar, hitbox) and redraw the fighters
+#   TRIVIA     - the frozen scene is drawn once; only the answer line is
+#                restored and re-rendered, and only when the input changes
+#   MENU/PAUSE/GAME_OVER - drawn once on entry, then cost nothing per frame
+# Any change of state (or menu selection / question) forces a full redraw.
+
+import pygame
+
+from profiler import profiler
+
+
+class DirtyRenderer:
+    def __init__(self, game, surface):
+        self.game = game
+        self.surface = surface
+        self.background = None
+        self.background_mode = None
+        self.frozen = None          # TRIVIA screen without the answer line
+        self.scene_key = None
+        self.sprite_rects = []
+        self.answer_rect = None
+        self.answer_text = None
+        self.dirty = []             # Rects pushed on the last frame
+
+    def invalidate(self):
+        # Force a full redraw next frame (window exposed, fullscreen toggled...)
+        self.scene_key = None
+
+    def build_background(self):
+        self.background = pygame.Surface(self.surface.get_size(), 0, self.surface)
+        self.game.draw_background(self.background)
+        self.game.draw_controls(self.background)
+        self.background_mode = self.game.game_mode
+
+    def draw(self, alpha=1.0):
+        game = self.game
+        display = pygame.display.get_surface()
+        if display is not None and display is not self.surface:
+            self.surface = display
+            self.background = None
+            self.invalidate()
+
+        key = (game.state, game.game_mode, game.menu_index, game.trivia_q, profiler.overlay_visible)
+        with profiler.phase("draw"):
+            self.dirty = []
+            if key != self.scene_key:
+                self.scene_key = key
+                self.full_redraw(alpha)
+            elif game.state == "FIGHT":
+                self.draw_fight(alpha)
+            elif game.state == "TRIVIA":
+                self.draw_answer()
+            if profiler.overlay_visible:
+                self.draw_overlay()
+
+        with profiler.phase("flip"):
+            if self.dirty == [self.surface.get_rect()]:
+                pygame.display.flip()
+            elif self.dirty:
+                pygame.display.update(self.dirty)
+
+    def full_redraw(self, alpha=1.0):
+        game = self.game
+        if game.state != "MENU" and (self.background is None or self.background_mode != game.game_mode):
+            self.build_background()
+
+        if game.state == "FIGHT":
+            self.surface.blit(self.background, (0, 0))
+            for f in game.fighters:
+                f.draw(self.surface, alpha)
+            self.sprite_rects = [f.bounds(alpha) for f in game.fighters]
+        elif game.state == "TRIVIA":
+            self.surface.blit(self.background, (0, 0))
+            for f in game.fighters:
+                f.draw(self.surface)
+            game.draw_trivia(self.surface, answer=False)
+            self.frozen = self.surface.copy()
+            self.answer_rect = game.draw_trivia_answer(self.surface)
+            self.answer_text = game.user_input
+        else:
+            game.draw_frame(self.surface)
+
+        self.dirty = [self.surface.get_rect()]
+
+    def draw_fight(self, alpha=1.0):
+        game = self.game
+        fighters = game.fighters
+        new_rects = [f.bounds(alpha) for f in fighters]
+
+        # Restore everything first so one fighter's cleanup can't erase the other
+        for old, new in zip(self.sprite_rects, new_rects):
+            area = old.union(new)
+            self.surface.blit(self.background, area, area)
+            self.dirty.append(area)
+        for f in fighters:
+            f.draw(self.surface, alpha)
+
+        self.sprite_rects = new_rects
+
+    def draw_answer(self):
+        game = self.game
+        if game.user_input == self.answer_text:
+            return
+        old = self.answer_rect
+        self.surface.blit(self.frozen, old, old)
+        new = game.draw_trivia_answer(self.surface)
+        self.answer_rect = new
+        self.answer_text = game.user_input
+        self.dirty.append(old.union(new))
+
+    def draw_overlay(self):
+        # The overlay is opaque and drawn last, so it never needs restoring
+        area = profiler.draw_overlay(self.surface)
+        if self.dirty != [self.surface.get_rect()]:
+            self.dirty.append(area)
@@ -0,0 +1,285 @@
+# Compact match replays.
+# A match is fully determined by its seed, the question bank and the input
+# frames fed to Match.step, so that is all a replay stores:
+#
+#   header  b"MMRP", version, flags (bit 0 = PVE), seed, question bank CRC,
+#           question bag seed and position, category filter, difficulty
+#   records RUN    count, inputs   one byte per tick: P1 bits | P2 bits << 4,
+#                                  run-length encoded
+#           ANSWER text            what was typed when check_answer ran
+#           EVENT  text            menu / pause events (informational)
+#           END    ticks, p1 hp, p2 hp, winner
+#
+# Integers are LEB128 varints (zigzag for health), so a full match is a
+# few hundred bytes to a few KB. Playback is headless and as fast as
+# possible by default (verify), or rendered at real time / N x speed.
+#
+#   python replay.py verify replays/*.mmr
+#   python replay.py play replays/match.mmr --speed 4
+
+import argparse
+import struct
+import sys
+import time
+
+import simulation
+
+MAGIC = b"MMRP"
+VERSION = 2
+FLAG_PVE = 1
+
+RUN = 1
+ANSWER = 2
+EVENT = 3
+END = 4
+
+
+class ReplayError(Exception):
+    pass
+
+
+# === VARINTS ===
+def write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+# === RECORDING ===
+class ReplayRecorder:
+    # Attach to Match.recorder; the match calls tick() and answer() itself
+    def __init__(self, match):
+        self.out = bytearray(MAGIC)
+        self.out += struct.pack("<BB", VERSION, FLAG_PVE if match.game_mode == "PVE" else 0)
+        write_varint(self.out, match.seed)
+        self.out += struct.pack("<I", match.question_db.crc)
+        write_varint(self.out, match.question_bag.seed)
+        write_varint(self.out, match.question_bag.position)
+        category = (match.question_category or "").encode("utf-8")
+        write_varint(self.out, len(category))
+        self.out += category
+        write_varint(self.out, match.question_difficulty or 0)
+        self.run_value = None
+        self.run_length = 0
+
+    def _flush_run(self):
+        if self.run_length:
+            self.out.append(RUN)
+            write_varint(self.out, self.run_length)
+            self.out.append(self.run_value)
+            self.run_length = 0
+
+    def tick(self, p1_input, p2_input):
+        value = (p1_input & 0xF) | (p2_input & 0xF) << 4
+        if value != self.run_value:
+            self._flush_run()
+            self.run_value = value
+        self.run_length += 1
+
+    def _text(self, tag, text):
+        self._flush_run()
+        self.run_value = None
+        data = text.encode("utf-8")
+        self.out.append(tag)
+        write_varint(self.out, len(data))
+        self.out += data
+
+    def answer(self, text):
+        self._text(ANSWER, text)
+
+    def event(self, name):
+        self._text(EVENT, name)
+
+    def finish(self, match):
+        self._flush_run()
+        self.out.append(END)
+        write_varint(self.out, match.tick)
+        write_varint(self.out, zigzag(match.p1.health))
+        write_varint(self.out, zigzag(match.p2.health))
+        self.out.append(match.winner())
+        return bytes(self.out)
+
+
+# === PLAYBACK ===
+class Replay:
+    def __init__(self, data):
+        if data[:4] != MAGIC:
+            raise ReplayError("not a Mementos Melee replay")
+        version, flags = struct.unpack_from("<BB", data, 4)
+        if version != VERSION:
+            raise ReplayError(f"unsupported replay version {version}")
+        self.game_mode = "PVE" if flags & FLAG_PVE else "PVP"
+        self.seed, pos = read_varint(data, 6)
+        self.question_crc, = struct.unpack_from("<I", data, pos)
+        self.bag_seed, pos = read_varint(data, pos + 4)
+        self.bag_position, pos = read_varint(data, pos)
+        length, pos = read_varint(data, pos)
+        self.category = data[pos:pos + length].decode("utf-8") or None
+        difficulty, pos = read_varint(data, pos + length)
+        self.difficulty = difficulty or None
+        self.data = data
+        self.body = pos
+        self.result = None
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def records(self):
+        # Yields ("tick", p1, p2), ("answer", text), ("event", text) in order
+        data, pos = self.data, self.body
+        while pos < len(data):
+            tag = data[pos]
+            pos += 1
+            if tag == RUN:
+                count, pos = read_varint(data, pos)
+                value = data[pos]
+                pos += 1
+                record = ("tick", value & 0xF, value >> 4)
+                for _ in range(count):
+                    yield record
+            elif tag in (ANSWER, EVENT):
+                length, pos = read_varint(data, pos)
+                text = data[pos:pos + length].decode("utf-8")
+                pos += length
+                yield ("answer" if tag == ANSWER else "event", text)
+            elif tag == END:
+                ticks, pos = read_varint(data, pos)
+                p1, pos = read_varint(data, pos)
+                p2, pos = read_varint(data, pos)
+                self.result = (ticks, unzigzag(p1), unzigzag(p2), data[pos])
+                return
+            else:
+                raise ReplayError(f"corrupt replay: unknown record {tag}")
+
+    def new_match(self, question_db=None):
+        return self.prepare(simulation.Match(self.game_mode, seed=self.seed, question_db=question_db))
+
+    def prepare(self, match):
+        # Put the question bank and bag where they were when recording started
+        if match.question_db.crc != self.question_crc:
+            raise ReplayError("question bank differs from the one this match was recorded with")
+        match.question_category = self.category
+        match.question_difficulty = self.difficulty
+        match.new_question_bag(self.bag_seed, self.bag_position)
+        return match
+
+    def run(self, match):
+        # Feed every record through the match as fast as possible
+        for record in self.records():
+            if record[0] == "tick":
+                if match.state != "FIGHT":
+                    raise ReplayError(f"desync at tick {match.tick}: match is in {match.state}")
+                match.step(record[1], record[2])
+            elif record[0] == "answer":
+                if match.state != "TRIVIA":
+                    raise ReplayError(f"desync at tick {match.tick}: answer outside TRIVIA")
+                match.submit_answer(record[1])
+        return match
+
+    def verify(self, question_db=None):
+        # True if replaying reproduces the recorded final state
+        match = self.run(self.new_match(question_db))
+        final = (match.tick, match.p1.health, match.p2.health, match.winner())
+        return final == self.result, match
+
+
+# === RUN ===
+def play(path, speed):
+    # Rendered playback through main.Game at `speed` x real time
+    import pygame
+    import main
+    from timestep import FixedTimestep, FramePacer
+
+    replay = Replay.load(path)
+    main.init_display()
+    game = main.Game()
+    game.game_mode = replay.game_mode
+    game.reset_match(replay.seed)
+    replay.prepare(game)
+    game.state = "FIGHT"
+
+    timestep = FixedTimestep(simulation.FPS * speed, max_ticks_per_frame=10 ** 6)
+    pacer = FramePacer(simulation.FPS)
+    records = replay.records()
+    hold = 0
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+        for _ in range(timestep.advance(pacer.wait())):
+            if hold:
+                # Leave the typed answer on screen for a second of match time
+                hold -= 1
+                if not hold:
+                    game.check_answer()
+                continue
+            record = next(records, None)
+            if record is None:
+                break
+            if record[0] == "tick":
+                game.step(record[1], record[2])
+            elif record[0] == "answer":
+                game.user_input = record[1]
+                hold = simulation.FPS
+        game.draw()
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back or verify match replays.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    verify_cmd = sub.add_parser("verify", help="replay headless and check the recorded result")
+    verify_cmd.add_argument("files", nargs="+")
+    verify_cmd.add_argument("--questions", default="questions.json")
+    play_cmd = sub.add_parser("play", help="watch a replay")
+    play_cmd.add_argument("file")
+    play_cmd.add_argument("--speed", type=float, default=1.0, help="playback speed, 0 = as fast as possible")
+    args = parser.parse_args()
+
+    if args.command == "play" and args.speed > 0:
+        play(args.file, args.speed)
+        return
+
+    files = args.files if args.command == "verify" else [args.file]
+    question_db = simulation.load_questions(getattr(args, "questions", "questions.json"))
+    failed = 0
+    for path in files:
+        start = time.perf_counter()
+        try:
+            ok, match = Replay.load(path).verify(question_db)
+        except ReplayError as e:
+            ok, match = False, None
+            print(f"{path}: {e}")
+        ms = (time.perf_counter() - start) * 1000
+        if match:
+            print(f"{path}: {'OK' if ok else 'MISMATCH'} ({match.tick} ticks, "
+                  f"winner P{match.winner()}, {ms:.1f} ms)")
+        failed += not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
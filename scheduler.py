@@ -0,0 +1,119 @@
+# Tick-driven coroutines for timed transitions and scripted sequences
+# (round banners, countdowns, intros). A task is a generator; what it
+# yields says when it wants to run again:
+#   yield          next tick
+#   yield 120      in 120 ticks
+#   yield task     when another task has finished (gets its return value)
+# and `yield from other_sequence()` runs a sub-sequence inline. Nothing
+# ever sleeps: the game loop calls tick() once per simulation tick and
+# keeps drawing and pumping events while a sequence "waits".
+#
+# Waiting tasks sit in a heap keyed by the tick they are due, so one
+# scheduler can carry thousands of matches and only pays for the tasks
+# that actually wake up. Every task can have an owner (a match, a
+# fighter...) and cancel(owner) stops everything that owner started.
+
+import heapq
+import itertools
+
+
+class Task:
+    __slots__ = ("gen", "owner", "done", "cancelled", "result", "waiters")
+
+    def __init__(self, gen, owner):
+        self.gen = gen
+        self.owner = owner
+        self.done = False
+        self.cancelled = False
+        self.result = None
+        self.waiters = []           # Tasks blocked on this one
+
+
+class Scheduler:
+    def __init__(self):
+        self.now = 0                # Ticks since the scheduler started
+        self._queue = []            # (due tick, sequence number, task, value to send)
+        self._order = itertools.count()
+        self._owned = {}            # owner -> set of live tasks
+        self.live = 0               # Tasks not finished or cancelled
+
+    def spawn(self, gen, owner=None, delay=0):
+        # Start a generator; it first runs on the next tick() (or later with delay)
+        task = Task(gen, owner)
+        self.live += 1
+        if owner is not None:
+            self._owned.setdefault(owner, set()).add(task)
+        self._push(task, self.now + max(1, delay) if delay else self.now, None)
+        return task
+
+    def after(self, ticks, fn, *args, owner=None):
+        # Call fn(*args) once, `ticks` ticks from now
+        def call():
+            yield ticks
+            fn(*args)
+        return self.spawn(call(), owner)
+
+    def tick(self):
+        # Advance one tick and resume every task that is due
+        self.now += 1
+        queue = self._queue
+        while queue and queue[0][0] <= self.now:
+            _, _, task, value = heapq.heappop(queue)
+            if not task.done:
+                self._resume(task, value)
+
+    def cancel(self, target):
+        # Stop a task, or every task of an owner
+        if isinstance(target, Task):
+            tasks = [target]
+        else:
+            tasks = list(self._owned.get(target, ()))
+        for task in tasks:
+            if not task.done:
+                task.cancelled = True
+                if not task.gen.gi_running:     # A task cancelling itself is closed in _resume
+                    task.gen.close()
+                self._finish(task, None)
+
+    def pending(self, owner=None):
+        # Number of live tasks (of one owner, or in total)
+        if owner is not None:
+            return len(self._owned.get(owner, ()))
+        return self.live
+
+    def _push(self, task, due, value):
+        heapq.heappush(self._queue, (due, next(self._order), task, value))
+
+    def _resume(self, task, value):
+        try:
+            wait = task.gen.send(value)
+        except StopIteration as stop:
+            self._finish(task, stop.value)
+            return
+        if task.done:
+            task.gen.close()
+        elif wait is None:
+            self._push(task, self.now + 1, None)
+        elif isinstance(wait, Task):
+            if wait.done:
+                self._push(task, self.now, wait.result)
+            else:
+                wait.waiters.append(task)
+        else:
+            self._push(task, self.now + max(1, int(wait)), None)
+
+    def _finish(self, task, result):
+        task.done = True
+        task.result = result
+        self.live -= 1
+        if task.owner is not None:
+            owned = self._owned.get(task.owner)
+            if owned is not None:
+                owned.discard(task)
+                if not owned:
+                    del self._owned[task.owner]
+        # Waiters pick up on this same tick
+        for waiter in task.waiters:
+            if not waiter.done:
+                self._push(waiter, self.now, result)
+        task.waiters = []
@@ -0,0 +1,261 @@
+# Lookahead AI: depth-limited minimax over cloned Fighter state.
+# The search plays real simulation.Fighter.step() ticks on copies of the
+# two fighters, so it sees exactly what the game does: the 20-tick attack
+# cooldown, the hit window inside it and the jump arc. Moves are "macro"
+# actions held for MACRO_FRAMES ticks; each ply is one macro for us
+# followed by the opponent's worst-case reply, searched with alpha-beta
+# and iterative deepening until the think time runs out. The deepest
+# completed iteration's best move is the answer.
+#
+# LookaheadPolicy (an ai.Policy) runs the search in worker processes so
+# the 60 FPS loop never waits on it: decide() sends the current state down
+# a pipe every MACRO_FRAMES ticks, picks up whatever results have arrived
+# and keeps pressing the best move found so far. The root moves are split
+# across the workers, so more cores search deeper.
+#
+#   python main.py --ai lookahead
+#   python search_ai.py duel --games 20 --think-ms 60
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+
+import ai
+import simulation
+from simulation import Fighter, INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_ATTACK
+
+MACRO_FRAMES = 4    # Ticks each searched move is held
+MAX_DEPTH = 8       # Plies (our move + their reply)
+CHECK_EVERY = 32    # Nodes between deadline / new-state checks
+WIN_SCORE = 1000
+
+ACTIONS = (
+    0, INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_ATTACK,
+    INPUT_LEFT | INPUT_JUMP, INPUT_RIGHT | INPUT_JUMP,
+    INPUT_LEFT | INPUT_ATTACK, INPUT_RIGHT | INPUT_ATTACK,
+)
+
+# Fighter fields sent to the workers (plus rect x/y)
+STATE_FIELDS = ("health", "vel_y", "is_jumping", "attacking", "attack_cooldown", "flip", "hit_flash")
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+# === STATE ===
+def pack(fighter):
+    return (fighter.rect.x, fighter.rect.y) + tuple(getattr(fighter, k) for k in STATE_FIELDS)
+
+
+def unpack(state):
+    f = Fighter(state[0], state[1])
+    for k, v in zip(STATE_FIELDS, state[2:]):
+        setattr(f, k, v)
+    return f
+
+
+def clone(fighter):
+    f = object.__new__(Fighter)
+    f.__dict__.update(fighter.__dict__)
+    f.rect = fighter.rect.copy()
+    return f
+
+
+def play(me, opp, my_bits, opp_bits):
+    # One macro on copies; the opponent (P1 in PVE) moves first like Match.step
+    me, opp = clone(me), clone(opp)
+    for _ in range(MACRO_FRAMES):
+        opp.step(opp_bits, me)
+        me.step(my_bits, opp)
+        if me.health <= 0 or opp.health <= 0:
+            break
+    return me, opp
+
+
+def evaluate(me, opp):
+    if opp.health <= 0 or me.health <= 0:
+        return WIN_SCORE * ((opp.health <= 0) - (me.health <= 0))
+    score = (me.health - opp.health) * 10
+    # Standing in range is good when we can swing and they can't
+    if abs(me.rect.centerx - opp.rect.centerx) < 80:
+        score += 15 * (me.attack_cooldown == 0) - 15 * (opp.attack_cooldown == 0)
+    return score - abs(me.rect.centerx - opp.rect.centerx) / 100
+
+
+# === SEARCH ===
+class Search:
+    def __init__(self, deadline, interrupted=None):
+        self.deadline = deadline
+        self.interrupted = interrupted  # Extra stop test (new state waiting)
+        self.nodes = 0
+
+    def tick(self):
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0:
+            if time.perf_counter() > self.deadline or (self.interrupted and self.interrupted()):
+                raise SearchTimeout
+
+    def max_value(self, me, opp, depth, alpha, beta):
+        if depth == 0 or me.health <= 0 or opp.health <= 0:
+            return evaluate(me, opp)
+        for bits in ACTIONS:
+            value = self.min_value(me, opp, bits, depth, alpha, beta)
+            if value > alpha:
+                alpha = value
+                if alpha >= beta:
+                    break
+        return alpha
+
+    def min_value(self, me, opp, my_bits, depth, alpha, beta):
+        # The opponent answers our macro with its worst case for us
+        for bits in ACTIONS:
+            self.tick()
+            child_me, child_opp = play(me, opp, my_bits, bits)
+            beta = min(beta, self.max_value(child_me, child_opp, depth - 1, alpha, beta))
+            if beta <= alpha:
+                break
+        return beta
+
+    def iterate(self, me, opp, root_actions):
+        # Yields (depth, best action, value) after every completed depth
+        order = list(root_actions)
+        for depth in range(1, MAX_DEPTH + 1):
+            values = {}
+            alpha = -WIN_SCORE - 1
+            try:
+                for bits in order:
+                    values[bits] = self.min_value(me, opp, bits, depth, alpha, WIN_SCORE + 1)
+                    alpha = max(alpha, values[bits])
+            except SearchTimeout:
+                return
+            order.sort(key=lambda b: -values[b])  # best first next time
+            yield depth, order[0], values[order[0]]
+
+
+def best_action(me, opp, think_time, root_actions=ACTIONS):
+    # Synchronous search; (depth reached, action, value)
+    result = (0, ACTIONS[0], 0)
+    for result in Search(time.perf_counter() + think_time).iterate(me, opp, root_actions):
+        pass
+    return result
+
+
+def _worker(conn, root_actions, think_time):
+    # Search the newest state until a newer one arrives or time is up
+    if hasattr(os, "nice"):
+        os.nice(10)  # the game process wins any fight for a core
+    while True:
+        msg = conn.recv()
+        while msg is not None and conn.poll():
+            msg = conn.recv()
+        if msg is None:
+            return
+        state_id, me, opp = msg
+        search = Search(time.perf_counter() + think_time, conn.poll)
+        for depth, bits, value in search.iterate(unpack(me), unpack(opp), root_actions):
+            conn.send((state_id, depth, bits, value))
+
+
+# === POLICY ===
+class LookaheadPolicy(ai.Policy):
+    budget = 0.0002  # Main-thread cost per tick: a pipe send and a poll
+    # Never skip a tick: a held tick would miss a poll and shift the
+    # every-MACRO_FRAMES send schedule, and the cost is pipe I/O anyway
+    holds = False
+
+    def __init__(self, workers=None, think_time=None, budget=None, enforce_budget=False):
+        super().__init__(budget, enforce_budget)
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 2) - 1)
+        workers = min(workers, len(ACTIONS))
+        self.think_time = think_time or MACRO_FRAMES / simulation.FPS
+        ctx = multiprocessing.get_context("spawn")  # don't fork a process that owns a window
+        self.pipes = []
+        for i in range(workers):
+            parent, child = ctx.Pipe()
+            ctx.Process(target=_worker, args=(child, ACTIONS[i::workers], self.think_time),
+                        daemon=True).start()
+            self.pipes.append(parent)
+        self.state_id = 0
+        self.ticks = 0
+        self.reports = {}  # worker -> (depth, action, value) for the current state
+        self.bits = 0
+        self.depth = 0
+
+    def _decide(self, pairs, rng):
+        # Searches the first pair; any others (BATTLE) use the classic AI
+        me, opp = pairs[0]
+        self.poll()
+        if self.ticks % MACRO_FRAMES == 0:
+            self.state_id += 1
+            self.reports = {}
+            msg = (self.state_id, pack(me), pack(opp))
+            for conn in self.pipes:
+                conn.send(msg)
+        self.ticks += 1
+        return [self.bits] + [f.ai_inputs(target, rng) for f, target in pairs[1:]]
+
+    def poll(self):
+        for i, conn in enumerate(self.pipes):
+            while conn.poll():
+                state_id, depth, bits, value = conn.recv()
+                if state_id == self.state_id:
+                    self.reports[i] = (depth, bits, value)
+        if self.reports:
+            self.depth, self.bits, _ = max(self.reports.values(), key=lambda r: r[2])
+
+    def close(self):
+        for conn in self.pipes:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        self.pipes = []
+
+    def stats(self):
+        stats = super().stats()
+        stats["search_depth"] = self.depth
+        stats["workers"] = len(self.pipes)
+        return stats
+
+
+# === CLI ===
+def duel(games, think_time, seed):
+    # Lookahead P2 against the classic AI as P1, searching in step with the
+    # game clock (one synchronous think per macro)
+    rng = random.Random(seed)
+    wins = depth_total = searches = 0
+    for _ in range(games):
+        m = simulation.Match("PVP", seed=rng.getrandbits(32), question_db=[{"q": "?", "a": "A"}])
+        bits = 0
+        while m.state != "GAME_OVER" and m.tick < 60 * simulation.FPS:
+            if m.state == "TRIVIA":
+                m.submit_answer("A" if m.rng.random() < 0.5 else "B")
+                continue
+            if m.tick % MACRO_FRAMES == 0:
+                depth, bits, _ = best_action(m.p2, m.p1, think_time)
+                depth_total += depth
+                searches += 1
+            m.step(m.p1.ai_inputs(m.p2, m.rng), bits)
+        wins += m.winner() == 2
+    print(f"lookahead won {wins}/{games} vs chase, mean depth {depth_total / max(1, searches):.1f} "
+          f"at {think_time * 1000:.0f} ms per move")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lookahead AI tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    d = sub.add_parser("duel", help="lookahead vs the classic AI, headless")
+    d.add_argument("--games", type=int, default=10)
+    d.add_argument("--think-ms", type=float, default=MACRO_FRAMES / simulation.FPS * 1000)
+    d.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.command == "duel":
+        duel(args.games, args.think_ms / 1000, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+# Headless simulation core for Mementos Melee.
+# Owns the fighter state, physics, hit detection and the FIGHT / TRIVIA /
+# GAME_OVER state machine. Nothing in here opens a window, loads a font or
+# reads the event queue, so a match can be stepped as fast as the CPU allows
+# (AI matches, replays, load tests). main.py layers drawing and input on top.
+
+import functools
+import random
+import threading
+import time
+
+import pygame
+
+from broadphase import SweepAndPrune
+from question_store import QuestionStore
+
+# === CONSTANTS & CONFIG ===
+SCREEN_WIDTH = 1000
+SCREEN_HEIGHT = 500
+FPS = 60
+
+# Ground
+GROUND_Y = SCREEN_HEIGHT - 80
+
+# Combat tuning
+ATTACK_COOLDOWN = 20
+HIT_WINDOW = (15, 20)   # attack_cooldown range in which the hitbox is live
+ATTACK_DAMAGE = 10
+HIT_FLASH_FRAMES = 15
+CRISIS_HEALTH = 20      # Cognitive Crisis triggers at or below this
+CRISIS_HEAL = 50
+CRISIS_PENALTY = 20
+
+# Spawn points (x, flip)
+P1_SPAWN = (200, False)
+P2_SPAWN = (700, True)
+
+# === INPUT FRAMES ===
+# One tick of input for one fighter is a bitmask of these flags.
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_JUMP = 4
+INPUT_ATTACK = 8
+
+KEYMAP = {
+    1: (pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_g),
+    2: (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_k),
+}
+
+
+def read_keys(keys, player):
+    # Turn a pygame.key.get_pressed() snapshot into an input frame
+    left, right, jump, attack = KEYMAP[player]
+    bits = 0
+    if keys[left]: bits |= INPUT_LEFT
+    if keys[right]: bits |= INPUT_RIGHT
+    if keys[jump]: bits |= INPUT_JUMP
+    if keys[attack]: bits |= INPUT_ATTACK
+    return bits
+
+
+_question_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
+def _open_questions(path):
+    try:
+        return QuestionStore.open(path)
+    except FileNotFoundError:
+        return QuestionStore(questions=[{"q": "File missing. Type OK.", "a": "OK"}])
+
+
+def load_questions(path='questions.json'):
+    # Opens the compiled index (see question_store.py); nothing is decoded yet
+    with _question_lock:
+        return _open_questions(path)
+
+
+def preload_questions(path='questions.json'):
+    # Open (or build) the index on a background thread
+    threading.Thread(target=load_questions, args=(path,), daemon=True).start()
+
+
+# === THE FIGHTER STATE ===
+class Fighter:
+    def __init__(self, x, y, flip=False, player=1):
+        super().__init__()
+        self.player = player
+        self.health = 100
+        self.max_health = 100
+        self.display_health = self.max_health
+        self.hit_flash = 0
+        self.speed = 5
+        self.jump_power = -15
+        self.gravity = 0.8
+        self.attack_damage = ATTACK_DAMAGE
+        self.vel_y = 0
+        self.is_jumping = False
+        self.attacking = False
+        self.attack_cooldown = 0
+        self.flip = flip
+
+        # Comeback Mechanic Flag
+        self.has_triggered_crisis = False
+
+        # Teams (BATTLE mode): bit t of hit_mask set = can hit team t
+        self.team = player - 1
+        self.hit_mask = ~(1 << self.team)
+        self.hit_targets = 0  # Fighters (bit per index) the current attack already hit
+
+        self.rect = pygame.Rect(x, y, 60, 100)
+        self.attack_rect = None  # Live hitbox this tick (for debug drawing)
+
+    def ai_inputs(self, opponent, rng):
+        # === SIMPLE AI LOGIC (Placeholder) ===
+        # Both rolls are drawn every tick so the RNG stream doesn't depend on
+        # positions; seeded matches and replays stay in lockstep.
+        jump_roll = rng.randint(0, 100)
+        attack_roll = rng.randint(0, 100)
+        bits = 0
+
+        # Chase the opponent
+        if self.rect.x > opponent.rect.x + 60:
+            bits |= INPUT_LEFT
+        elif self.rect.x < opponent.rect.x - 60:
+            bits |= INPUT_RIGHT
+
+        # Jump randomizer or if opponent is high
+        if opponent.rect.y < self.rect.y - 50 and jump_roll < 2:
+            bits |= INPUT_JUMP
+
+        # Attack if close
+        dist = abs(self.rect.centerx - opponent.rect.centerx)
+        if dist < 80 and attack_roll < 5:
+            bits |= INPUT_ATTACK
+        return bits
+
+    def step(self, inputs, opponent):
+        # Advance one tick with the given input frame
+        self.move(inputs)
+        if self.attack_rect and self.attack_rect.colliderect(opponent.rect):
+            self.land_hit(opponent)
+        self.settle()
+
+    def move(self, inputs):
+        # Inputs, physics and this tick's hitbox (the hit check is up to the caller)
+        dx = 0
+        dy = 0
+
+        # Cooldown
+        if self.attack_cooldown > 0:
+            self.attack_cooldown -= 1
+            self.attacking = False
+
+        # === APPLY INPUTS ===
+        if inputs & INPUT_LEFT:
+            dx -= self.speed
+            self.flip = True
+        if inputs & INPUT_RIGHT:
+            dx += self.speed
+            self.flip = False
+
+        if inputs & INPUT_JUMP and not self.is_jumping:
+            self.vel_y = self.jump_power
+            self.is_jumping = True
+
+        if inputs & INPUT_ATTACK and self.attack_cooldown == 0:
+            self.attack()
+
+        # Physics & Gravity
+        self.vel_y += self.gravity
+        dy += self.vel_y
+
+        # Ground Collision
+        if self.rect.y + dy >= GROUND_Y - self.rect.height:
+            self.rect.y = GROUND_Y - self.rect.height
+            self.vel_y = 0
+            self.is_jumping = False
+            dy = 0
+
+        self.rect.x += dx
+        self.rect.y += dy
+
+        # Screen Clamp
+        if self.rect.left < 0: self.rect.left = 0
+        if self.rect.right > SCREEN_WIDTH: self.rect.right = SCREEN_WIDTH
+
+        # Hitbox Logic
+        self.attack_rect = None
+        if self.attacking and HIT_WINDOW[0] <= self.attack_cooldown <= HIT_WINDOW[1]:
+            self.attack_rect = pygame.Rect(self.rect.centerx, self.rect.y + 30, 80, 60)
+            if self.flip: self.attack_rect.x -= 80
+
+    def land_hit(self, target):
+        target.health -= self.attack_damage
+        target.hit_flash = HIT_FLASH_FRAMES
+
+    def settle(self):
+        # Visuals
+        self.display_health += (self.health - self.display_health) * 0.12
+        if self.hit_flash > 0: self.hit_flash -= 1
+
+    def attack(self):
+        self.attacking = True
+        self.attack_cooldown = ATTACK_COOLDOWN
+        self.hit_targets = 0
+
+
+# === THE MATCH STATE MACHINE ===
+class Match:
+    fighter_class = Fighter
+    question_category = None    # Restrict crisis questions to one category
+    question_difficulty = None  # ... and/or one difficulty
+    battle_size = 8             # BATTLE mode: fighters on stage (P1 + AIs)
+    battle_teams = 0            # BATTLE mode: 0 = free-for-all, else fighter i is on team i % battle_teams
+    ai_policy = None            # ai.Policy driving the CPU fighters; None = Fighter.ai_inputs
+    telemetry = None            # telemetry.TelemetryWriter receiving match events
+
+    def __init__(self, game_mode="PVP", seed=None, question_db=None):
+        self.state = "FIGHT"
+        self.game_mode = game_mode  # PVP, PVE or BATTLE
+        self.broadphase = SweepAndPrune()
+        if isinstance(question_db, list):
+            question_db = QuestionStore(questions=question_db)
+        self._question_db = question_db  # None: the default bank, opened on first use
+        self.recorder = None  # replay.ReplayRecorder while a match is being recorded
+
+        # Questions don't repeat until the bag runs out, across every match
+        # played on this Match object
+        self.new_question_bag(seed if seed is not None else random.getrandbits(32))
+
+        # Trivia Setup
+        self.active_player = None
+        self.trivia_q = ""
+        self.trivia_a = ""
+        self.trivia_index = None
+
+        self.reset_match(seed)
+
+    def new_question_bag(self, seed, position=0):
+        # Built on first use, so a match can start before the bank is open
+        self._question_bag = None
+        self._bag_start = (seed, position)
+
+    @property
+    def question_db(self):
+        if self._question_db is None:
+            self._question_db = load_questions()
+        return self._question_db
+
+    @property
+    def question_bag(self):
+        if self._question_bag is None:
+            seed, position = self._bag_start
+            category, difficulty = self.question_category, self.question_difficulty
+            if not self.question_db.select(category, difficulty):
+                category = difficulty = None  # Nothing matches: ask from the whole bank, never fail mid-match
+            self._question_bag = self.question_db.bag(seed, category, difficulty)
+            self._question_bag.seek(position)
+        return self._question_bag
+
+    def reset_match(self, seed=None):
+        # Every match gets its own seed so it can be replayed from its inputs
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.rng = random.Random(self.seed)
+        self.match_id = random.getrandbits(63) if self.telemetry else 0
+        if self.game_mode == "BATTLE":
+            self.fighters = self.spawn_battle()
+            self.p1, self.p2 = self.fighters[0], self.fighters[1]
+        else:
+            self.p1 = self.fighter_class(P1_SPAWN[0], GROUND_Y - 100, flip=P1_SPAWN[1], player=1)
+            self.p2 = self.fighter_class(P2_SPAWN[0], GROUND_Y - 100, flip=P2_SPAWN[1], player=2)
+            self.fighters = [self.p1, self.p2]
+        self.tick = 0
+
+    def spawn_battle(self):
+        # Spread the fighters evenly across the stage, facing the middle
+        n = self.battle_size
+        spacing = (SCREEN_WIDTH - 60) / max(1, n - 1)
+        fighters = []
+        for i in range(n):
+            f = self.fighter_class(round(i * spacing), GROUND_Y - 100, flip=i >= n / 2, player=i + 1)
+            f.team = i % self.battle_teams if self.battle_teams else i
+            f.hit_mask = ~(1 << f.team)
+            fighters.append(f)
+        return fighters
+
+    def step(self, p1_input=0, p2_input=0):
+        # One FIGHT tick. P2's input is ignored in PVE (the AI decides after
+        # P1 has moved, same as the old inline is_ai branch).
+        if self.state != "FIGHT":
+            return
+        self.tick += 1
+        log = self.telemetry
+        if log and self.tick == 1:
+            self.log_event("match_start", mode=self.game_mode, seed=self.seed, ts=time.time())
+        if self.game_mode == "BATTLE":
+            self.step_battle(p1_input)
+            return
+        if self.recorder:
+            self.recorder.tick(p1_input, 0 if self.game_mode == "PVE" else p2_input)
+
+        if log:
+            before = (self.p1.health, self.p2.health, self.p1.is_jumping, self.p2.is_jumping)
+        self.p1.step(p1_input, self.p2)
+        if self.game_mode == "PVE":
+            if self.ai_policy:
+                p2_input = self.ai_policy.decide([(self.p2, self.p1)], self.rng)[0]
+            else:
+                p2_input = self.p2.ai_inputs(self.p1, self.rng)
+        self.p2.step(p2_input, self.p1)
+        if log:
+            # Only P1's step can hurt P2 and vice versa
+            self.log_moves(self.p1, self.p2, before[1], before[2])
+            self.log_moves(self.p2, self.p1, before[0], before[3])
+
+        # Check for Trivia
+        if self.p1.health <= CRISIS_HEALTH and not self.p1.has_triggered_crisis:
+            self.trigger_crisis(self.p1)
+        elif self.p2.health <= CRISIS_HEALTH and not self.p2.has_triggered_crisis:
+            self.trigger_crisis(self.p2)
+
+        if self.p1.health <= 0 or self.p2.health <= 0:
+            self.state = "GAME_OVER"
+            if log:
+                self.log_end()
+
+    def step_battle(self, p1_input):
+        # Everyone moves, then all hitboxes are resolved against the moved
+        # hurtboxes through the broadphase. P1 is human, the rest chase the
+        # nearest fighter they are allowed to hit. No Cognitive Crisis here.
+        alive = [f for f in self.fighters if f.health > 0]
+        broadphase = self.broadphase
+        broadphase.update(alive)
+        pairs = []
+        for f in alive:
+            if f is not self.p1:
+                mask = f.hit_mask
+                target = broadphase.nearest(f, lambda other: (mask >> other.team) & 1)
+                if target:
+                    pairs.append((f, target))
+        # Targets are picked before anyone moves so a policy can decide for
+        # every CPU fighter in one batch
+        if self.ai_policy and pairs:
+            decided = self.ai_policy.decide(pairs, self.rng)
+        else:
+            decided = [f.ai_inputs(target, self.rng) for f, target in pairs]
+        inputs = {id(f): bits for (f, _), bits in zip(pairs, decided)}
+        inputs[id(self.p1)] = p1_input
+        log = self.telemetry
+        if log:
+            was_jumping = [f.is_jumping for f in alive]
+        for f in alive:
+            f.move(inputs.get(id(f), 0))
+        if log:
+            for f, jumped in zip(alive, was_jumping):
+                if f.is_jumping and not jumped:
+                    self.log_event("jump", player=f.player)
+
+        broadphase.update(alive)
+        for f in alive:
+            if f.attack_rect is None:
+                continue
+            for target in broadphase.query(f.attack_rect):
+                bit = 1 << (target.player - 1)
+                # One hit per attack per target, and never your own team
+                if (f.hit_mask >> target.team) & 1 and not f.hit_targets & bit:
+                    f.hit_targets |= bit
+                    f.land_hit(target)
+                    if log:
+                        self.log_event("hit", attacker=f.player, target=target.player, damage=f.attack_damage)
+        for f in alive:
+            f.settle()
+
+        if len({f.team for f in self.fighters if f.health > 0}) <= 1:
+            self.state = "GAME_OVER"
+            if log:
+                self.log_end()
+
+    def trigger_crisis(self, player):
+        self.state = "TRIVIA"
+        self.active_player = player
+        self.active_player.has_triggered_crisis = True
+        data = self.question_bag.draw()
+        self.trivia_q = data['q']
+        self.trivia_a = data['a'].upper()
+        self.trivia_index = self.question_bag.last
+        if self.telemetry:
+            self.log_event("crisis", player=player.player, health=player.health, question=self.trivia_index)
+
+    def submit_answer(self, answer):
+        if self.recorder:
+            self.recorder.answer(answer)
+        correct = answer.upper() == self.trivia_a
+        if correct:
+            self.active_player.health += CRISIS_HEAL
+            if self.active_player.health > 100: self.active_player.health = 100
+        else:
+            self.active_player.health -= CRISIS_PENALTY
+        self.state = "FIGHT"
+        if self.telemetry:
+            self.log_event("answer", player=self.active_player.player, question=self.trivia_index,
+                           answer=answer, correct=correct, health=self.active_player.health)
+        return correct
+
+    # === TELEMETRY ===
+    def log_event(self, kind, **data):
+        self.telemetry.emit(kind, self.match_id, self.tick, data)
+
+    def log_moves(self, fighter, target, target_health, was_jumping):
+        # Events from one fighter's 1v1 step, found by comparing with before it
+        if target.health < target_health:
+            self.log_event("hit", attacker=fighter.player, target=target.player, damage=target_health - target.health)
+        if fighter.is_jumping and not was_jumping:
+            self.log_event("jump", player=fighter.player)
+
+    def log_end(self):
+        self.log_event("match_end", mode=self.game_mode, winner=self.winner(), ts=time.time(),
+                       health=[f.health for f in self.fighters])
+
+    def winner(self):
+        # 1 or 2 once the match is over, 0 for a double KO or a match in progress
+        if self.state != "GAME_OVER":
+            return 0
+        if self.game_mode == "BATTLE":
+            # The surviving team (team + 1), 0 if nobody is left
+            teams = {f.team for f in self.fighters if f.health > 0}
+            return teams.pop() + 1 if len(teams) == 1 else 0
+        if self.p2.health <= 0 < self.p1.health:
+            return 1
+        if self.p1.health <= 0 < self.p2.health:
+            return 2
+        return 0
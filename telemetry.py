@@ -0,0 +1,172 @@
+# Match telemetry: an append-only, compressed event log.
+# simulation.Match reports hits, jumps, crisis triggers, trivia answers and
+# match starts/ends through emit() when Match.telemetry is set. emit()
+# only stores a tuple in a preallocated slot of the front buffer; every
+# flush_interval (or when the front buffer fills) the two buffers are
+# swapped and a background thread turns the full one into JSON lines and
+# appends it as one gzip member to <dir>/events-YYYYMMDD.jsonl.gz. The game
+# loop never touches the disk or waits for the writer:
+#   - if the writer is still busy when a swap is due, that is counted as
+#     back-pressure and events keep filling the front buffer,
+#   - once the front buffer is full too, new events are dropped and counted.
+# Each flush is a complete gzip member, so a crash loses at most the
+# unflushed buffer and `zcat` / gzip.open() read the file as it grows.
+#
+#   python telemetry.py tail telemetry/            # last events
+#   python telemetry.py stats telemetry/           # events per kind
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+
+FILE_PATTERN = "events-*.jsonl.gz"
+
+
+def log_path(log_dir, when=None):
+    return os.path.join(log_dir, time.strftime("events-%Y%m%d.jsonl.gz", time.localtime(when)))
+
+
+class TelemetryWriter:
+    def __init__(self, log_dir, capacity=4096, flush_interval=1.0, level=6):
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.level = level
+        self._front = [None] * capacity
+        self._back = [None] * capacity
+        self._count = 0
+        self._pending = None        # (buffer, count) the writer is working on
+        self._next_flush = time.perf_counter() + flush_interval
+        self._wake = threading.Event()
+        self._closing = False
+
+        # Counters (read them through stats())
+        self.events = 0
+        self.dropped = 0
+        self.backpressure = 0       # swaps refused because the writer was busy
+        self.flushes = 0
+        self.bytes_written = 0
+        self.max_flush_time = 0.0
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+    # === GAME SIDE ===
+    def emit(self, kind, match_id, tick, data):
+        n = self._count
+        if n == self.capacity:
+            if not self._swap():
+                self.dropped += 1
+                return
+            n = 0
+        self._front[n] = (kind, match_id, tick, data)
+        self._count = n + 1
+        self.events += 1
+
+    def poll(self):
+        # Once per frame: hand over a partly filled buffer every flush_interval
+        if self._count and time.perf_counter() >= self._next_flush:
+            self._swap()
+
+    def _swap(self):
+        if self._pending is not None:
+            self.backpressure += 1
+            return False
+        self._pending = (self._front, self._count)
+        self._front, self._back = self._back, self._front
+        self._count = 0
+        self._next_flush = time.perf_counter() + self.flush_interval
+        self._wake.set()
+        return True
+
+    def stats(self):
+        return {"events": self.events, "dropped": self.dropped, "backpressure": self.backpressure,
+                "flushes": self.flushes, "bytes": self.bytes_written,
+                "max_flush_ms": self.max_flush_time * 1000, "errors": self.errors,
+                "buffered": self._count}
+
+    def close(self, timeout=5.0):
+        # Flush what is left and stop the writer (blocks; call on exit)
+        deadline = time.perf_counter() + timeout
+        while self._count and not self._swap() and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        self._closing = True
+        self._wake.set()
+        self._thread.join(max(0.0, deadline - time.perf_counter()))
+
+    # === WRITER THREAD ===
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            pending = self._pending
+            if pending is not None:
+                self._flush(*pending)
+                self._pending = None
+            elif self._closing:
+                return
+
+    def _flush(self, buffer, count):
+        start = time.perf_counter()
+        lines = []
+        for i in range(count):
+            kind, match_id, tick, data = buffer[i]
+            buffer[i] = None
+            record = {"event": kind, "match": match_id, "tick": tick}
+            record.update(data)
+            lines.append(json.dumps(record, separators=(",", ":")))
+        blob = gzip.compress(("\n".join(lines) + "\n").encode(), self.level)
+        try:
+            with open(log_path(self.log_dir), "ab") as f:
+                f.write(blob)
+            self.bytes_written += len(blob)
+        except OSError:
+            self.errors += 1  # disk full / unplugged: counted, never raised into the game
+        self.flushes += 1
+        self.max_flush_time = max(self.max_flush_time, time.perf_counter() - start)
+        if self._closing:
+            self._wake.set()  # let _run see the close once this flush is done
+
+
+def read_events(paths):
+    # Every event from the given log files, oldest file first
+    for path in sorted(paths):
+        with gzip.open(path, "rt") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def log_files(target):
+    return sorted(glob.glob(os.path.join(target, FILE_PATTERN))) if os.path.isdir(target) else [target]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect match telemetry logs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    tail = sub.add_parser("tail", help="print the last events")
+    tail.add_argument("target", help="log directory or .jsonl.gz file")
+    tail.add_argument("-n", type=int, default=20)
+    stats = sub.add_parser("stats", help="count events per kind")
+    stats.add_argument("target", help="log directory or .jsonl.gz file")
+    args = parser.parse_args()
+
+    events = read_events(log_files(args.target))
+    if args.command == "tail":
+        for event in deque(events, maxlen=args.n):
+            print(json.dumps(event))
+    else:
+        counts = Counter(event["event"] for event in events)
+        for kind, n in counts.most_common():
+            print(f"{kind:<12}{n:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,19 @@
 
 import pygame
 import sys
-import os
 import random
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
+from text_cache import render_text
+import assets
+from assets import load_image, play_sound
+from fonts import sys_font
+from scheduler import Scheduler
+import effects
+from effects import DamageNumbers, ParticleSystem
+
+# Initialize Pygame (display and fonts only; sound starts in the background)
+pygame.display.init()
+pygame.font.init()
 
 # Constants
 SCREEN_WIDTH = 1000
@@ -29,39 +36,35 @@ screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("Mementos Melee")
 clock = pygame.time.Clock()
 
-# Load assets
-def load_image(folder, name, scale=None):
-    path = os.path.join("assets", folder, name)
-    if os.path.exists(path):
-        img = pygame.image.load(path).convert_alpha()
-        if scale:
-            img = pygame.transform.scale(img, scale)
-        return img
-    return None
-
-background = load_image("backgrounds", "mementos.png", (SCREEN_WIDTH, SCREEN_HEIGHT))
-if not background:
-    background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    background.fill((20, 0, 40))
+# Load assets (cached process-wide, see assets.py)
+def build_background():
+    background = load_image("backgrounds", "mementos.png", (SCREEN_WIDTH, SCREEN_HEIGHT))
+    if not background:
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        background.fill((20, 0, 40))
+    return background
 
-# Sounds
-def load_sound(name):
-    path = os.path.join("assets", "sounds", name)
-    if os.path.exists(path):
-        return pygame.mixer.Sound(path)
-    return None
+def get_background():
+    return assets.cached("background", build_background)
 
-punch_sound = load_sound("punch.wav")
-hit_sound = load_sound("hit.wav")
-jump_sound = load_sound("jump.wav")
-select_sound = load_sound("select.wav") or None
+# Sounds
+SOUNDS = ["punch.wav", "hit.wav", "jump.wav", "select.wav"]
 
 # Fonts
-font_big = pygame.font.SysFont("comicsans", 80, bold=True)
-font_medium = pygame.font.SysFont("comicsans", 50)
-font_small = pygame.font.SysFont("comicsans", 30)
+font_big = sys_font("comicsans", 80, bold=True)
+font_medium = sys_font("comicsans", 50)
+font_small = sys_font("comicsans", 30)
 
 ground_y = SCREEN_HEIGHT - 80
+HIT_FLASH_FRAMES = 10
+CRISIS_HEALTH = 20
+
+# Round flow (in ticks)
+ROUNDS_TO_WIN = 2           # Best of 3
+ROUND_INTRO_TICKS = FPS
+COUNTDOWN_STEP_TICKS = FPS // 2
+ROUND_END_TICKS = 2 * FPS
+CRISIS_INTRO_TICKS = FPS
 
 # Game States
 class GameState:
@@ -71,25 +74,31 @@ class GameState:
     ROUND_END = 3
 
 current_state = GameState.MENU
-round_wins = [0, 0]
-current_round = 1
-
-# Damage Text
-class DamageText(pygame.sprite.Sprite):
-    def __init__(self, x, y, damage):
-        super().__init__()
-        self.image = font_medium.render(f"-{damage}", True, YELLOW)
-        self.rect = self.image.get_rect(center=(x, y))
-        self.vel_y = -3
-        self.life = 40
-
-    def update(self):
-        self.rect.y += self.vel_y
-        self.life -= 1
-        if self.life <= 0:
-            self.kill()
 
-damage_texts = pygame.sprite.Group()
+# Banners, countdowns and round transitions of every bout run here
+scheduler = Scheduler()
+
+# Effects: pooled damage numbers and array-backed particles (see effects.py)
+damage_numbers = DamageNumbers(font_medium, YELLOW)
+particles = ParticleSystem(bounds=(SCREEN_WIDTH, SCREEN_HEIGHT)) if effects.np is not None else None
+
+def emit(kind, x, y, count):
+    if particles is not None:
+        particles.emit(kind, x, y, count)
+
+def load_animations(char):
+    animations = {}
+    for anim in ["idle", "walk", "punch", "kick"]:
+        animations[anim] = []
+        for i in range(1, 4 if anim == "walk" else 2):
+            img = load_image(f"sprites/{char['folder']}", f"{anim}{i}.png", (80, 120))
+            if img:
+                animations[anim].append(img)
+        if not animations[anim]:
+            surf = pygame.Surface((80, 120), pygame.SRCALPHA)
+            pygame.draw.rect(surf, char['color'], (20, 0, 40, 60))
+            animations[anim] = [surf]
+    return animations
 
 # Fighter Class (updated)
 class Fighter(pygame.sprite.Sprite):
@@ -109,19 +118,13 @@ class Fighter(pygame.sprite.Sprite):
         self.flip = player == 2
         self.stun = 0
 
-        # Load animations
-        self.animations = {}
-        folder = f"assets/sprites/{self.char['folder']}"
-        for anim in ["idle", "walk", "punch", "kick"]:
-            self.animations[anim] = []
-            for i in range(1, 4 if anim == "walk" else 2):
-                img = load_image(f"sprites/{self.char['folder']}", f"{anim}{i}.png", (80, 120))
-                if img:
-                    self.animations[anim].append(img)
-            if not self.animations[anim]:
-                surf = pygame.Surface((80, 120), pygame.SRCALPHA)
-                pygame.draw.rect(surf, self.char['color'], (20, 0, 40, 60))
-                self.animations[anim] = [surf]
+        # Load animations (shared by every fighter using this character)
+        self.animations = assets.cached(("animations", self.char['folder'], self.char['color']),
+                                        lambda: load_animations(self.char))
+        # Mirrored and tinted copies of every frame, built once per character
+        self.variants = assets.cached(("variants", self.char['folder'], self.char['color']),
+                                      lambda: assets.build_variants(self.animations))
+        self.hit_flash = 0
 
         self.current_anim = "idle"
         self.frame = 0
@@ -131,8 +134,11 @@ class Fighter(pygame.sprite.Sprite):
         self.rect.bottomleft = (x, ground_y)
 
     def update(self, keys, opponent):
+        if self.hit_flash > 0:
+            self.hit_flash -= 1
         if self.stun > 0:
             self.stun -= 1
+            self.select_image(self.current_anim)
             return
 
         dx = 0
@@ -148,7 +154,8 @@ class Fighter(pygame.sprite.Sprite):
             if keys[pygame.K_w] and not self.is_jumping:
                 self.vel_y = self.jump_power
                 self.is_jumping = True
-                if jump_sound: jump_sound.play()
+                emit("dust", self.rect.centerx, ground_y - 2, 8)
+                play_sound("jump.wav")
             if keys[pygame.K_g] and self.attack_cooldown == 0:
                 self.attack(0)  # punch
             if keys[pygame.K_h] and self.attack_cooldown == 0:
@@ -159,7 +166,8 @@ class Fighter(pygame.sprite.Sprite):
             if keys[pygame.K_UP] and not self.is_jumping:
                 self.vel_y = self.jump_power
                 self.is_jumping = True
-                if jump_sound: jump_sound.play()
+                emit("dust", self.rect.centerx, ground_y - 2, 8)
+                play_sound("jump.wav")
             if keys[pygame.K_k] and self.attack_cooldown == 0:
                 self.attack(0)
             if keys[pygame.K_j] and self.attack_cooldown == 0:
@@ -169,6 +177,8 @@ class Fighter(pygame.sprite.Sprite):
         self.vel_y += 0.8
         if self.rect.bottom + dy >= ground_y:
             dy = ground_y - self.rect.bottom
+            if self.is_jumping and self.vel_y > 0:
+                emit("dust", self.rect.centerx, ground_y - 2, 12)  # landing
             self.is_jumping = False
             self.vel_y = 0
 
@@ -190,9 +200,10 @@ class Fighter(pygame.sprite.Sprite):
         if self.anim_timer >= 8:
             self.anim_timer = 0
             self.frame = (self.frame + 1) % len(self.animations[anim])
-        self.image = self.animations[anim][self.frame]
-        if self.flip:
-            self.image = pygame.transform.flip(self.image, True, False)
+        self.current_anim = anim
+        self.select_image(anim)
+        if 0 < self.health <= CRISIS_HEALTH and self.anim_timer % 2 == 0:
+            emit("crisis", self.rect.centerx, self.rect.centery, 1)
 
         # Attack hit
         if self.attack_cooldown == 10:  # peak frame
@@ -203,21 +214,36 @@ class Fighter(pygame.sprite.Sprite):
                 self.rect.y + 20, 80 + range_bonus, 80)
             if attack_rect.colliderect(opponent.rect):
                 opponent.health -= damage
-                damage_texts.add(DamageText(opponent.rect.centerx, opponent.rect.top, damage))
-                if hit_sound: hit_sound.play()
+                opponent.hit_flash = HIT_FLASH_FRAMES
+                damage_numbers.spawn(opponent.rect.centerx, opponent.rect.top, damage)
+                emit("spark", opponent.rect.centerx, attack_rect.centery, 24)
+                play_sound("hit.wav")
+
+    def select_image(self, anim):
+        # Pick a precomputed variant; nothing is allocated per frame
+        if self.hit_flash > 0:
+            effect = "hit"
+        elif self.stun > 0:
+            effect = "stun"
+        elif self.health <= CRISIS_HEALTH:
+            effect = "crisis"
+        else:
+            effect = None
+        frames = self.variants[effect][self.flip][anim]
+        self.image = frames[self.frame % len(frames)]
 
     def attack(self, type):
         self.attacking = True
         self.attack_type = type
         self.attack_cooldown = 25
         self.frame = 0
-        if punch_sound: punch_sound.play()
+        play_sound("punch.wav")
 
     def draw_health(self, surface):
         x = 50 if self.player == 1 else SCREEN_WIDTH - 250
         pygame.draw.rect(surface, RED, (x, 20, 200, 30))
         pygame.draw.rect(surface, GREEN, (x, 20, 200 * (self.health / 100), 30))
-        name = font_small.render(self.char["name"], True, WHITE)
+        name = render_text(font_small, self.char["name"], WHITE)
         surface.blit(name, (x, 0))
 
 # Characters
@@ -229,90 +255,174 @@ characters = [
 ]
 
 selected = [0, 0]
-player1 = None
-player2 = None
+bout = None
+
+# Bout: one best-of-3 match. The round flow is a set of coroutines on the
+# shared scheduler, so waiting for a banner never blocks the loop (or any
+# other bout on the same scheduler)
+class Bout:
+    def __init__(self, char1, char2):
+        self.player1 = Fighter(200, 0, char1, 1)
+        self.player2 = Fighter(700, 0, char2, 2)
+        self.fighters = pygame.sprite.Group(self.player1, self.player2)
+        self.state = GameState.FIGHT
+        self.round_wins = [0, 0]
+        self.current_round = 1
+        self.frozen = True          # Fighters ignore input during banners and countdowns
+        self.banner = None          # (text, color) shown mid-screen
+        self.subtitle = None
+        self.crisis_seen = set()    # Players whose crisis intro already played this round
+        self.crisis_freeze = 0       # Crisis intros playing
+        self.winner = None
+        scheduler.spawn(self.round_start(), owner=self)
+
+    def close(self):
+        scheduler.cancel(self)
+
+    # === SEQUENCES ===
+    def round_start(self):
+        self.state = GameState.FIGHT
+        self.frozen = True
+        self.banner = (f"Round {self.current_round}", WHITE)
+        yield ROUND_INTRO_TICKS
+        for n in (3, 2, 1):
+            self.banner = (str(n), YELLOW)
+            yield COUNTDOWN_STEP_TICKS
+        self.banner = ("FIGHT!", RED)
+        self.frozen = False
+        yield COUNTDOWN_STEP_TICKS
+        self.banner = None
+
+    def round_end(self, winner):
+        self.state = GameState.ROUND_END
+        self.frozen = True
+        self.winner = winner
+        self.round_wins[winner - 1] += 1
+        fighter = self.player1 if winner == 1 else self.player2
+        self.banner = (f"{fighter.char['name']} WINS ROUND!", RED)
+        if self.round_wins[winner - 1] == ROUNDS_TO_WIN:
+            self.subtitle = f"GAME OVER - P{winner} WINS!"
+            return
+        yield ROUND_END_TICKS
+        self.current_round += 1
+        self.reset_fighters()
+        yield from self.round_start()
+
+    def crisis_intro(self, fighter):
+        # Freeze the fight and flash a warning once per fighter per round
+        self.crisis_freeze += 1
+        for i in range(6):
+            self.subtitle = f"P{fighter.player} COGNITIVE CRISIS!" if i % 2 == 0 else None
+            yield CRISIS_INTRO_TICKS // 6
+        self.subtitle = None
+        self.crisis_freeze -= 1
+
+    # === PER TICK ===
+    def update(self, keys):
+        if self.frozen or self.crisis_freeze:
+            return
+        self.player1.update(keys, self.player2)
+        self.player2.update(keys, self.player1)
+
+        if self.player1.health <= 0 or self.player2.health <= 0:
+            winner = 2 if self.player1.health <= 0 else 1
+            self.frozen = True
+            scheduler.spawn(self.round_end(winner), owner=self)
+            return
+        for fighter in (self.player1, self.player2):
+            if fighter.health <= CRISIS_HEALTH and fighter.player not in self.crisis_seen:
+                self.crisis_seen.add(fighter.player)
+                scheduler.spawn(self.crisis_intro(fighter), owner=self)
+
+    def reset_fighters(self):
+        for fighter, x in ((self.player1, 200), (self.player2, 700)):
+            fighter.health = fighter.max_health
+            fighter.rect.bottomleft = (x, ground_y)
+            fighter.vel_y = 0
+            fighter.is_jumping = False
+        self.crisis_seen.clear()
+
+    def draw(self, surface):
+        self.fighters.draw(surface)
+        self.player1.draw_health(surface)
+        self.player2.draw_health(surface)
+
+        round_text = render_text(font_medium, f"Round {self.current_round}", WHITE)
+        surface.blit(round_text, (SCREEN_WIDTH//2 - round_text.get_width()//2, 10))
+        if self.banner:
+            text = render_text(font_big, *self.banner)
+            surface.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, 200))
+        if self.subtitle:
+            text = render_text(font_big, self.subtitle, YELLOW)
+            surface.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, 300))
 
 # Main Loop
-running = True
-while running:
-    clock.tick(FPS)
-    keys = pygame.key.get_pressed()
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-    screen.blit(background, (0, 0))
-    pygame.draw.rect(screen, (50, 50, 50, 180), (0, ground_y, SCREEN_WIDTH, SCREEN_HEIGHT - ground_y + 50))
-
-    if current_state == GameState.MENU:
-        title = font_big.render("MEMENTOS MELEE", True, PURPLE)
-        screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 100))
-        start_text = font_medium.render("Press SPACE to Start", True, WHITE)
-        screen.blit(start_text, (SCREEN_WIDTH//2 - start_text.get_width()//2, 250))
-
-        if keys[pygame.K_SPACE]:
-            current_state = GameState.CHAR_SELECT
-            if select_sound: select_sound.play()
-
-    elif current_state == GameState.CHAR_SELECT:
-        screen.blit(font_big.render("Choose Your Thief", True, YELLOW), (150, 50))
-        for i, char in enumerate(characters):
-            color = YELLOW if selected[0] == i else WHITE
-            name = font_medium.render(char["name"], True, color)
-            screen.blit(name, (100, 150 + i*100))
-            bio = font_small.render(char["bio"], True, WHITE)
-            screen.blit(bio, (100, 190 + i*100))
-
-        color = YELLOW if selected[1] == i else WHITE
-        name2 = font_medium.render(characters[selected[1]]["name"], True, color)
-        screen.blit(name2, (600, 200))
-
-        if keys[pygame.K_w] or keys[pygame.K_s]:
-            if pygame.key.get_pressed()[pygame.K_w]:
-                selected[0] = (selected[0] - 1) % len(characters)
-            if pygame.key.get_pressed()[pygame.K_s]:
-                selected[0] = (selected[0] + 1) % len(characters)
+def main():
+    global current_state, bout
+    assets.start_audio(SOUNDS)
+    running = True
+    while running:
+        clock.tick(FPS)
+        keys = pygame.key.get_pressed()
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        # Timed transitions advance with the game, never by sleeping
+        scheduler.tick()
+
+        screen.blit(get_background(), (0, 0))
+        pygame.draw.rect(screen, (50, 50, 50, 180), (0, ground_y, SCREEN_WIDTH, SCREEN_HEIGHT - ground_y + 50))
+
+        if current_state == GameState.MENU:
+            title = render_text(font_big, "MEMENTOS MELEE", PURPLE)
+            screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 100))
+            start_text = render_text(font_medium, "Press SPACE to Start", WHITE)
+            screen.blit(start_text, (SCREEN_WIDTH//2 - start_text.get_width()//2, 250))
+
             if keys[pygame.K_SPACE]:
-                player1 = Fighter(200, 0, characters[selected[0]], 1)
-                player2 = Fighter(700, 0, characters[selected[1]], 2)
-                all_sprites = pygame.sprite.Group(player1, player2)
-                current_state = GameState.FIGHT
-
-    elif current_state == GameState.FIGHT:
-        player1.update(keys, player2)
-        player2.update(keys, player1)
-        damage_texts.update()
-
-        all_sprites.draw(screen)
-        player1.draw_health(screen)
-        player2.draw_health(screen)
-        damage_texts.draw(screen)
-
-        round_text = font_medium.render(f"Round {current_round}", True, WHITE)
-        screen.blit(round_text, (SCREEN_WIDTH//2 - round_text.get_width()//2, 10))
-
-        if player1.health <= 0 or player2.health <= 0:
-            winner = 2 if player1.health <= 0 else 1
-            round_wins[winner-1] += 1
-            current_state = GameState.ROUND_END
-
-    elif current_state == GameState.ROUND_END:
-        win_text = font_big.render(f"{characters[selected[winner-1]]['name']} WINS ROUND!", True, RED)
-        screen.blit(win_text, (SCREEN_WIDTH//2 - win_text.get_width()//2, 200))
-        if round_wins[0] == 2 or round_wins[1] == 2:
-            final = font_big.render("GAME OVER - " + ("P1" if round_wins[0] == 2 else "P2") + " WINS!", True, YELLOW)
-            screen.blit(final, (SCREEN_WIDTH//2 - final.get_width()//2, 300))
-        else:
-            current_round += 1
-            pygame.time.wait(2000)
-            player1.health = player1.max_health
-            player2.health = player2.max_health
-            player1.rect.bottomleft = (200, ground_y)
-            player2.rect.bottomleft = (700, ground_y)
-            current_state = GameState.FIGHT
-
-    pygame.display.flip()
-
-pygame.quit()
-sys.exit()
+                current_state = GameState.CHAR_SELECT
+                play_sound("select.wav")
+
+        elif current_state == GameState.CHAR_SELECT:
+            screen.blit(render_text(font_big, "Choose Your Thief", YELLOW), (150, 50))
+            for i, char in enumerate(characters):
+                color = YELLOW if selected[0] == i else WHITE
+                name = render_text(font_medium, char["name"], color)
+                screen.blit(name, (100, 150 + i*100))
+                bio = render_text(font_small, char["bio"], WHITE)
+                screen.blit(bio, (100, 190 + i*100))
+
+            color = YELLOW if selected[1] == i else WHITE
+            name2 = render_text(font_medium, characters[selected[1]]["name"], color)
+            screen.blit(name2, (600, 200))
+
+            if keys[pygame.K_w] or keys[pygame.K_s]:
+                if pygame.key.get_pressed()[pygame.K_w]:
+                    selected[0] = (selected[0] - 1) % len(characters)
+                if pygame.key.get_pressed()[pygame.K_s]:
+                    selected[0] = (selected[0] + 1) % len(characters)
+                if keys[pygame.K_SPACE]:
+                    bout = Bout(characters[selected[0]], characters[selected[1]])
+                    current_state = GameState.FIGHT
+
+        elif current_state == GameState.FIGHT:
+            # Rounds, banners and the end of the bout are handled by the bout's sequences
+            bout.update(keys)
+            damage_numbers.update()
+            if particles is not None:
+                particles.update()
+
+            bout.draw(screen)
+            if particles is not None:
+                particles.draw(screen)
+            damage_numbers.draw(screen)
+
+        pygame.display.flip()
+
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main()
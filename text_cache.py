@@ -0,0 +1,55 @@
+# Shared cache of rendered text surfaces.
+# Font.render is the most expensive thing we do per frame, and almost every
+# string on screen (menu options, controls overlay, PAUSED, GAME OVER) is
+# the same from one frame to the next. Surfaces are keyed by
+# (font, text, color, antialias) and evicted least-recently-used once the
+# cache holds max_entries, so text that keeps changing can't grow it forever.
+# The returned surfaces are shared: blit them, never draw onto them.
+
+from collections import OrderedDict
+
+
+class TextCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return surf
+
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        self.entries[key] = surf
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return surf
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Process-wide cache shared by main.py and test.py
+text_cache = TextCache()
+
+
+def render_text(font, text, color, antialias=True):
+    return text_cache.render(font, text, color, antialias)
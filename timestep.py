@@ -0,0 +1,67 @@
+# Fixed-timestep scheduling and frame pacing for the main loop.
+# The simulation always advances in whole ticks of 1 / tick_rate seconds,
+# however long a frame took, so gravity and jump arcs play out at the same
+# speed on a 60 Hz laptop and a 144 Hz monitor. Leftover time is exposed
+# as `alpha` so the renderer can draw fighters part-way between the last
+# two ticks.
+
+import time
+
+
+class FixedTimestep:
+    def __init__(self, tick_rate, max_ticks_per_frame=5):
+        self.dt = 1.0 / tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.accumulator = 0.0
+        self.dropped_ticks = 0
+
+    def advance(self, frame_time):
+        # How many ticks to run for a frame that took frame_time seconds
+        self.accumulator += frame_time
+        ticks = int(self.accumulator / self.dt)
+        if ticks > self.max_ticks_per_frame:
+            # Too far behind to catch up (debugger, window drag...): run a capped
+            # number of ticks and let the game slow down instead of spiralling
+            self.dropped_ticks += ticks - self.max_ticks_per_frame
+            ticks = self.max_ticks_per_frame
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks * self.dt
+        return ticks
+
+    @property
+    def alpha(self):
+        # How far the render time is between the previous tick and the latest one
+        return min(1.0, self.accumulator / self.dt)
+
+
+class FramePacer:
+    # Caps the render rate. fps=0 renders as fast as possible. The default
+    # sleeps (millisecond-ish accuracy depending on the OS); precise mode
+    # sleeps until `spin` seconds before the deadline and busy-waits the rest.
+    def __init__(self, fps, precise=False, spin=0.002):
+        self.frame = 1.0 / fps if fps else 0.0
+        self.precise = precise
+        self.spin = spin
+        self.last = time.perf_counter()
+        self.deadline = self.last
+
+    def wait(self):
+        # Block until the next frame is due; returns seconds since the last frame
+        now = time.perf_counter()
+        if self.frame:
+            self.deadline += self.frame
+            if self.deadline < now:
+                # Fell behind: start a fresh schedule rather than bursting frames
+                self.deadline = now
+            elif self.precise:
+                if self.deadline - now > self.spin:
+                    time.sleep(self.deadline - now - self.spin)
+                while time.perf_counter() < self.deadline:
+                    pass
+            else:
+                time.sleep(self.deadline - now)
+            now = time.perf_counter()
+        frame_time = now - self.last
+        self.last = now
+        return frame_time
@@ -0,0 +1,229 @@
+# Headless AI tournaments spread over a process pool.
+# Each worker runs one simulation.Match loop per game with its own seeded
+# RNG; results stream back as chunks finish and are folded into win rates,
+# average match length, Cognitive Crisis trigger rates and Elo ratings.
+#
+#   python tournament.py --policies chase rushdown masher --games 1000
+#   python tournament.py --format ladder --rounds 20 --tune speed=6
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import simulation
+from ai import POLICIES
+
+MAX_TICKS = simulation.FPS * 99  # 99 second timer, then it's a draw
+ELO_START = 1500
+ELO_K = 16
+
+_question_db = None
+
+
+def _init_worker(question_path):
+    global _question_db
+    _question_db = simulation.load_questions(question_path)
+
+
+def run_match(p1_name, p2_name, seed, tune=None, trivia_accuracy=0.5):
+    # One headless match; returns a plain dict so it pickles cheaply
+    match = simulation.Match("PVP", seed=seed, question_db=_question_db)
+    for f in (match.p1, match.p2):
+        for attr, value in (tune or {}).items():
+            setattr(f, attr, value)
+    p1_policy, p2_policy = POLICIES[p1_name], POLICIES[p2_name]
+    rng = match.rng
+
+    while match.state != "GAME_OVER" and match.tick < MAX_TICKS:
+        if match.state == "TRIVIA":
+            correct = rng.random() < trivia_accuracy
+            match.submit_answer(match.trivia_a if correct else "")
+            continue
+        match.step(p1_policy(match.p1, match.p2, rng), p2_policy(match.p2, match.p1, rng))
+
+    return {
+        "p1": p1_name, "p2": p2_name, "seed": seed,
+        "winner": match.winner(), "ticks": match.tick,
+        "crisis": (match.p1.has_triggered_crisis, match.p2.has_triggered_crisis),
+    }
+
+
+def _run_chunk(specs, tune, trivia_accuracy):
+    return [run_match(p1, p2, seed, tune, trivia_accuracy) for p1, p2, seed in specs]
+
+
+# === SCHEDULES ===
+def round_robin(policies, games, base_seed):
+    # Every pair plays `games` matches, swapping sides each game
+    index = 0
+    for i, a in enumerate(policies):
+        for b in policies[i + 1:]:
+            for g in range(games):
+                p1, p2 = (a, b) if g % 2 == 0 else (b, a)
+                yield p1, p2, (base_seed << 32) | index
+                index += 1
+
+
+# === RESULTS ===
+class Standings:
+    def __init__(self, policies):
+        self.stats = {p: {"played": 0, "wins": 0, "losses": 0, "draws": 0, "crisis": 0}
+                      for p in policies}
+        self.results = []
+        self.total_ticks = 0
+
+    def add(self, result):
+        self.results.append(result)
+        self.total_ticks += result["ticks"]
+        for side, name in ((1, result["p1"]), (2, result["p2"])):
+            s = self.stats[name]
+            s["played"] += 1
+            s["crisis"] += result["crisis"][side - 1]
+            if result["winner"] == side:
+                s["wins"] += 1
+            elif result["winner"] == 0:
+                s["draws"] += 1
+            else:
+                s["losses"] += 1
+
+    def elo(self):
+        # Replayed in seed order so the ratings don't depend on which worker finished first
+        ratings = {p: float(ELO_START) for p in self.stats}
+        for r in sorted(self.results, key=lambda r: r["seed"]):
+            a, b = r["p1"], r["p2"]
+            expected = 1 / (1 + 10 ** ((ratings[b] - ratings[a]) / 400))
+            score = {1: 1.0, 2: 0.0, 0: 0.5}[r["winner"]]
+            ratings[a] += ELO_K * (score - expected)
+            ratings[b] -= ELO_K * (score - expected)
+        return ratings
+
+    def summary(self):
+        ratings = self.elo()
+        n = len(self.results)
+        rows = []
+        for name, s in self.stats.items():
+            played = max(1, s["played"])
+            rows.append({
+                "policy": name, "played": s["played"],
+                "win_rate": s["wins"] / played, "draw_rate": s["draws"] / played,
+                "crisis_rate": s["crisis"] / played, "elo": round(ratings[name], 1),
+            })
+        rows.sort(key=lambda r: -r["elo"])
+        return {
+            "matches": n,
+            "avg_match_ticks": self.total_ticks / n if n else 0,
+            "policies": rows,
+        }
+
+
+def play(pool, schedule, standings, chunk_size, in_flight, tune, trivia_accuracy, progress=True):
+    # Feed the schedule to the pool with a bounded number of chunks in flight
+    start = time.perf_counter()
+    schedule = iter(schedule)
+    pending = set()
+
+    def submit():
+        chunk = [spec for _, spec in zip(range(chunk_size), schedule)]
+        if chunk:
+            pending.add(pool.submit(_run_chunk, chunk, tune, trivia_accuracy))
+        return bool(chunk)
+
+    while len(pending) < in_flight and submit():
+        pass
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            for result in future.result():
+                standings.add(result)
+            submit()
+        if progress:
+            n = len(standings.results)
+            rate = n / (time.perf_counter() - start)
+            print(f"\r{n} matches ({rate:,.0f}/s)", end="", flush=True)
+    if progress:
+        print()
+
+
+def ladder(pool, policies, rounds, games, standings, base_seed, **kwargs):
+    # Adjacent rungs play a best-of-`games` set each round; the lower rung
+    # moves up if it wins more games than it loses.
+    ranks = list(policies)
+    index = 0
+    for rnd in range(rounds):
+        pairs = [(ranks[i], ranks[i + 1]) for i in range(rnd % 2, len(ranks) - 1, 2)]
+        specs = []
+        for hi, lo in pairs:
+            for g in range(games):
+                p1, p2 = (hi, lo) if g % 2 == 0 else (lo, hi)
+                specs.append((p1, p2, (base_seed << 32) | index))
+                index += 1
+        first = len(standings.results)
+        play(pool, specs, standings, progress=False, **kwargs)
+        for hi, lo in pairs:
+            margin = 0
+            for r in standings.results[first:]:
+                if {r["p1"], r["p2"]} == {hi, lo} and r["winner"]:
+                    margin += 1 if (r["p1"], r["p2"])[r["winner"] - 1] == lo else -1
+            if margin > 0:
+                a, b = ranks.index(hi), ranks.index(lo)
+                ranks[a], ranks[b] = lo, hi
+        print(f"round {rnd + 1}: " + " > ".join(ranks))
+    return ranks
+
+
+# === RUN ===
+def parse_tune(items):
+    tune = {}
+    for item in items:
+        key, value = item.split("=", 1)
+        tune[key] = float(value) if "." in value else int(value)
+    return tune
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless AI tournaments.")
+    parser.add_argument("--policies", nargs="+", default=list(POLICIES), choices=list(POLICIES))
+    parser.add_argument("--format", choices=["round-robin", "ladder"], default="round-robin")
+    parser.add_argument("--games", type=int, default=100, help="games per pairing")
+    parser.add_argument("--rounds", type=int, default=10, help="ladder rounds")
+    parser.add_argument("--seed", type=int, default=random.randrange(1 << 16))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=50, help="matches per worker task")
+    parser.add_argument("--trivia-accuracy", type=float, default=0.5)
+    parser.add_argument("--tune", action="append", default=[], metavar="ATTR=VALUE",
+                        help="override a Fighter attribute, e.g. speed=6 or attack_damage=12")
+    parser.add_argument("--questions", default="questions.json")
+    parser.add_argument("--json", help="write the summary to this file")
+    args = parser.parse_args()
+
+    standings = Standings(args.policies)
+    options = dict(chunk_size=args.chunk_size, in_flight=args.workers * 4, tune=parse_tune(args.tune),
+                   trivia_accuracy=args.trivia_accuracy)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.questions,)) as pool:
+        if args.format == "ladder":
+            ladder(pool, args.policies, args.rounds, args.games, standings, args.seed, **options)
+        else:
+            play(pool, round_robin(args.policies, args.games, args.seed), standings, **options)
+    elapsed = time.perf_counter() - start
+
+    summary = standings.summary()
+    summary["seed"] = args.seed
+    summary["seconds"] = round(elapsed, 3)
+    print(f"{summary['matches']} matches in {elapsed:.1f}s, "
+          f"avg length {summary['avg_match_ticks'] / simulation.FPS:.1f}s (seed {args.seed})")
+    print(f"{'policy':<12}{'played':>8}{'win%':>8}{'draw%':>8}{'crisis%':>9}{'elo':>8}")
+    for r in summary["policies"]:
+        print(f"{r['policy']:<12}{r['played']:>8}{r['win_rate']:>8.1%}{r['draw_rate']:>8.1%}"
+              f"{r['crisis_rate']:>9.1%}{r['elo']:>8.0f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Background layout of upcoming Cognitive Crisis questions.
+# Once a fighter gets close to the crisis threshold, the next questions in
+# the match's bag are decoded, word-wrapped to the trivia box and rendered
+# into a finished panel on a worker thread. When the crisis fires the
+# TRIVIA screen is a single blit of that panel plus the typed answer.
+# The worker uses its own font objects so it never touches a font the
+# main thread is rendering with. A question the worker is still laying
+# out when the crisis fires is waited for, not built a second time.
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pygame
+
+from question_store import QuestionBag
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+
+PADDING = 20
+QUESTION_Y = 100
+ANSWER_Y = 200
+BORDER = 5
+
+
+def wrap_text(font, text, width):
+    # Greedy word wrap; words wider than the box are split by character
+    lines = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if font.size(candidate)[0] <= width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        while font.size(word)[0] > width:
+            cut = len(word) - 1
+            while cut > 1 and font.size(word[:cut])[0] > width:
+                cut -= 1
+            lines.append(word[:cut])
+            word = word[cut:]
+        line = word
+    if line:
+        lines.append(line)
+    return lines
+
+
+class TriviaLayout:
+    def __init__(self, question, panel, answer_y):
+        self.question = question
+        self.panel = panel          # Box, border, header and question, ready to blit
+        self.answer_y = answer_y    # Top of the answer line, relative to the box
+
+
+def build_layout(fonts, question, size):
+    header_font, text_font = fonts
+    width, height = size
+    line_height = text_font.get_linesize()
+    # Keep room for the answer line under the question
+    max_lines = max(1, (height - QUESTION_Y - line_height - PADDING) // line_height)
+    lines = wrap_text(text_font, question, width - 2 * PADDING)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = lines[-1].rstrip(".") + "..."
+
+    panel = pygame.Surface(size)
+    panel.fill(WHITE)
+    pygame.draw.rect(panel, RED, panel.get_rect(), BORDER)
+    panel.blit(header_font.render("COGNITIVE CRISIS!", True, RED), (PADDING, PADDING))
+    for i, line in enumerate(lines):
+        panel.blit(text_font.render(line, True, BLACK), (PADDING, QUESTION_Y + i * line_height))
+    answer_y = max(ANSWER_Y, QUESTION_Y + len(lines) * line_height + PADDING // 2)
+    return TriviaLayout(question, panel, answer_y)
+
+
+class TriviaPrefetcher:
+    def __init__(self, make_fonts, size, ahead=2, max_layouts=8):
+        self.make_fonts = make_fonts    # () -> (header font, question font)
+        self.size = size
+        self.ahead = ahead              # Questions laid out past the bag's position
+        self.max_layouts = max_layouts
+        self.layouts = OrderedDict()    # question text -> TriviaLayout or Future
+        self.requested = None
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trivia-prefetch")
+        self.worker_fonts = None
+        self.main_fonts = None
+        self.prefetched = self.built_on_demand = self.waited = 0
+
+    def prefetch(self, bag):
+        # Cheap to call every tick; only schedules work when the bag moved
+        key = (id(bag), bag.seed, bag.position)
+        if key == self.requested:
+            return
+        self.requested = key
+        self.executor.submit(self._work, bag.store, bag.ranges, bag.seed, bag.position)
+
+    def _work(self, store, ranges, seed, position):
+        if self.worker_fonts is None:
+            self.worker_fonts = self.make_fonts()
+        bag = QuestionBag(store, ranges, seed)
+        bag.seek(position)
+        for _ in range(self.ahead):
+            question = bag.draw()["q"]
+            with self.lock:
+                if question in self.layouts:
+                    continue
+                # Claim it, so layout() waits for this build instead of starting its own
+                future = Future()
+                self._store(question, future)
+            try:
+                layout = build_layout(self.worker_fonts, question, self.size)
+            except Exception as exc:
+                with self.lock:
+                    if self.layouts.get(question) is future:
+                        del self.layouts[question]
+                future.set_exception(exc)
+                raise
+            with self.lock:
+                self._store(question, layout)
+                self.prefetched += 1
+            future.set_result(layout)
+
+    def _store(self, question, layout):
+        self.layouts[question] = layout
+        self.layouts.move_to_end(question)
+        while len(self.layouts) > self.max_layouts:
+            self.layouts.popitem(last=False)
+
+    def layout(self, question):
+        # The finished layout for a question, built right now if it wasn't prefetched
+        with self.lock:
+            layout = self.layouts.get(question)
+        if isinstance(layout, Future):
+            # Still being laid out on the worker: finishing it is quicker than starting over
+            try:
+                layout = layout.result()
+                self.waited += 1
+            except Exception:
+                layout = None
+        if layout is None:
+            if self.main_fonts is None:
+                self.main_fonts = self.make_fonts()
+            layout = build_layout(self.main_fonts, question, self.size)
+            with self.lock:
+                self._store(question, layout)
+                self.built_on_demand += 1
+        return layout